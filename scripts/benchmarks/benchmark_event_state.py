@@ -0,0 +1,359 @@
+"""
+-------------------------------------------------------------------------------
+
+    Written by Thomas Munzer (tmunzer@juniper.net)
+    Github repository: https://github.com/tmunzer/Mist_library/
+
+    This script is licensed under the MIT License.
+
+-------------------------------------------------------------------------------
+Python script to benchmark the memory used by list_open_events to save the
+status of the events (per device, event type and port).
+
+The same synthetic events are processed with:
+- legacy: the nested dicts used by the previous versions of list_open_events
+  (devices[type][mac]["events"][event_type][identifier] = {status, ...})
+- records: the slotted records used by list_open_events (_DeviceState and
+  _EventState, with the repeated values interned)
+
+The events are generated page by page (no Mist Cloud or mock server is
+required), for switches and gateways with port level events (one
+SW_PORT_DOWN/GW_PORT_DOWN event per port, ~70% of them cleared, and one
+disconnection per device).
+
+For each representation, the benchmark reports:
+- the memory used by the status of the events once all the events are
+  processed (tracemalloc)
+- the peak memory used while processing the events (tracemalloc)
+- the processing time (measured without tracemalloc)
+
+-------
+Requirements:
+mistapi: https://pypi.org/project/mistapi/ (required by list_open_events)
+
+-------
+Usage:
+This script can be run as is (without parameters), or with the options below.
+
+-------
+Script Parameters:
+-h, --help              display this help
+-d, --devices=          number of devices (switches and gateways)
+                        default is 10000
+-p, --ports=            number of ports per device
+                        default is 48
+-l, --log_file=         define the filepath/filename where to write the logs
+                        default is "./script.log"
+
+-------
+Examples:
+python3 ./benchmark_event_state.py
+python3 ./benchmark_event_state.py -d 100000 -p 48
+"""
+
+#### IMPORTS ####
+import argparse
+import contextlib
+import gc
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+SCRIPTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(SCRIPTS_FOLDER, "reports"))
+try:
+    import list_open_events
+except ImportError:
+    print(
+        """
+        Critical:
+        This script is using other scripts from the mist_library to perform all the
+        action. Please make sure the following python files are available:
+            - reports/list_open_events.py
+        """
+    )
+    sys.exit(2)
+
+#####################################################################
+#### PARAMETERS #####
+LOG_FILE = "./script.log"
+PAGE_SIZE = 1000
+SITES_RATIO = 20
+# device type: (ratio, model, disconnection events, port events)
+DEVICE_TYPES = {
+    "switch": (
+        0.8,
+        "EX4100-48P",
+        ("SW_DISCONNECTED", "SW_CONNECTED"),
+        ("SW_PORT_DOWN", "SW_PORT_UP"),
+    ),
+    "gateway": (
+        0.2,
+        "SRX320",
+        ("GW_DISCONNECTED", "GW_CONNECTED"),
+        ("GW_PORT_DOWN", "GW_PORT_UP"),
+    ),
+}
+
+#####################################################################
+#### LOGS ####
+LOGGER = logging.getLogger(__name__)
+
+
+#####################################################################
+#### EVENTS ####
+def _generate_pages(devices: int, ports: int, seed: int = 0):
+    """
+    Yield the synthetic events page by page. A new page (and new strings, like
+    when the events are parsed from the API response) is created each time
+    """
+    gen = random.Random(seed)
+    now = time.time()
+    types = list(DEVICE_TYPES)
+    weights = [DEVICE_TYPES[device_type][0] for device_type in types]
+    site_ids = [
+        f"{i:08x}-0000-4000-8000-000000000000"
+        for i in range(max(1, devices // SITES_RATIO))
+    ]
+    page = []
+    for i in range(devices):
+        device_type = gen.choices(types, weights)[0]
+        _, model, disconnection_events, port_events = DEVICE_TYPES[device_type]
+        device = {
+            "site_id": gen.choice(site_ids),
+            "mac": f"5c5b35{i:06x}",
+            "device_type": device_type,
+            "device_model": model,
+            "device_version": "23.4R2",
+        }
+        events = [(disconnection_events, None)] + [
+            (port_events, f"ge-0/0/{port}") for port in range(ports)
+        ]
+        for (trigger, clear), port_id in events:
+            timestamp = now - gen.uniform(0, 86400)
+            pairs = [trigger, clear] if gen.random() < 0.7 else [trigger]
+            for event_type in pairs:
+                event = {
+                    "type": event_type,
+                    "timestamp": round(timestamp, 3),
+                    "text": f"{event_type} on {device['mac']}",
+                    **{key: f"{value}" for key, value in device.items()},
+                }
+                if port_id:
+                    event["port_id"] = f"{port_id}"
+                page.append(event)
+                timestamp += gen.uniform(1, 600)
+                if len(page) >= PAGE_SIZE:
+                    yield page
+                    page = []
+    if page:
+        yield page
+
+
+#####################################################################
+#### LEGACY ####
+# nested dicts used by the previous versions of list_open_events
+def _process_legacy_event(devices: dict, event: dict, handler: tuple) -> None:
+    event_category, status, identifier_header, get_identifier, details = handler
+    event_identifier = get_identifier(event) if get_identifier else None
+    device_type = event.get("device_type")
+    device_mac = event.get("mac")
+    if not devices.get(device_type):
+        devices[device_type] = {}
+    if not devices[device_type].get(device_mac):
+        devices[device_type][device_mac] = {
+            "model": None,
+            "version": None,
+            "site_id": None,
+            "events": {},
+        }
+    device = devices[device_type][device_mac]
+    if event.get("device_model"):
+        device["model"] = event["device_model"]
+    if event.get("device_version"):
+        device["version"] = event["device_version"]
+    if event.get("site_id"):
+        device["site_id"] = event["site_id"]
+    events = device["events"]
+    if event_identifier:
+        if not events.get(event_category):
+            events[event_category] = {"identifier_header": identifier_header}
+        if not events[event_category].get(event_identifier):
+            events[event_category][event_identifier] = {
+                "status": None,
+                "triggered": 0,
+                "cleared": 0,
+                "last_change": -1,
+                "timestamp": -1,
+                "details": "",
+            }
+        device_event = events[event_category][event_identifier]
+    else:
+        if not events.get(event_category):
+            events[event_category] = {
+                "identifier_header": identifier_header,
+                "status": None,
+                "triggered": 0,
+                "cleared": 0,
+                "last_change": -1,
+                "timestamp": -1,
+                "details": "",
+            }
+        device_event = events[event_category]
+    device_event[status] += 1
+    event_timestamp = event.get("timestamp", 0)
+    if event_timestamp < device_event["timestamp"]:
+        return
+    if details:
+        device_event["details"] = event.get("text", "")
+    device_event["status"] = status
+    device_event["timestamp"] = event_timestamp
+    device_event["last_change"] = datetime.fromtimestamp(round(event_timestamp))
+
+
+def _process_legacy(pages) -> dict:
+    device_events = {"gateway": {}, "switch": {}, "ap": {}, "mxedge": {}}
+    for events in pages:
+        for event in events:
+            handler = list_open_events.EVENT_HANDLERS.get(event.get("type"))
+            if handler:
+                _process_legacy_event(device_events, event, handler)
+    return device_events
+
+
+def _process_records(pages) -> dict:
+    # the progress messages of list_open_events are not displayed
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            device_events, _ = list_open_events._process_events(pages)
+    return device_events
+
+
+REPRESENTATIONS = {"legacy": _process_legacy, "records": _process_records}
+
+
+#####################################################################
+#### FUNCTIONS ####
+def _count_statuses(device_events: dict) -> int:
+    count = 0
+    for devices in device_events.values():
+        for device in devices.values():
+            if isinstance(device, dict):
+                for event_data in device["events"].values():
+                    if "status" in event_data:
+                        count += 1
+                    else:
+                        count += len(event_data) - 1
+            else:
+                count += sum(1 for _ in list_open_events._get_device_events(device))
+    return count
+
+
+def _run_benchmark(name: str, devices: int, ports: int) -> dict:
+    process = REPRESENTATIONS[name]
+    gc.collect()
+    start_time = time.perf_counter()
+    device_events = process(_generate_pages(devices, ports))
+    wall_time = round(time.perf_counter() - start_time, 3)
+    statuses = _count_statuses(device_events)
+    del device_events
+    gc.collect()
+
+    tracemalloc.start()
+    device_events = process(_generate_pages(devices, ports))
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del device_events
+    gc.collect()
+    result = {
+        "wall_time": wall_time,
+        "statuses": statuses,
+        "state_mb": round(current / 1024 / 1024, 1),
+        "peak_mb": round(peak / 1024 / 1024, 1),
+        "bytes_per_status": round(current / statuses) if statuses else None,
+    }
+    LOGGER.info("benchmark_event_state:_run_benchmark:%s: %s", name, result)
+    return result
+
+
+def start(devices: int = 10000, ports: int = 48) -> dict:
+    """
+    Start the benchmark
+
+    PARAMS
+    -------
+    devices : int, default 10000
+        number of devices (switches and gateways)
+    ports : int, default 48
+        number of ports per device
+
+    RETURNS
+    -------
+    dict
+        benchmark results, per representation
+    """
+    print(f"Processing the events of {devices} devices with {ports} ports")
+    results = {}
+    for name in REPRESENTATIONS:
+        print(f"Running {name} ".ljust(60, "."), end="", flush=True)
+        results[name] = _run_benchmark(name, devices, ports)
+        print(" done")
+
+    print()
+    print(
+        f"{'Representation':<16} {'Statuses':>10} {'State':>10} {'Peak':>10} "
+        f"{'Bytes/status':>13} {'Wall time':>10}"
+    )
+    print("".ljust(74, "-"))
+    for name, result in results.items():
+        print(
+            f"{name:<16} {result['statuses']:>10} {str(result['state_mb']) + 'MB':>10} "
+            f"{str(result['peak_mb']) + 'MB':>10} {str(result['bytes_per_status']):>13} "
+            f"{str(result['wall_time']) + 's':>10}"
+        )
+    legacy = results["legacy"]["state_mb"]
+    if legacy:
+        print()
+        print(
+            f"records vs legacy: state memory "
+            f"{(results['records']['state_mb'] - legacy) / legacy * 100:+.1f}%"
+        )
+    return results
+
+
+#####################################################################
+#### SCRIPT ENTRYPOINT ####
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the memory used by the list_open_events event status",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+python3 ./benchmark_event_state.py
+python3 ./benchmark_event_state.py -d 100000 -p 48
+        """,
+    )
+    parser.add_argument(
+        "-d", "--devices", type=int, default=10000, help="number of devices"
+    )
+    parser.add_argument(
+        "-p", "--ports", type=int, default=48, help="number of ports per device"
+    )
+    parser.add_argument(
+        "-l",
+        "--log_file",
+        default=LOG_FILE,
+        help="define the filepath/filename where to write the logs",
+    )
+    args = parser.parse_args()
+
+    #### LOGS ####
+    logging.basicConfig(filename=args.log_file, filemode="w")
+    LOGGER.setLevel(logging.DEBUG)
+
+    start(devices=max(1, args.devices), ports=max(0, args.ports))
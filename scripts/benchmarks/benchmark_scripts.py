@@ -0,0 +1,530 @@
+"""
+-------------------------------------------------------------------------------
+
+    Written by Thomas Munzer (tmunzer@juniper.net)
+    Github repository: https://github.com/tmunzer/Mist_library/
+
+    This script is licensed under the MIT License.
+
+-------------------------------------------------------------------------------
+Python script to benchmark the mist_library scripts against a synthetic org
+served by the local mock server (utils/mist_mock_server.py).
+
+The following scripts are benchmarked (in this order):
+- org_conf_backup: backup of the synthetic org
+- org_conf_deploy: deployment of the backup to an empty org
+- export_search: export of the device events
+- list_open_events: processing of the device events
+- import_client_macs: import of the client MAC addresses
+
+Each script is run in a dedicated process, with its output discarded. For each
+script, the benchmark reports:
+- the wall time
+- the number of API requests received by the mock server (and the number of
+  HTTP 429)
+- the peak RSS (memory) of the process
+- the throughput (objects processed and API requests per second)
+
+The results are saved in a JSON file, with the git version of the repository.
+A previous results file can be used with the "-c" option to display the
+difference between the two versions.
+
+The client side rate limiter (utils/mist_rate_limiter.py) is disabled by
+default, the API rate limit is emulated by the mock server ("--rate_limit").
+
+-------
+Requirements:
+mistapi: https://pypi.org/project/mistapi/
+
+-------
+Usage:
+This script can be run as is (without parameters), or with the options below.
+
+-------
+Script Parameters:
+-h, --help              display this help
+-f, --fixtures=         path to a fixtures file generated by synthetic_org.py.
+                        If not set, a new org is generated
+-s, --size=             size of the generated org: small, medium or large
+                        default is "small"
+-b, --benchmarks=       comma separated list of the benchmarks to run
+                        default is all the benchmarks
+-w, --workers=          number of workers used by the scripts supporting it
+                        default is 1
+--latency=              latency (in milliseconds) added by the mock server
+                        default is 0
+--jitter=               maximum random latency (in milliseconds) added by the
+                        mock server
+                        default is 0
+--error_rate=           ratio of the requests rejected with a HTTP 429 (0-1)
+                        default is 0
+--rate_limit=           number of requests per hour allowed by the mock server
+                        default is 0 (no limit)
+-o, --out_file=         path to the JSON file where to save the results
+                        default is "./benchmark_results.json"
+-c, --compare=          path to a previous results file to compare with
+-l, --log_file=         define the filepath/filename where to write the logs
+                        default is "./script.log"
+
+-------
+Examples:
+python3 ./benchmark_scripts.py
+python3 ./benchmark_scripts.py --size=medium --latency=50 -o ./results_v2.json \
+        -c ./results_v1.json
+python3 ./benchmark_scripts.py -f ./large_org.json -b org_conf_backup -w 8
+"""
+
+#### IMPORTS ####
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+try:
+    import mistapi
+except ImportError:
+    print(
+        """
+        Critical:
+        \"mistapi\" package is missing. Please use the pip command to install it.
+
+        # Linux/macOS
+        python3 -m pip install mistapi
+
+        # Windows
+        py -m pip install mistapi
+        """
+    )
+    sys.exit(2)
+
+SCRIPTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(SCRIPTS_FOLDER, "utils"))
+try:
+    import mist_mock_server
+    import synthetic_org
+except ImportError:
+    print(
+        """
+        Critical:
+        This script is using other scripts from the mist_library to perform all the
+        action. Please make sure the following python files are available:
+            - utils/mist_mock_server.py
+            - benchmarks/synthetic_org.py
+        """
+    )
+    sys.exit(2)
+
+#####################################################################
+#### PARAMETERS #####
+OUT_FILE = "./benchmark_results.json"
+LOG_FILE = "./script.log"
+RESULTS_VERSION = 1
+TIMEOUT = 6 * 3600
+# no client side rate limit, the rate limit is emulated by the mock server
+CLIENT_RATE_LIMIT = 1000000000
+# benchmark name: script folder, objects used to compute the throughput
+BENCHMARKS = {
+    "org_conf_backup": ("orgs", "sites"),
+    "org_conf_deploy": ("orgs", "sites"),
+    "export_search": ("exports", "events"),
+    "list_open_events": ("reports", "events"),
+    "import_client_macs": ("nac", "client_macs"),
+}
+COMPARED_METRICS = ["wall_time", "requests", "peak_rss_kb"]
+
+#####################################################################
+#### LOGS ####
+LOGGER = logging.getLogger(__name__)
+
+
+#####################################################################
+#### BENCHMARKS ####
+# functions run in the benchmark process, with the script module and the
+# benchmark configuration
+def _run_org_conf_backup(module, mist_session, config: dict) -> None:
+    module.start(
+        mist_session,
+        config["src_org_id"],
+        backup_folder_param=os.path.join(config["work_folder"], "org_backup"),
+        backup_name="benchmark",
+        workers=config["workers"],
+    )
+
+
+def _run_org_conf_deploy(module, mist_session, config: dict) -> None:
+    # the confirmation is sent on stdin by the benchmark
+    module.start(
+        mist_session,
+        org_id=config["dst_org_id"],
+        org_name=config["dst_org_name"],
+        backup_folder_param=os.path.join(config["work_folder"], "org_backup"),
+        source_backup="benchmark",
+        workers=config["workers"],
+    )
+
+
+def _run_export_search(module, mist_session, config: dict) -> None:
+    module.OUT_FILE_FORMAT = "json"
+    module.start(
+        mist_session,
+        scope="org",
+        scope_id=config["src_org_id"],
+        report="device_events",
+        query_params={"duration": "1d", "limit": 1000},
+        file_prefix=os.path.join(config["work_folder"], "export"),
+    )
+
+
+def _run_list_open_events(module, mist_session, config: dict) -> None:
+    module.start(
+        mist_session,
+        config["src_org_id"],
+        view="continue",
+        csv_file=os.path.join(config["work_folder"], "list_open_events.csv"),
+    )
+
+
+def _run_import_client_macs(module, mist_session, config: dict) -> None:
+    module.start(
+        mist_session,
+        config["src_org_id"],
+        csv_file=config["client_macs_file"],
+        autocreate=True,
+        default_label="label_0",
+    )
+
+
+def _run_benchmark(name: str, config_file: str, result_file: str) -> None:
+    """
+    Run a benchmark in the current process and save the wall time and peak RSS
+    in `result_file`
+    """
+    with open(config_file, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    folder, _ = BENCHMARKS[name]
+    sys.path.insert(0, os.path.join(SCRIPTS_FOLDER, folder))
+    os.environ["MIST_RATE_LIMIT"] = str(config["client_rate_limit"])
+    module = __import__(name)
+    mist_session = mist_mock_server.connect(mistapi.APISession(), config["url"])
+    result = {"exit_code": 0}
+    start_time = time.perf_counter()
+    try:
+        globals()[f"_run_{name}"](module, mist_session, config)
+    except SystemExit as e:
+        result["exit_code"] = e.code if isinstance(e.code, int) else 1
+    except Exception:
+        LOGGER.error("Exception occurred", exc_info=True)
+        result["exit_code"] = 255
+    result["wall_time"] = round(time.perf_counter() - start_time, 3)
+    result["peak_rss_kb"] = None
+    if resource:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS, in kilobytes on Linux
+        result["peak_rss_kb"] = peak_rss // 1024 if sys.platform == "darwin" else peak_rss
+    with open(result_file, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+#####################################################################
+#### FUNCTIONS ####
+def _get_version() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=SCRIPTS_FOLDER,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def _start_benchmark(
+    name: str, server: mist_mock_server.MockServer, config: dict, log_file: str
+) -> dict:
+    print(f"Running {name} ".ljust(60, "."), end="", flush=True)
+    config_file = os.path.join(config["work_folder"], f"{name}_config.json")
+    result_file = os.path.join(config["work_folder"], f"{name}_result.json")
+    with open(config_file, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    server.reset_stats()
+    with open(log_file, "a", encoding="utf-8") as log:
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run", name, config_file, result_file],
+            input="y\n" * 10,
+            stdout=subprocess.DEVNULL,
+            stderr=log,
+            text=True,
+            cwd=config["work_folder"],
+            timeout=TIMEOUT,
+            check=False,
+        )
+    stats = server.get_stats()
+    try:
+        with open(result_file, "r", encoding="utf-8") as f:
+            result = json.load(f)
+    except Exception:
+        result = {"exit_code": process.returncode, "wall_time": None, "peak_rss_kb": None}
+    items = config["info"][BENCHMARKS[name][1]]
+    wall_time = result["wall_time"]
+    result.update(
+        {
+            "requests": stats["requests"],
+            "throttled": stats["throttled"],
+            "bytes": stats["bytes"],
+            "items": items,
+            "items_per_second": round(items / wall_time, 2) if wall_time else None,
+            "requests_per_second": (
+                round(stats["requests"] / wall_time, 2) if wall_time else None
+            ),
+        }
+    )
+    print(" done" if result["exit_code"] == 0 else f" failed ({result['exit_code']})")
+    LOGGER.info("benchmark_scripts:_start_benchmark:%s: %s", name, result)
+    return result
+
+
+def _display_results(results: dict, previous: dict | None = None) -> None:
+    print()
+    print(
+        f"{'Benchmark':<20} {'Wall time':>10} {'Requests':>9} {'429':>5} "
+        f"{'Peak RSS':>10} {'Items/s':>10} {'Req/s':>8}"
+    )
+    print("".ljust(78, "-"))
+    for name, result in results.items():
+        peak_rss = result["peak_rss_kb"]
+        print(
+            f"{name:<20} {str(result['wall_time']) + 's':>10} {result['requests']:>9} "
+            f"{result['throttled']:>5} "
+            f"{(str(round(peak_rss / 1024)) + 'MB') if peak_rss else 'N/A':>10} "
+            f"{str(result['items_per_second']):>10} {str(result['requests_per_second']):>8}"
+        )
+    if not previous:
+        return
+    print()
+    print(f"Compared with {previous.get('git_version')} ({previous.get('date')}):")
+    for name, result in results.items():
+        previous_result = previous.get("results", {}).get(name)
+        if not previous_result:
+            continue
+        changes = []
+        for metric in COMPARED_METRICS:
+            old = previous_result.get(metric)
+            new = result.get(metric)
+            if old and new is not None:
+                changes.append(f"{metric} {(new - old) / old * 100:+.1f}%")
+        print(f"  {name:<20} {', '.join(changes)}")
+
+
+def start(
+    fixtures_file: str = "",
+    size: str = "small",
+    benchmarks: list | None = None,
+    workers: int = 1,
+    latency: float = 0,
+    jitter: float = 0,
+    error_rate: float = 0,
+    rate_limit: int = 0,
+    out_file: str = OUT_FILE,
+    compare_file: str = "",
+    log_file: str = LOG_FILE,
+) -> dict:
+    """
+    Start the benchmarks
+
+    PARAMS
+    -------
+    fixtures_file : str
+        path to a fixtures file generated by synthetic_org.py. If not set, a
+        new org is generated
+    size : str, default "small"
+        size of the generated org (see `synthetic_org.SIZES`)
+    benchmarks : list
+        list of the benchmarks to run. default is all the benchmarks
+    workers : int, default 1
+        number of workers used by the scripts supporting it
+    latency : float, default 0
+        latency (in milliseconds) added by the mock server
+    jitter : float, default 0
+        maximum random latency (in milliseconds) added by the mock server
+    error_rate : float, default 0
+        ratio of the requests rejected with a HTTP 429 by the mock server
+    rate_limit : int, default 0
+        number of requests per hour allowed by the mock server
+    out_file : str
+        path to the JSON file where to save the results
+    compare_file : str
+        path to a previous results file to compare with
+    log_file : str
+        path to the log file. The errors of the benchmarked scripts are added
+        to this file
+
+    RETURNS
+    -------
+    dict
+        benchmark results
+    """
+    log_file = os.path.abspath(log_file)
+    out_file = os.path.abspath(out_file)
+    if not benchmarks:
+        benchmarks = list(BENCHMARKS)
+    for name in benchmarks:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark {name}. Possible values: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+
+    with tempfile.TemporaryDirectory(prefix="mist_benchmark_") as work_folder:
+        if fixtures_file:
+            print(f"Loading fixtures from {fixtures_file}")
+            with open(fixtures_file, "r", encoding="utf-8") as f:
+                fixtures = json.load(f)
+            client_macs_file = os.path.abspath(
+                synthetic_org.get_client_macs_file(fixtures_file)
+            )
+        else:
+            print(f"Generating a {size} synthetic org")
+            fixtures, client_macs = synthetic_org.generate_org(**synthetic_org.SIZES[size])
+            client_macs_file = os.path.join(work_folder, "client_macs.csv")
+            synthetic_org.save_client_macs(client_macs_file, client_macs)
+        info = fixtures["info"]
+        print(json.dumps(info))
+
+        server = mist_mock_server.MockServer(
+            fixtures,
+            latency=latency,
+            jitter=jitter,
+            error_rate=error_rate,
+            rate_limit=rate_limit,
+        )
+        config = {
+            **info,
+            "info": info,
+            "url": server.url,
+            "work_folder": work_folder,
+            "client_macs_file": client_macs_file,
+            "workers": workers,
+            "client_rate_limit": CLIENT_RATE_LIMIT,
+        }
+        results = {}
+        with server:
+            for name in benchmarks:
+                results[name] = _start_benchmark(name, server, config, log_file)
+
+    output = {
+        "version": RESULTS_VERSION,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_version": _get_version(),
+        "python": platform.python_version(),
+        "mistapi": mistapi.__version__,
+        "platform": platform.platform(),
+        "org": info,
+        "mock_server": {
+            "latency": latency,
+            "jitter": jitter,
+            "error_rate": error_rate,
+            "rate_limit": rate_limit,
+        },
+        "workers": workers,
+        "results": results,
+    }
+    previous = None
+    if compare_file:
+        try:
+            with open(compare_file, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        except Exception:
+            LOGGER.error("Exception occurred", exc_info=True)
+            print(f"Unable to load the results file {compare_file}")
+    _display_results(results, previous)
+    with open(out_file, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print()
+    print(f"Results saved to {out_file}")
+    return output
+
+
+#####################################################################
+#### SCRIPT ENTRYPOINT ####
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--run":
+        # benchmark process, started by `_start_benchmark`
+        logging.basicConfig(stream=sys.stderr, level=logging.ERROR)
+        _run_benchmark(sys.argv[2], sys.argv[3], sys.argv[4])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the mist_library scripts with a synthetic org",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+python3 ./benchmark_scripts.py
+python3 ./benchmark_scripts.py --size=medium --latency=50 -o ./results_v2.json \
+        -c ./results_v1.json
+python3 ./benchmark_scripts.py -f ./large_org.json -b org_conf_backup -w 8
+        """,
+    )
+    parser.add_argument("-f", "--fixtures", default="", help="path to a fixtures file")
+    parser.add_argument(
+        "-s",
+        "--size",
+        choices=list(synthetic_org.SIZES),
+        default="small",
+        help="size of the generated org",
+    )
+    parser.add_argument(
+        "-b", "--benchmarks", default="", help="comma separated list of benchmarks"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="number of workers"
+    )
+    parser.add_argument("--latency", type=float, default=0, help="latency (in ms)")
+    parser.add_argument("--jitter", type=float, default=0, help="random latency (in ms)")
+    parser.add_argument(
+        "--error_rate", type=float, default=0, help="ratio of HTTP 429 (0-1)"
+    )
+    parser.add_argument(
+        "--rate_limit", type=int, default=0, help="number of requests per hour"
+    )
+    parser.add_argument(
+        "-o", "--out_file", default=OUT_FILE, help="path to the results file"
+    )
+    parser.add_argument(
+        "-c", "--compare", default="", help="path to a previous results file"
+    )
+    parser.add_argument(
+        "-l",
+        "--log_file",
+        default=LOG_FILE,
+        help="define the filepath/filename where to write the logs",
+    )
+    args = parser.parse_args()
+
+    #### LOGS ####
+    logging.basicConfig(filename=args.log_file, filemode="w")
+    LOGGER.setLevel(logging.DEBUG)
+
+    start(
+        fixtures_file=args.fixtures,
+        size=args.size,
+        benchmarks=[name.strip() for name in args.benchmarks.split(",") if name.strip()],
+        workers=max(1, args.workers),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        out_file=args.out_file,
+        compare_file=args.compare,
+        log_file=args.log_file,
+    )
@@ -0,0 +1,442 @@
+"""
+-------------------------------------------------------------------------------
+
+    Written by Thomas Munzer (tmunzer@juniper.net)
+    Github repository: https://github.com/tmunzer/Mist_library/
+
+    This script is licensed under the MIT License.
+
+-------------------------------------------------------------------------------
+Python script to generate a synthetic Mist organization. The generated data
+are saved in a fixtures file which can be used with the local mock server
+(utils/mist_mock_server.py) to test and benchmark the mist_library scripts
+without a Mist Cloud.
+
+The fixtures contain:
+- a source org, with its sites, org objects (WLANs, templates, site groups,
+  ...), devices, inventory, PSKs, client MAC labels and device events
+- an empty destination org, to test the deploy scripts
+- the objects of each site (settings, WLANs, maps)
+
+A CSV file with client MAC addresses (for import_client_macs.py) is saved next
+to the fixtures file.
+
+The data are generated with a fixed seed, so the same parameters are always
+generating the same org.
+
+-------
+Requirements:
+No additional package is required
+
+-------
+Usage:
+This script can be run as is (without parameters), or with the options below.
+
+-------
+Script Parameters:
+-h, --help              display this help
+-f, --fixtures=         path to the fixtures file to generate
+                        default is "./synthetic_org.json"
+-s, --size=             size of the org: small, medium or large
+                        default is "small"
+--sites=                number of sites (overrides the size)
+--devices=              number of devices (overrides the size)
+--psks=                 number of PSKs (overrides the size)
+--client_macs=          number of client MAC addresses (overrides the size)
+--events=               number of device events (overrides the size)
+--seed=                 seed of the random values
+                        default is 0
+
+-------
+Examples:
+python3 ./synthetic_org.py
+python3 ./synthetic_org.py --size=large -f ./large_org.json
+python3 ./synthetic_org.py --sites=2000 --devices=40000 --events=200000
+"""
+
+#### IMPORTS ####
+import argparse
+import csv
+import json
+import os
+import random
+import time
+import uuid
+
+#####################################################################
+#### PARAMETERS #####
+DEFAULT_FIXTURES_FILE = "./synthetic_org.json"
+SRC_ORG_NAME = "Synthetic Org"
+DST_ORG_NAME = "Synthetic Org Deploy"
+SIZES = {
+    "small": {
+        "sites": 50,
+        "devices": 1000,
+        "psks": 500,
+        "client_macs": 1000,
+        "events": 10000,
+    },
+    "medium": {
+        "sites": 1000,
+        "devices": 20000,
+        "psks": 5000,
+        "client_macs": 10000,
+        "events": 100000,
+    },
+    "large": {
+        "sites": 10000,
+        "devices": 200000,
+        "psks": 50000,
+        "client_macs": 100000,
+        "events": 500000,
+    },
+}
+# number of org objects, independent of the org size
+ORG_OBJECTS = {
+    "wlans": 10,
+    "templates": 5,
+    "rftemplates": 5,
+    "networktemplates": 5,
+    "sitegroups": 20,
+}
+CLIENT_MAC_LABELS = 10
+EVENTS_DURATION = 86400
+# device type: (ratio, model, trigger/clear event types)
+DEVICE_TYPES = {
+    "ap": (0.7, "AP45", [("AP_DISCONNECTED", "AP_CONNECTED"), ("AP_PORT_DOWN", "AP_PORT_UP")]),
+    "switch": (0.25, "EX4100-48P", [("SW_DISCONNECTED", "SW_CONNECTED"), ("SW_PORT_DOWN", "SW_PORT_UP")]),
+    "gateway": (0.05, "SRX320", [("GW_DISCONNECTED", "GW_CONNECTED"), ("GW_PORT_DOWN", "GW_PORT_UP")]),
+}
+
+
+#####################################################################
+#### GENERATOR ####
+class _Generator:
+    def __init__(self, seed: int):
+        self.random = random.Random(seed)
+        self.mac_index = 0
+
+    def uuid(self) -> str:
+        return str(uuid.UUID(int=self.random.getrandbits(128), version=4))
+
+    def mac(self, prefix: str = "5c5b35") -> str:
+        self.mac_index += 1
+        return f"{prefix}{self.mac_index:06x}"
+
+
+def _generate_org_objects(gen: _Generator, org_id: str) -> dict:
+    objects = {}
+    for object_type, count in ORG_OBJECTS.items():
+        objects[object_type] = [
+            {
+                "id": gen.uuid(),
+                "org_id": org_id,
+                "name": f"{object_type}_{i}",
+            }
+            for i in range(count)
+        ]
+    for wlan in objects["wlans"]:
+        wlan["ssid"] = wlan["name"]
+        wlan["template_id"] = gen.random.choice(objects["templates"])["id"]
+        wlan["auth"] = {"type": "psk", "psk": "synthetic"}
+        wlan["vlan_enabled"] = True
+        wlan["vlan_id"] = gen.random.randint(2, 4000)
+    return objects
+
+
+def _generate_sites(gen: _Generator, org_id: str, count: int, objects: dict) -> list:
+    sites = []
+    for i in range(count):
+        sites.append(
+            {
+                "id": gen.uuid(),
+                "org_id": org_id,
+                "name": f"site_{i:05d}",
+                "timezone": "Europe/Paris",
+                "country_code": "FR",
+                "address": f"{i} rue de la Paix, Paris, France",
+                "latlng": {
+                    "lat": round(gen.random.uniform(43, 50), 6),
+                    "lng": round(gen.random.uniform(-1, 7), 6),
+                },
+                "sitegroup_ids": [gen.random.choice(objects["sitegroups"])["id"]],
+                "rftemplate_id": gen.random.choice(objects["rftemplates"])["id"],
+                "networktemplate_id": gen.random.choice(objects["networktemplates"])["id"],
+                "modified_time": 1700000000,
+            }
+        )
+    return sites
+
+
+def _generate_site_objects(gen: _Generator, org_id: str, site: dict) -> dict:
+    site_id = site["id"]
+    return {
+        f"/api/v1/sites/{site_id}": site,
+        f"/api/v1/sites/{site_id}/setting": {
+            "site_id": site_id,
+            "org_id": org_id,
+            "vars": {"site_name": site["name"], "vlan": str(gen.random.randint(2, 4000))},
+        },
+        f"/api/v1/sites/{site_id}/wlans": [
+            {
+                "id": gen.uuid(),
+                "org_id": org_id,
+                "site_id": site_id,
+                "ssid": f"{site['name']}_guest",
+                "auth": {"type": "open"},
+            }
+        ],
+        f"/api/v1/sites/{site_id}/maps": [
+            {
+                "id": gen.uuid(),
+                "org_id": org_id,
+                "site_id": site_id,
+                "name": "Floor 1",
+                "type": "image",
+                "width": 1000,
+                "height": 800,
+                "ppm": 20,
+            }
+        ],
+    }
+
+
+def _generate_devices(gen: _Generator, org_id: str, sites: list, count: int) -> list:
+    devices = []
+    types = list(DEVICE_TYPES)
+    weights = [DEVICE_TYPES[device_type][0] for device_type in types]
+    for i in range(count):
+        device_type = gen.random.choices(types, weights)[0]
+        mac = gen.mac()
+        site = sites[i % len(sites)] if sites else {}
+        devices.append(
+            {
+                "id": f"00000000-0000-0000-1000-{mac}",
+                "mac": mac,
+                "serial": f"SN{i:010d}",
+                "magic": f"CLAIM{i:010d}",
+                "name": f"{device_type}_{i:06d}",
+                "type": device_type,
+                "model": DEVICE_TYPES[device_type][1],
+                "org_id": org_id,
+                "site_id": site.get("id"),
+                "connected": True,
+            }
+        )
+    return devices
+
+
+def _generate_events(gen: _Generator, devices: list, count: int, now: int) -> list:
+    events = []
+    if not devices:
+        return events
+    while len(events) < count:
+        device = gen.random.choice(devices)
+        trigger, clear = gen.random.choice(DEVICE_TYPES[device["type"]][2])
+        timestamp = now - gen.random.uniform(0, EVENTS_DURATION)
+        # ~70% of the triggered events are cleared
+        pairs = [trigger, clear] if gen.random.random() < 0.7 else [trigger]
+        for event_type in pairs:
+            event = {
+                "type": event_type,
+                "timestamp": round(timestamp, 3),
+                "org_id": device["org_id"],
+                "site_id": device["site_id"],
+                "mac": device["mac"],
+                "device_type": device["type"],
+                "device_model": device["model"],
+                "device_version": "1.0.0",
+                "text": f"{event_type} on {device['name']}",
+            }
+            if "PORT" in event_type:
+                event["port_id"] = f"ge-0/0/{gen.random.randint(0, 47)}"
+            events.append(event)
+            timestamp += gen.random.uniform(1, 600)
+    events = events[:count]
+    # the Mist Cloud is returning the most recent events first
+    events.sort(key=lambda event: event["timestamp"], reverse=True)
+    return events
+
+
+def _generate_psks(gen: _Generator, org_id: str, count: int, objects: dict) -> list:
+    ssids = [wlan["ssid"] for wlan in objects["wlans"]]
+    return [
+        {
+            "id": gen.uuid(),
+            "org_id": org_id,
+            "name": f"psk_{i:06d}",
+            "passphrase": f"passphrase_{gen.random.getrandbits(48):012x}",
+            "ssid": ssids[i % len(ssids)],
+            "usage": "multi",
+            "vlan_id": gen.random.randint(2, 4000),
+        }
+        for i in range(count)
+    ]
+
+
+def _generate_nactags(gen: _Generator, org_id: str, client_macs: list) -> list:
+    # the labels already contain some of the MAC addresses to import
+    nactags = []
+    for i in range(CLIENT_MAC_LABELS):
+        nactags.append(
+            {
+                "id": gen.uuid(),
+                "org_id": org_id,
+                "name": f"label_{i}",
+                "type": "match",
+                "match": "client_mac",
+                "values": [mac for mac, label in client_macs[: len(client_macs) // 10] if label == f"label_{i}"],
+            }
+        )
+    return nactags
+
+
+def generate_org(
+    sites: int,
+    devices: int,
+    psks: int,
+    client_macs: int,
+    events: int,
+    seed: int = 0,
+) -> tuple:
+    """
+    Generate a synthetic org
+
+    PARAMS
+    -----------
+    sites : int
+        number of sites
+    devices : int
+        number of devices
+    psks : int
+        number of PSKs
+    client_macs : int
+        number of client MAC addresses to import
+    events : int
+        number of device events
+    seed : int, default 0
+        seed of the random values
+
+    RETURN
+    -----------
+    tuple
+        fixtures for the mock server ({"routes": {...}, "info": {...}}), and
+        the list of client MAC addresses with their label ([(mac, label)])
+    """
+    gen = _Generator(seed)
+    now = int(time.time())
+    src_org_id = gen.uuid()
+    dst_org_id = gen.uuid()
+    routes = {}
+    routes["/api/v1/self"] = {
+        "email": "benchmark@example.com",
+        "privileges": [
+            {"scope": "org", "org_id": org_id, "name": name, "role": "admin"}
+            for org_id, name in [(src_org_id, SRC_ORG_NAME), (dst_org_id, DST_ORG_NAME)]
+        ],
+    }
+    routes[f"/api/v1/orgs/{dst_org_id}"] = {"id": dst_org_id, "name": DST_ORG_NAME}
+    routes[f"/api/v1/orgs/{dst_org_id}/sites"] = []
+    routes[f"/api/v1/orgs/{src_org_id}"] = {"id": src_org_id, "name": SRC_ORG_NAME}
+    routes[f"/api/v1/orgs/{src_org_id}/setting"] = {"password_policy": {"enabled": False}}
+
+    objects = _generate_org_objects(gen, src_org_id)
+    for object_type, data in objects.items():
+        routes[f"/api/v1/orgs/{src_org_id}/{object_type}"] = data
+    site_list = _generate_sites(gen, src_org_id, sites, objects)
+    routes[f"/api/v1/orgs/{src_org_id}/sites"] = site_list
+    for site in site_list:
+        routes.update(_generate_site_objects(gen, src_org_id, site))
+
+    device_list = _generate_devices(gen, src_org_id, site_list, devices)
+    routes[f"/api/v1/orgs/{src_org_id}/devices"] = device_list
+    routes[f"/api/v1/orgs/{src_org_id}/inventory"] = device_list
+    routes[f"/api/v1/orgs/{src_org_id}/devices/events/search"] = {
+        "results": _generate_events(gen, device_list, events, now),
+        "start": now - EVENTS_DURATION,
+        "end": now,
+    }
+    routes[f"/api/v1/orgs/{src_org_id}/psks"] = _generate_psks(
+        gen, src_org_id, psks, objects
+    )
+
+    mac_list = [
+        (gen.mac("a8f7e0"), f"label_{gen.random.randrange(CLIENT_MAC_LABELS)}")
+        for _ in range(client_macs)
+    ]
+    routes[f"/api/v1/orgs/{src_org_id}/nactags"] = _generate_nactags(
+        gen, src_org_id, mac_list
+    )
+
+    info = {
+        "src_org_id": src_org_id,
+        "src_org_name": SRC_ORG_NAME,
+        "dst_org_id": dst_org_id,
+        "dst_org_name": DST_ORG_NAME,
+        "sites": sites,
+        "devices": devices,
+        "psks": psks,
+        "client_macs": client_macs,
+        "events": events,
+        "seed": seed,
+    }
+    return {"routes": routes, "info": info}, mac_list
+
+
+def save_client_macs(csv_file: str, client_macs: list) -> None:
+    """
+    Save the client MAC addresses in a CSV file (import_client_macs.py format)
+    """
+    with open(csv_file, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["mac", "label"])
+        writer.writerows(client_macs)
+
+
+def get_client_macs_file(fixtures_file: str) -> str:
+    """
+    Return the path to the CSV file saved with the fixtures file
+    """
+    return f"{os.path.splitext(fixtures_file)[0]}_client_macs.csv"
+
+
+#####################################################################
+#### SCRIPT ENTRYPOINT ####
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic Mist organization for the mock server",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+python3 ./synthetic_org.py
+python3 ./synthetic_org.py --size=large -f ./large_org.json
+python3 ./synthetic_org.py --sites=2000 --devices=40000 --events=200000
+        """,
+    )
+    parser.add_argument(
+        "-f",
+        "--fixtures",
+        default=DEFAULT_FIXTURES_FILE,
+        help="path to the fixtures file to generate",
+    )
+    parser.add_argument(
+        "-s", "--size", choices=list(SIZES), default="small", help="size of the org"
+    )
+    for parameter in SIZES["small"]:
+        parser.add_argument(
+            f"--{parameter}", type=int, help=f"number of {parameter} (overrides the size)"
+        )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random values")
+    args = parser.parse_args()
+
+    SIZE = dict(SIZES[args.size])
+    for PARAMETER in SIZE:
+        if getattr(args, PARAMETER) is not None:
+            SIZE[PARAMETER] = getattr(args, PARAMETER)
+
+    FIXTURES, CLIENT_MACS = generate_org(**SIZE, seed=args.seed)
+    with open(args.fixtures, "w", encoding="utf-8") as f:
+        json.dump(FIXTURES, f)
+    save_client_macs(get_client_macs_file(args.fixtures), CLIENT_MACS)
+    print(f"Fixtures saved to {args.fixtures}")
+    print(json.dumps(FIXTURES["info"], indent=2))
@@ -40,6 +40,9 @@ Options:
 -d, --datetime      append the current date and time (ISO format) to the
                     backup name 
 -t, --timestamp     append the timestamp at the end of the report and summary files
+-s, --slices=       number of time slices used to retrieve the events. When set to more
+                    than 1, the duration is split in time slices retrieved concurrently
+                    default is 1
 
 -l, --log_file=     define the filepath/filename where to write the logs
                     default is {LOG_FILE}
@@ -66,6 +69,7 @@ import os
 import logging
 import getopt
 import datetime
+import functools
 
 MISTAPI_MIN_VERSION = "0.52.4"
 
@@ -88,11 +92,37 @@ except:
     )
     sys.exit(2)
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+try:
+    import mist_pagination
+    import mist_rate_limiter
+except ImportError:
+    print(
+        """
+        Critical:
+        This script is using other scripts from the mist_library to perform all the
+        action. Please make sure the following python files are in the "utils" folder
+        of the mist_library:
+            - mist_pagination.py
+            - mist_rate_limiter.py
+        """
+    )
+    sys.exit(2)
+
 
 #### PARAMETERS #####
 
 LOG_FILE = "./script.log"
 ENV_FILE = os.path.join(os.path.expanduser("~"), ".mist_env")
+QUERY_PARAMS_TYPE = {
+    "device_type": str,
+    "mac": str,
+    "model": str,
+    "text": str,
+    "type": str,
+    "duration": str,
+    "limit": int,
+}
 
 
 #### LOGS ####
@@ -160,20 +190,11 @@ def _query_params(query_params_type: dict) -> dict:
 def _searchDeviceEvents(
     apisession: mistapi.APISession,
     org_id: str,
-    query_params: dict | None = None,
+    query_params: dict,
+    **kwargs,
 ):
-    query_params_type = {
-        "device_type": str,
-        "mac": str,
-        "model": str,
-        "text": str,
-        "type": str,
-        "duration": str,
-        "limit": int,
-    }
-
-    if not query_params:
-        query_params = _query_params(query_params_type)
+    if not kwargs:
+        kwargs["duration"] = query_params.get("duration", "1d")
     return mistapi.api.v1.orgs.devices.searchOrgDeviceEvents(
         apisession,
         org_id,
@@ -182,8 +203,8 @@ def _searchDeviceEvents(
         text=query_params.get("text"),
         type=query_params.get("type"),
         device_type=query_params.get("device_type"),
-        duration=query_params.get("duration", "1d"),
         limit=query_params.get("limit", 1000),
+        **kwargs,
     )
 
 
@@ -241,11 +262,49 @@ def _progress_bar_end(total: int, size: int):
 
 ####################
 ## REQUEST
+def _process_sliced_request(
+    apisession: mistapi.APISession,
+    scope_id: str,
+    query_params: dict,
+    slices: int,
+):
+    data = []
+    start, end = mist_pagination.get_time_range(query_params.get("duration", "1d"))
+
+    print(" Retrieving Data from Mist ".center(80, "-"))
+    print()
+
+    # the slices are retrieved concurrently, and returned from the most recent
+    # to the oldest
+    search = functools.partial(_searchDeviceEvents, apisession, scope_id, query_params)
+    size = 50
+    i = 0
+    total = len(mist_pagination.get_time_slices(start, end, slices))
+    for results in mist_pagination.iter_time_slices(
+        apisession, search, start, end, slices
+    ):
+        data.extend(results)
+        i += 1
+        _progress_bar_update(i, total, size)
+    _progress_bar_end(total, size)
+    print()
+    if data:
+        return start, end, data
+    else:
+        console.warning("There is no results for this search...")
+        sys.exit(0)
+
+
 def _process_request(
     apisession: mistapi.APISession,
     scope_id: str,
     query_params: dict | None = None,
+    slices: int = 1,
 ):
+    if not query_params:
+        query_params = _query_params(QUERY_PARAMS_TYPE)
+    if slices > 1:
+        return _process_sliced_request(apisession, scope_id, query_params, slices)
     data = []
     start = None
     end = None
@@ -401,10 +460,12 @@ def start(
     prefix: str = "org_events",
     append_dt: bool = False,
     append_ts: bool = False,
+    slices: int = 1,
 ):
+    mist_rate_limiter.attach(apisession)
     if not org_id:
         org_id = mistapi.cli.select_org(apisession)[0]
-    start, end, data = _process_request(apisession, org_id, query_params)
+    start, end, data = _process_request(apisession, org_id, query_params, slices)
     sites = _searchSites(apisession, org_id)
     _save_as_csv(start, end, query_params, data, prefix, append_dt, append_ts)
     summary = _gen_summary(apisession.get_cloud(), org_id, data, sites)
@@ -456,6 +517,9 @@ Options:
 -d, --datetime      append the current date and time (ISO format) to the
                     backup name 
 -t, --timestamp     append the timestamp at the end of the report and summary files
+-s, --slices=       number of time slices used to retrieve the events. When set to more
+                    than 1, the duration is split in time slices retrieved concurrently
+                    default is 1
 
 -l, --log_file=     define the filepath/filename where to write the logs
                     default is {LOG_FILE}
@@ -531,7 +595,7 @@ if __name__ == "__main__":
     try:
         opts, args = getopt.getopt(
             sys.argv[1:],
-            "ho:p:e:l:q:td",
+            "ho:p:e:l:q:tds:",
             [
                 "help",
                 "org_id=",
@@ -541,6 +605,7 @@ if __name__ == "__main__":
                 "q_params=",
                 "timestamp",
                 "datetime",
+                "slices=",
             ],
         )
     except getopt.GetoptError as err:
@@ -552,6 +617,7 @@ if __name__ == "__main__":
     APPEND_DT = False
     APPEND_TS = False
     FILE_PREFIX = "org_events"
+    SLICES = 1
     for o, a in opts:  # type: ignore
         if o in ["-h", "--help"]:
             usage()
@@ -580,6 +646,13 @@ if __name__ == "__main__":
                 usage(f"Unable to process param {a}")
             else:
                 QUERY_PARAMS[a.split(":")[0]] = a.split(":")[1]
+        elif o in ["-s", "--slices"]:
+            try:
+                SLICES = int(a)
+            except ValueError:
+                usage(f"Invalid slices value {a}")
+            if SLICES < 1:
+                usage(f"Invalid slices value {a}")
         elif o in ["-l", "--log_file"]:
             LOG_FILE = a
         else:
@@ -592,4 +665,6 @@ if __name__ == "__main__":
     ### START ###
     apisession = mistapi.APISession(env_file=ENV_FILE)
     apisession.login()
-    start(apisession, ORG_ID, QUERY_PARAMS, FILE_PREFIX, APPEND_DT, APPEND_TS)
+    start(
+        apisession, ORG_ID, QUERY_PARAMS, FILE_PREFIX, APPEND_DT, APPEND_TS, SLICES
+    )
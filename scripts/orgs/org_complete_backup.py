@@ -12,6 +12,15 @@ Python script to backup a whole organization configuration and devices.
 This script will not change/create/delete/touch any existing objects. It will 
 just retrieve every single object from the organization.
 
+Multiple organizations can be backed up in a single run (MSP mode), with a
+list of org_ids ("--org_ids") or with all the organizations of an MSP
+("--msp_id"). The organizations are backed up one after the other with the
+same API session, so all the requests share the same rate limit budget. The
+time spent on each organization is displayed at the end of the process, and
+saved in the "backup_report.json" file in the backup folder. When several
+organizations have the same name, the org_id is appended to the name of the
+backup of the next ones.
+
 -------
 Requirements:
 mistapi: https://pypi.org/project/mistapi/
@@ -51,17 +60,29 @@ Script Parameters:
                         backup name 
 -t, --timestamp         append the current timestamp to the backup 
 
+--org_ids=              MSP mode. Comma separated list of org_ids to backup
+-m, --msp_id=           MSP mode. msp_id of the MSP, all the orgs of the MSP
+                        will be backed up
+-w, --workers=          number of sites to backup at the same time
+                        default is 1
+
 -------
 Examples:
 python3 ./org_complete_backup.py
 python3 ./org_complete_backup.py \
     --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4
+python3 ./org_complete_backup.py -d --workers=8 \
+    --org_ids=203d3d02-xxxx-xxxx-xxxx-76896a3330f4,6374a757-xxxx-xxxx-xxxx-361e45b2d4ac
+python3 ./org_complete_backup.py -d --msp_id=b9e5ff32-xxxx-xxxx-xxxx-e5c7f7a3c2f0
 
 """
 
 #####################################################################
 #### IMPORTS ####
+import os
 import sys
+import json
+import time
 import logging
 import argparse
 import datetime
@@ -101,11 +122,30 @@ as the org_clone.py file:
     )
     sys.exit(2)
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+try:
+    import mist_pagination
+    import mist_rate_limiter
+except ImportError:
+    print(
+        """
+Critical: 
+This script is using other scripts from the mist_library to perform all the
+action. Please make sure the following python files are in the "utils" folder
+of the mist_library:
+    - mist_pagination.py
+    - mist_rate_limiter.py
+    """
+    )
+    sys.exit(2)
+
 #####################################################################
 #### PARAMETERS #####
 DEFAULT_BACKUP_FOLDER = "./org_backup"
 LOG_FILE = "./script.log"
 SRC_ENV_FILE = "~/.mist_env"
+DEFAULT_WORKERS = 1
+REPORT_FILE = "backup_report.json"
 
 #####################################################################
 #### LOGS ####
@@ -119,7 +159,8 @@ def _backup_org(
     org_id: str,
     backup_folder_param: str,
     backup_name: str,
-) -> None:
+    workers: int = DEFAULT_WORKERS,
+) -> bool:
     LOGGER.debug("org_complete_backup:_backup_org")
     LOGGER.debug("org_complete_backup:_backup_org:parameter:org_id: %s", org_id)
     LOGGER.debug(
@@ -132,14 +173,23 @@ def _backup_org(
 
     try:
         _print_new_step("Backing up SOURCE Org Configuration")
-        org_conf_backup.start(
+        return org_conf_backup.start(
             mist_session=source_mist_session,
             org_id=org_id,
             backup_folder_param=backup_folder_param,
             backup_name=backup_name,
+            workers=workers,
         )
+    except SystemExit:
+        # org_conf_backup exits when the backup can't continue, only the
+        # current org is stopped (unless the process was interrupted)
+        if org_conf_backup.SYS_EXIT:
+            raise
+        LOGGER.error("Exit occurred", exc_info=True)
+        return False
     except Exception:
-        sys.exit(255)
+        LOGGER.error("Exception occurred", exc_info=True)
+        return False
 
 
 #######
@@ -175,6 +225,113 @@ def _backup_inventory(
 #######
 
 
+def _init_result(org_id: str, org_name: str, backup_name: str) -> dict:
+    return {
+        "org_id": org_id,
+        "org_name": org_name,
+        "backup_name": backup_name,
+        "success": False,
+        "conf_duration": 0.0,
+        "inventory_duration": 0.0,
+        "requests": 0,
+        "throttled": 0,
+    }
+
+
+def _backup_complete_org(
+    source_mist_session: mistapi.APISession,
+    org_id: str,
+    org_name: str,
+    backup_folder_param: str,
+    backup_name: str,
+    workers: int = DEFAULT_WORKERS,
+) -> dict:
+    """
+    Backup the configuration and the inventory of an org, and return the time
+    spent and the number of API requests sent for each part of the backup
+    """
+    LOGGER.debug("org_complete_backup:_backup_complete_org")
+    LOGGER.debug(
+        "org_complete_backup:_backup_complete_org:parameter:org_id: %s", org_id
+    )
+    result = _init_result(org_id, org_name, backup_name)
+    budget = mist_rate_limiter.get_budget(source_mist_session)
+    # the backup scripts only restore the working directory when the backup is
+    # successful, it is restored here so the next org is saved in the right
+    # folder
+    current_folder = os.getcwd()
+    try:
+        start_time = time.monotonic()
+        success = _backup_org(
+            source_mist_session, org_id, backup_folder_param, backup_name, workers
+        )
+        result["conf_duration"] = round(time.monotonic() - start_time, 2)
+    finally:
+        os.chdir(current_folder)
+    if success:
+        start_time = time.monotonic()
+        try:
+            _backup_inventory(
+                source_mist_session, org_id, backup_folder_param, backup_name
+            )
+            result["success"] = True
+        except SystemExit:
+            # org_inventory_backup exits when the backup can't continue, only
+            # the current org is stopped
+            LOGGER.error("Exit occurred", exc_info=True)
+        except Exception:
+            LOGGER.error("Exception occurred", exc_info=True)
+        finally:
+            os.chdir(current_folder)
+        result["inventory_duration"] = round(time.monotonic() - start_time, 2)
+    else:
+        console.error(f"Unable to backup the configuration of the org {org_name}")
+    new_budget = mist_rate_limiter.get_budget(source_mist_session)
+    result["requests"] = new_budget["requests"] - budget["requests"]
+    result["throttled"] = new_budget["throttled"] - budget["throttled"]
+    LOGGER.info("org_complete_backup:_backup_complete_org:result: %s", result)
+    return result
+
+
+#######
+#######
+
+
+def _get_msp_org_ids(apisession: mistapi.APISession, msp_id: str) -> list:
+    response = mistapi.api.v1.msps.orgs.listMspOrgs(apisession, msp_id)
+    orgs = mist_pagination.get_all(apisession, response)
+    return [org["id"] for org in sorted(orgs, key=lambda org: org.get("name", ""))]
+
+
+def _print_report(results: list, report_path: str) -> None:
+    _print_new_step("Backup Report")
+    print(
+        f"{'Org Name':<30} {'Status':<8} {'Config':>9} {'Inventory':>10} "
+        f"{'Requests':>9} {'429':>5}"
+    )
+    print("".ljust(76, "-"))
+    for result in results:
+        print(
+            f"{result['org_name'][:30]:<30} "
+            f"{'success' if result['success'] else 'failed':<8} "
+            f"{result['conf_duration']:>8}s {result['inventory_duration']:>9}s "
+            f"{result['requests']:>9} {result['throttled']:>5}"
+        )
+    print()
+    try:
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump({"orgs": results}, f, indent=2)
+        print(f"Report saved to {report_path}")
+    except Exception as e:
+        print(e)
+        LOGGER.error("Exception occurred", exc_info=True)
+
+
+#######
+#######
+
+
 def _print_new_step(message) -> None:
     print()
     print("".center(80, "*"))
@@ -193,6 +350,7 @@ def start(
     backup_name: str = "",
     backup_name_date: bool = False,
     backup_name_ts: bool = False,
+    workers: int = DEFAULT_WORKERS,
 ) -> None:
     """
     Start the process to clone the src org to the dst org
@@ -215,6 +373,8 @@ def start(
     backup_name_ts : bool, default = False
         if `backup_name_ts`==`True`, append the current timestamp to the backup
         name
+    workers : int, default = 1
+        number of sites to backup at the same time
     """
     LOGGER.debug("org_complete_backup:start")
     LOGGER.debug("org_complete_backup:start:parameter:org_id: %s", org_id)
@@ -243,9 +403,113 @@ def start(
     elif backup_name_ts:
         backup_name = f"{backup_name}_{round(datetime.datetime.timestamp(datetime.datetime.now()))}"
 
-    _backup_org(apisession, org_id, backup_folder_param, backup_name)
-    _backup_inventory(apisession, org_id, backup_folder_param, backup_name)
+    result = _backup_complete_org(
+        apisession, org_id, org_name, backup_folder_param, backup_name, workers
+    )
+    if not result["success"]:
+        sys.exit(255)
+    _print_new_step("Process finished")
+
+
+def start_msp(
+    apisession: mistapi.APISession,
+    org_ids: list | None = None,
+    msp_id: str = "",
+    backup_folder_param: str = "",
+    backup_name_date: bool = False,
+    backup_name_ts: bool = False,
+    workers: int = DEFAULT_WORKERS,
+) -> list:
+    """
+    Start the process to backup multiple orgs. The orgs are backed up one after
+    the other with the same API session (and rate limit budget)
+
+    PARAMS
+    -------
+    apisession : mistapi.APISession
+        mistapi session with `Super User` access the source Orgs, already logged in
+    org_ids : list
+        list of org_ids to backup. Required if `msp_id` is not set
+    msp_id : str
+        msp_id of the MSP. If `org_ids` is not set, all the orgs of the MSP are
+        backed up
+    backup_folder_param : str
+        Path to the folder where to save the org backups (a subfolder will be
+        created with each org name, and the org_id if another org has the same
+        name). default is "./org_backup"
+    backup_name_date : bool, default = False
+        if `backup_name_date`==`True`, append the date and time (ISO format) of
+        the beginning of the process to the backup names
+    backup_name_ts : bool, default = False
+        if `backup_name_ts`==`True`, append the timestamp of the beginning of the
+        process to the backup names
+    workers : int, default = 1
+        number of sites to backup at the same time
+
+    RETURNS
+    -------
+    list
+        result of each org backup (status, time spent, number of API requests)
+    """
+    LOGGER.debug("org_complete_backup:start_msp")
+    LOGGER.debug("org_complete_backup:start_msp:parameter:org_ids: %s", org_ids)
+    LOGGER.debug("org_complete_backup:start_msp:parameter:msp_id: %s", msp_id)
+    LOGGER.debug(
+        "org_complete_backup:start_msp:parameter:backup_folder_param: %s",
+        backup_folder_param,
+    )
+    LOGGER.debug("org_complete_backup:start_msp:parameter:workers: %s", workers)
+
+    mist_rate_limiter.attach(apisession)
+    if not backup_folder_param:
+        backup_folder_param = DEFAULT_BACKUP_FOLDER
+    if not org_ids:
+        org_ids = _get_msp_org_ids(apisession, msp_id)
+    # same suffix for all the orgs, so the backups of the same run can be found
+    suffix = ""
+    if backup_name_date:
+        suffix = f"_{datetime.datetime.isoformat(datetime.datetime.now()).split('.')[0].replace(':', '.')}"
+    elif backup_name_ts:
+        suffix = f"_{round(datetime.datetime.timestamp(datetime.datetime.now()))}"
+    report_path = os.path.abspath(os.path.join(backup_folder_param, REPORT_FILE))
+
+    results = []
+    # the org names are not unique, the org_id is added to the backup name of
+    # the next orgs with the same name, so they are not saved in the same folder
+    backup_names = set()
+    start_time = time.monotonic()
+    for i, org_id in enumerate(org_ids):
+        try:
+            org_name = mistapi.api.v1.orgs.orgs.getOrg(apisession, org_id).data["name"]
+        except Exception:
+            LOGGER.error("Exception occurred", exc_info=True)
+            console.error(f"Unable to retrieve the org {org_id}")
+            results.append(_init_result(org_id, org_id, ""))
+            continue
+        _print_new_step(f"Org {i + 1}/{len(org_ids)}: {org_name}")
+        backup_name = f"{org_name}{suffix}"
+        if backup_name.lower() in backup_names:
+            backup_name = f"{org_name}_{org_id}{suffix}"
+        backup_names.add(backup_name.lower())
+        results.append(
+            _backup_complete_org(
+                apisession,
+                org_id,
+                org_name,
+                backup_folder_param,
+                backup_name,
+                workers,
+            )
+        )
+
+    LOGGER.info(
+        "org_complete_backup:start_msp:%s orgs backed up in %ss",
+        len(results),
+        round(time.monotonic() - start_time, 2),
+    )
+    _print_report(results, report_path)
     _print_new_step("Process finished")
+    return results
 
 
 ###############################################################################
@@ -269,6 +533,15 @@ Python script to backup a whole organization configuration and devices.
 This script will not change/create/delete/touch any existing objects. It will 
 just retrieve every single object from the organization.
 
+Multiple organizations can be backed up in a single run (MSP mode), with a
+list of org_ids ("--org_ids") or with all the organizations of an MSP
+("--msp_id"). The organizations are backed up one after the other with the
+same API session, so all the requests share the same rate limit budget. The
+time spent on each organization is displayed at the end of the process, and
+saved in the "backup_report.json" file in the backup folder. When several
+organizations have the same name, the org_id is appended to the name of the
+backup of the next ones.
+
 -------
 Requirements:
 mistapi: https://pypi.org/project/mistapi/
@@ -308,11 +581,20 @@ Script Parameters:
                         backup name 
 -t, --timestamp         append the current timestamp to the backup 
 
+--org_ids=              MSP mode. Comma separated list of org_ids to backup
+-m, --msp_id=           MSP mode. msp_id of the MSP, all the orgs of the MSP
+                        will be backed up
+-w, --workers=          number of sites to backup at the same time
+                        default is 1
+
 -------
 Examples:
 python3 ./org_complete_backup.py
 python3 ./org_complete_backup.py \
     --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4
+python3 ./org_complete_backup.py -d --workers=8 \
+    --org_ids=203d3d02-xxxx-xxxx-xxxx-76896a3330f4,6374a757-xxxx-xxxx-xxxx-361e45b2d4ac
+python3 ./org_complete_backup.py -d --msp_id=b9e5ff32-xxxx-xxxx-xxxx-e5c7f7a3c2f0
 
 """
     )
@@ -372,7 +654,23 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Backup a whole organization configuration and devices"
     )
-    parser.add_argument("-o", "--org_id", help="Optional, org_id of the org to backup")
+    org_group = parser.add_mutually_exclusive_group()
+    org_group.add_argument(
+        "-o", "--org_id", help="Optional, org_id of the org to backup"
+    )
+    org_group.add_argument(
+        "--org_ids", help="MSP mode. Comma separated list of org_ids to backup"
+    )
+    org_group.add_argument(
+        "-m", "--msp_id", help="MSP mode. msp_id of the MSP, all the orgs will be backed up"
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of sites to backup at the same time",
+    )
     parser.add_argument(
         "-e",
         "--env",
@@ -417,6 +715,9 @@ if __name__ == "__main__":
     BACKUP_NAME_TS = args.timestamp
     LOG_FILE = args.log_file
     SRC_ENV_FILE = args.env
+    ORG_IDS = [org_id.strip() for org_id in (args.org_ids or "").split(",") if org_id.strip()]
+    MSP_ID = args.msp_id
+    WORKERS = max(1, args.workers)
 
     #### LOGS ####
     logging.basicConfig(filename=LOG_FILE, filemode="w")
@@ -428,11 +729,23 @@ if __name__ == "__main__":
     APISESSION.login()
 
     ### START ###
-    start(
-        APISESSION,
-        org_id=ORG_ID,
-        backup_folder_param=BACKUP_FOLDER,
-        backup_name=BACKUP_NAME,
-        backup_name_date=BACKUP_NAME_DATE,
-        backup_name_ts=BACKUP_NAME_TS,
-    )
+    if ORG_IDS or MSP_ID:
+        start_msp(
+            APISESSION,
+            org_ids=ORG_IDS,
+            msp_id=MSP_ID,
+            backup_folder_param=BACKUP_FOLDER,
+            backup_name_date=BACKUP_NAME_DATE,
+            backup_name_ts=BACKUP_NAME_TS,
+            workers=WORKERS,
+        )
+    else:
+        start(
+            APISESSION,
+            org_id=ORG_ID,
+            backup_folder_param=BACKUP_FOLDER,
+            backup_name=BACKUP_NAME,
+            backup_name_date=BACKUP_NAME_DATE,
+            backup_name_ts=BACKUP_NAME_TS,
+            workers=WORKERS,
+        )
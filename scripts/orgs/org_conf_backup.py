@@ -14,6 +14,23 @@ files to an existing organization (empty or not) or to a new one.
 This script will not change/create/delete/touch any existing objects. It will
 just retrieve every single object from the organization.
 
+The backup is saved in a compressed archive ("org_conf_archive.gz"). The
+objects of each site are added to the archive as soon as the site is
+retrieved, and the index of the archive is written at the end of the backup.
+
+With the "-i" option, the script will only save the objects created, updated
+or deleted since a previous backup. All the objects are still listed and
+compared with the previous backup, but the files (maps, portal images, ...) of
+the unchanged objects are reused from the previous backup. With the
+"--audit_logs" option, the sites without any change in the org audit logs are
+not requested again (some changes, like the PSKs created from the PSK portal,
+are not in the audit logs). "org_conf_deploy.py" rebuilds the full backup from
+the incremental backup and its previous backup(s).
+
+The progress of the full backups is saved in a journal file. If a backup is
+interrupted, it can be resumed with the "-r" option: the org objects and the
+sites already saved are not requested again.
+
 -------
 Requirements:
 mistapi: https://pypi.org/project/mistapi/
@@ -36,6 +53,17 @@ Script Parameters:
                         subfolder will be created with the org name)
                         default is "./org_backup"
 
+-w, --workers=          number of sites to backup at the same time
+                        default is 1
+-i, --incremental=      path to a previous backup of the same org. Only the
+                        changes since this backup will be saved (incremental
+                        backup). The backups must be saved in different folders
+                        (see "-d" and "-t")
+--audit_logs            with "-i", only backup the sites with changes in the
+                        org audit logs since the previous backup
+-r, --resume            resume the interrupted backup of the org. With "-d" or
+                        "-t", the most recent interrupted backup is resumed
+
 -d, --datetime          append the current date and time (ISO format) to the
                         backup name
 -t, --timestamp         append the current timestamp to the backup
@@ -52,6 +80,10 @@ Script Parameters:
 Examples:
 python3 ./org_conf_backup.py
 python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4
+python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 --workers=8
+python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -d --resume
+python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -d \
+        --incremental=./org_backup/my_org_2024-01-01T00.00.00
 
 """
 
@@ -61,9 +93,14 @@ import json
 import datetime
 import urllib.request
 import os
+import shutil
 import signal
 import sys
+import time
 import argparse
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 
 MISTAPI_MIN_VERSION = "0.58.0"
 
@@ -85,13 +122,38 @@ except ImportError:
     )
     sys.exit(2)
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+try:
+    import mist_backup_store
+    import mist_image_store
+    import mist_pagination
+    import mist_rate_limiter
+except ImportError:
+    print(
+        """
+        Critical:
+        This script is using other scripts from the mist_library to perform all the
+        action. Please make sure the following python files are in the "utils" folder
+        of the mist_library:
+            - mist_backup_store.py
+            - mist_image_store.py
+            - mist_pagination.py
+            - mist_rate_limiter.py
+        """
+    )
+    sys.exit(2)
+
 #####################################################################
 #### PARAMETERS #####
 DEFAULT_BACKUP_FOLDER = "./org_backup"
 BACKUP_FILE = "org_conf_file.json"
+ARCHIVE_FILE = "org_conf_archive.gz"
+DELTA_FILE = "org_conf_delta.json"
+MANIFEST_FILE = "org_conf_manifest.json"
 LOG_FILE = "./script.log"
 FILE_PREFIX = ".".join(BACKUP_FILE.split(".")[:-1])
 ENV_FILE = "~/.mist_env"
+DEFAULT_WORKERS = 1
 
 #####################################################################
 #### LOGS ####
@@ -393,6 +455,7 @@ class ProgressBar:
     def __init__(self):
         self.steps_total = 0
         self.steps_count = 0
+        self._lock = threading.RLock()
 
     def _pb_update(self, size: int = 80):
         if self.steps_count > self.steps_total:
@@ -413,22 +476,24 @@ class ProgressBar:
         size: int = 80,
         display_pbar: bool = True,
     ):
-        if inc:
-            self.steps_count += 1
-        text = f"\033[A\033[F{message}"
-        print(f"{text} ".ljust(size + 4, "."), result)
-        print("".ljust(80))
-        if display_pbar:
-            self._pb_update(size)
+        with self._lock:
+            if inc:
+                self.steps_count += 1
+            text = f"\033[A\033[F{message}"
+            print(f"{text} ".ljust(size + 4, "."), result)
+            print("".ljust(80))
+            if display_pbar:
+                self._pb_update(size)
 
     def _pb_title(
         self, text: str, size: int = 80, end: bool = False, display_pbar: bool = True
     ):
-        print("\033[A")
-        print(f" {text} ".center(size, "-"), "\n")
-        if not end and display_pbar:
-            print("".ljust(80))
-            self._pb_update(size)
+        with self._lock:
+            print("\033[A")
+            print(f" {text} ".center(size, "-"), "\n")
+            if not end and display_pbar:
+                print("".ljust(80))
+                self._pb_update(size)
 
     def set_steps_total(self, steps_total: int) -> None:
         """
@@ -609,6 +674,8 @@ def _do_backup(
     scope_id,
     message,
     request_type: str = "",
+    previous_index: list | None = None,
+    failed_steps: list | None = None,
 ) -> list:
     if SYS_EXIT:
         sys.exit(0)
@@ -620,30 +687,351 @@ def _do_backup(
             response = backup_function(mist_session, scope_id)
 
         if check_next:
-            data = mistapi.get_all(mist_session, response)
+            data = mist_pagination.get_all(mist_session, response)
         else:
             data = response.data
 
         if step_name == "evpn_topologies":
-            _backup_evpn_topology(mist_session, data)
+            _backup_evpn_topology(
+                mist_session, _get_changed_objects(previous_index, data)
+            )
 
         PB.log_success(message, True)
         return data
     except Exception:
         PB.log_failure(message, True)
         LOGGER.error("Exception occurred", exc_info=True)
+        if failed_steps is not None:
+            failed_steps.append(step_name)
         return []
 
 
+#### INCREMENTAL BACKUP ####
+def _get_changed_objects(previous_index: list | None, data: list) -> list:
+    """
+    Return the objects created or updated since the previous backup. Return all
+    the objects if there is no previous backup
+    """
+    if previous_index is None:
+        return data
+    _, changed_ids = mist_backup_store.diff_step(previous_index, data)
+    return [obj for obj in data if obj.get("id") in changed_ids]
+
+
+def _link_previous_files(previous: dict | None, file_prefix: str) -> None:
+    """
+    Reuse the files (map images, portal templates) from the previous backup.
+    Files are hard linked when possible, or copied
+    """
+    if not previous:
+        return
+    for file_name in previous["files"]:
+        if file_name.startswith(file_prefix) and not os.path.exists(file_name):
+            src = os.path.join(previous["path"], file_name)
+            try:
+                os.link(src, file_name)
+            except OSError:
+                shutil.copy2(src, file_name)
+
+
+def _get_changed_sites(mist_session: mistapi.APISession, org_id: str, since: int):
+    """
+    Return the ids of the sites with configuration changes (from the Org audit
+    logs) since `since`. Return None if the audit logs can't be retrieved
+    """
+    message = "Org audit logs"
+    PB.log_message(message)
+    try:
+        response = mistapi.api.v1.orgs.logs.listOrgAuditLogs(
+            mist_session, org_id, start=str(since), end=str(int(time.time())), limit=1000
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.raw_data}")
+        logs = mist_pagination.get_all(mist_session, response)
+        PB.log_success(message, True)
+        return {log["site_id"] for log in logs if log.get("site_id")}
+    except Exception:
+        PB.log_failure(message, True)
+        LOGGER.error("Exception occurred", exc_info=True)
+        return None
+
+
+def _backup_incremental_org(
+    mist_session: mistapi.APISession,
+    org_id: str,
+    org_name: str,
+    previous: dict,
+    timestamp: int,
+    image_store: mist_image_store.ImageStore,
+    workers: int = 1,
+    audit_logs: bool = False,
+) -> tuple:
+    PB.log_title(f"Backing up Org {org_name} (incremental)")
+    previous_manifest = previous["manifest"]
+    org_backup = {"id": org_id}
+    delta = {"org": {}, "sites": {}, "deleted_sites": []}
+
+    ### ORG BACKUP
+    # the steps not retrieved are not compared with the previous backup (they
+    # would be saved as deleted), their previous manifest entry is kept
+    failed_steps = []
+    for step_name, step in ORG_STEPS.items():
+        previous_index = previous_manifest["org"].get(step_name)
+        org_backup[step_name] = _do_backup(
+            mist_session,
+            step_name,
+            step.mistapi_function,
+            step.check_next,
+            org_id,
+            step.text,
+            step.request_type,
+            previous_index,
+            failed_steps,
+        )
+        if step_name in failed_steps:
+            continue
+        step_delta, _ = mist_backup_store.diff_step(
+            previous_index, org_backup[step_name]
+        )
+        if step_delta:
+            delta["org"][step_name] = step_delta
+
+    if "wlans" in failed_steps:
+        _link_previous_files(previous, f"{FILE_PREFIX}_org_{org_id}_wlan_")
+    changed_wlans = _get_changed_objects(
+        previous_manifest["org"].get("wlans"), org_backup["wlans"]
+    )
+    changed_wlan_ids = {wlan["id"] for wlan in changed_wlans}
+    for wlan in org_backup["wlans"]:
+        if wlan["id"] not in changed_wlan_ids:
+            _link_previous_files(
+                previous, f"{FILE_PREFIX}_org_{org_id}_wlan_{wlan['id']}."
+            )
+    _backup_wlan_portal(org_id, None, changed_wlans)
+
+    ### SITES BACKUP
+    # all the sites are backed up (and compared with the previous backup). With
+    # `audit_logs`, only the sites with an audit log since the previous backup,
+    # the new sites and the sites with updated info are backed up, the others
+    # are reused as is
+    previous_sites = previous_manifest["sites"]
+    sites = []
+    if "sites" in failed_steps:
+        # the list of sites was not retrieved, the previous sites are kept
+        site_ids = set(previous_sites)
+        _link_previous_files(previous, f"{FILE_PREFIX}_org_{org_id}_site_")
+    else:
+        site_ids = {site["id"] for site in org_backup["sites"]}
+        changed_site_ids = None
+        if audit_logs:
+            changed_site_ids = _get_changed_sites(
+                mist_session, org_id, previous_manifest["timestamp"]
+            )
+        changed_info_site_ids = {
+            site["id"]
+            for site in _get_changed_objects(
+                previous_manifest["org"].get("sites"), org_backup["sites"]
+            )
+        }
+        for site in org_backup["sites"]:
+            if (
+                changed_site_ids is None
+                or site["id"] in changed_site_ids
+                or site["id"] not in previous_sites
+                or site["id"] in changed_info_site_ids
+            ):
+                sites.append(site)
+            else:
+                _link_previous_files(
+                    previous, f"{FILE_PREFIX}_org_{org_id}_site_{site['id']}_"
+                )
+    PB.set_steps_total(len(ORG_STEPS) + 1 + len(sites) * len(SITE_STEPS))
+    sites_backup = {}
+
+    def _save_site(site_id: str, site_backup: dict, complete: bool) -> None:
+        if not complete:
+            # incomplete site backup, the site is kept as in the previous
+            # backup (and backed up again by the next backup if it is new)
+            _link_previous_files(
+                previous, f"{FILE_PREFIX}_org_{org_id}_site_{site_id}_"
+            )
+            return
+        sites_backup[site_id] = site_backup
+
+    _backup_sites(
+        mist_session,
+        org_id,
+        sites,
+        _save_site,
+        image_store,
+        workers,
+        previous,
+    )
+    for site_id, site_backup in sites_backup.items():
+        if site_id not in previous_sites:
+            delta["sites"][site_id] = {
+                step_name: {"replace": data} for step_name, data in site_backup.items()
+            }
+            continue
+        for step_name, data in site_backup.items():
+            step_delta, _ = mist_backup_store.diff_step(
+                previous_sites[site_id].get(step_name), data
+            )
+            if step_delta:
+                delta["sites"].setdefault(site_id, {})[step_name] = step_delta
+
+    delta["deleted_sites"] = [
+        site_id for site_id in previous_sites if site_id not in site_ids
+    ]
+    manifest = mist_backup_store.build_manifest(
+        org_id, timestamp, org_backup, sites_backup, previous["base"]
+    )
+    for step_name in failed_steps:
+        if step_name in previous_manifest["org"]:
+            manifest["org"][step_name] = previous_manifest["org"][step_name]
+        else:
+            del manifest["org"][step_name]
+    for site_id in site_ids:
+        if site_id not in manifest["sites"] and site_id in previous_sites:
+            manifest["sites"][site_id] = previous_sites[site_id]
+
+    PB.log_title("Backup Done", end=True)
+    return delta, manifest
+
+
 #### BACKUP ####
-def _backup_full_org(mist_session, org_id, org_name) -> dict:
+def _backup_site_maps(
+    org_id: str, site_id: str, maps: list, image_store: mist_image_store.ImageStore
+) -> None:
+    message = "Site map images"
+    PB.log_message(message)
+    try:
+        downloads = []
+        for xmap in maps:
+            url = None
+            xmap_id = None
+            if "url" in xmap:
+                url = xmap["url"]
+                xmap_id = xmap["id"]
+            if url and xmap_id:
+                image_name = (
+                    f"{FILE_PREFIX}_org_{org_id}_site_{site_id}_map_{xmap_id}.png"
+                )
+                downloads.append(image_store.submit(url, image_name))
+        # the images are downloaded in parallel by the image store
+        for download in downloads:
+            download.result()
+        PB.log_success(message)
+    except Exception:
+        PB.log_failure(message)
+        LOGGER.error("Exception occurred", exc_info=True)
+
+
+def _backup_site(
+    mist_session: mistapi.APISession,
+    org_id: str,
+    site: dict,
+    image_store: mist_image_store.ImageStore,
+    concurrent: bool = False,
+    previous: dict | None = None,
+    failed_steps: list | None = None,
+) -> dict:
+    site_id = site["id"]
+    site_name = site["name"]
+    site_backup = {}
+    if not concurrent:
+        PB.log_title(f"Backing up Site {site_name}")
+    for step_name, step in SITE_STEPS.items():
+        if concurrent:
+            message = f"{site_name} > {step.text}"
+        else:
+            message = step.text
+        site_backup[step_name] = _do_backup(
+            mist_session,
+            step_name,
+            step.mistapi_function,
+            step.check_next,
+            site_id,
+            message,
+            failed_steps=failed_steps,
+        )
+
+    wlans = site_backup["wlans"]
+    maps = site_backup["maps"]
+    if previous:
+        previous_site = previous["manifest"]["sites"].get(site_id, {})
+        wlans = _get_changed_objects(previous_site.get("wlans"), wlans)
+        maps = _get_changed_objects(previous_site.get("maps"), maps)
+        prefix = f"{FILE_PREFIX}_org_{org_id}_site_{site_id}"
+        changed_ids = {obj["id"] for obj in wlans + maps}
+        for wlan in site_backup["wlans"]:
+            if wlan["id"] not in changed_ids:
+                _link_previous_files(previous, f"{prefix}_wlan_{wlan['id']}.")
+        for xmap in site_backup["maps"]:
+            if xmap["id"] not in changed_ids:
+                _link_previous_files(previous, f"{prefix}_map_{xmap['id']}.")
+
+    if wlans:
+        _backup_wlan_portal(org_id, site_id, wlans)
+
+    _backup_site_maps(org_id, site_id, maps, image_store)
+    return site_backup
+
+
+def _backup_sites(
+    mist_session: mistapi.APISession,
+    org_id: str,
+    sites: list,
+    save_site: Callable,
+    image_store: mist_image_store.ImageStore,
+    workers: int = 1,
+    previous: dict | None = None,
+) -> None:
+    """
+    Backup the sites. `save_site(site_id, site_backup, complete)` is called as
+    soon as each site backup is done (from the worker threads if `workers` > 1).
+    `complete` is False if some site objects were not retrieved
+    """
+
+    def _backup_and_save(site: dict, concurrent: bool) -> None:
+        failed_steps = []
+        site_backup = _backup_site(
+            mist_session, org_id, site, image_store, concurrent, previous, failed_steps
+        )
+        save_site(site["id"], site_backup, not failed_steps)
+
+    if workers > 1 and len(sites) > 1:
+        PB.log_title(f"Backing up {len(sites)} Sites ({workers} workers)")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # consume the results to raise the exceptions from the workers
+            list(executor.map(lambda site: _backup_and_save(site, True), sites))
+    else:
+        for site in sites:
+            _backup_and_save(site, False)
+
+
+def _backup_full_org(
+    mist_session: mistapi.APISession,
+    org_id: str,
+    org_name: str,
+    writer: mist_backup_store.BackupWriter,
+    image_store: mist_image_store.ImageStore,
+    workers: int = 1,
+) -> None:
     PB.log_title(f"Backing up Org {org_name}")
     backup = {}
     backup["org"] = {"id": org_id}
 
     ### ORG BACKUP
+    # each step is added to the archive (and to the journal) as soon as it is
+    # retrieved. The steps already saved by an interrupted backup are reused
     for step_name, step in ORG_STEPS.items():
+        if writer.is_done(f"org/{step_name}"):
+            backup["org"][step_name] = writer.read(f"org/{step_name}")
+            PB.log_success(f"{step.text} (resumed)", True)
+            continue
         request_type:str = step.request_type
+        failed_steps = []
         backup["org"][step_name] = _do_backup(
             mist_session,
             step_name,
@@ -652,59 +1040,43 @@ def _backup_full_org(mist_session, org_id, org_name) -> dict:
             org_id,
             step.text,
             request_type,
+            failed_steps=failed_steps,
         )
+        writer.write_org_step(step_name, backup["org"][step_name], not failed_steps)
     _backup_wlan_portal(org_id, None, backup["org"]["wlans"])
 
     ### SITES BACKUP
-    backup["sites"] = {}
-    for site in backup["org"]["sites"]:
-        site_id = site["id"]
-        site_name = site["name"]
-        site_backup = {}
-        PB.log_title(f"Backing up Site {site_name}")
-        for step_name, step in SITE_STEPS.items():
-            site_backup[step_name] = _do_backup(
-                mist_session,
-                step_name,
-                step.mistapi_function,
-                step.check_next,
-                site_id,
-                step.text,
-            )
-        backup["sites"][site_id] = site_backup
-
-        if site_backup["wlans"]:
-            _backup_wlan_portal(org_id, site_id, site_backup["wlans"])
-
-        message = "Site map images"
-        PB.log_message(message)
-        try:
-            for xmap in site_backup["maps"]:
-                url = None
-                xmap_id = None
-                if "url" in xmap:
-                    url = xmap["url"]
-                    xmap_id = xmap["id"]
-                if url and xmap_id:
-                    image_name = (
-                        f"{FILE_PREFIX}_org_{org_id}_site_{site_id}_map_{xmap_id}.png"
-                    )
-                    urllib.request.urlretrieve(url, image_name)
-            PB.log_success(message)
-        except Exception:
-            PB.log_failure(message)
-            LOGGER.error("Exception occurred", exc_info=True)
+    # each site is added to the archive as soon as it is retrieved
+    sites = [
+        site
+        for site in backup["org"]["sites"]
+        if not writer.is_done(f"site/{site['id']}")
+    ]
+    sites_done = len(backup["org"]["sites"]) - len(sites)
+    if sites_done:
+        PB.log_title(f"Resuming backup, {sites_done} Sites already saved")
+        PB.set_steps_total(PB.steps_total - sites_done * len(SITE_STEPS))
+    _backup_sites(
+        mist_session,
+        org_id,
+        sites,
+        writer.write_site,
+        image_store,
+        workers,
+    )
+    writer.close()
 
     PB.log_title("Backup Done", end=True)
-    return backup
 
 
-def _save_to_file(backup: dict, backup_folder: str, backup_name: str):
-    backup_path = os.path.join(backup_folder, backup_name, BACKUP_FILE)
+def _save_to_file(
+    backup: dict, backup_folder: str, backup_name: str, file_name: str = BACKUP_FILE
+):
+    backup_path = os.path.join(backup_folder, backup_name, file_name)
     message = f"Saving to file {backup_path} "
     PB.log_title(message, end=True, display_pbar=False)
     try:
-        with open(BACKUP_FILE, "w") as f:
+        with open(file_name, "w") as f:
             json.dump(backup, f)
         PB.log_success(message, display_pbar=False)
     except Exception:
@@ -712,13 +1084,46 @@ def _save_to_file(backup: dict, backup_folder: str, backup_name: str):
         LOGGER.error("Exception occurred", exc_info=True)
 
 
+def _remove_stale_files(file_names: list) -> None:
+    for file_name in file_names:
+        if os.path.isfile(file_name):
+            LOGGER.info("_remove_stale_files: removing %s", file_name)
+            os.remove(file_name)
+
+
+def _load_previous_backup(previous_path: str, org_id: str) -> dict | None:
+    message = f"Loading previous backup manifest from {previous_path} "
+    PB.log_message(message, display_pbar=False)
+    try:
+        manifest = mist_backup_store.load_manifest(previous_path)
+        if not manifest:
+            raise FileNotFoundError(f"{MANIFEST_FILE} not found in {previous_path}")
+        if manifest.get("org_id") != org_id:
+            raise ValueError(f"{previous_path} is not a backup of the org {org_id}")
+        PB.log_success(message, display_pbar=False)
+        return {
+            "path": previous_path,
+            "files": os.listdir(previous_path),
+            "manifest": manifest,
+        }
+    except Exception:
+        PB.log_failure(message, display_pbar=False)
+        LOGGER.error("Exception occurred", exc_info=True)
+        return None
+
+
 def _start_org_backup(
     mist_session: mistapi.APISession,
     org_id: str,
     org_name: str,
     backup_folder: str,
     backup_name: str,
+    workers: int = DEFAULT_WORKERS,
+    previous_path: str = "",
+    resume: bool = False,
+    audit_logs: bool = False,
 ) -> bool:
+    timestamp = int(time.time())
     # FOLDER
     try:
         if not os.path.exists(backup_folder):
@@ -732,10 +1137,41 @@ def _start_org_backup(
         LOGGER.error("Exception occurred", exc_info=True)
         return False
 
+    # PREVIOUS BACKUP
+    previous = None
+    if previous_path:
+        if not os.path.isdir(previous_path):
+            console.critical(f"Previous backup folder {previous_path} not found")
+            return False
+        if os.path.samefile(previous_path, os.getcwd()):
+            console.critical(
+                "The incremental backup must be saved in a different folder than "
+                "the previous backup (see the \"-d\" and \"-t\" options)"
+            )
+            return False
+        previous = _load_previous_backup(previous_path, org_id)
+        if not previous:
+            return False
+        previous["base"] = os.path.relpath(previous_path, os.getcwd())
+        if resume:
+            console.warning(
+                "Resume is only supported for full backups, starting a new "
+                "incremental backup"
+            )
+    elif mist_backup_store.has_journal("."):
+        if not resume:
+            console.warning(
+                "The interrupted backup in this folder will be overwritten. "
+                "Use the \"-r\" option to resume it"
+            )
+    elif resume:
+        console.warning("No interrupted backup found, starting a new backup")
+        resume = False
+
     # PREPARE PROGRESS BAR
     try:
         response = mistapi.api.v1.orgs.sites.listOrgSites(mist_session, org_id)
-        sites = mistapi.get_all(mist_session, response)
+        sites = mist_pagination.get_all(mist_session, response)
         PB.set_steps_total(len(ORG_STEPS) + len(sites) * len(SITE_STEPS))
     except Exception as e:
         print(e)
@@ -744,8 +1180,37 @@ def _start_org_backup(
 
     # BACKUP
     try:
-        backup = _backup_full_org(mist_session, org_id, org_name)
-        _save_to_file(backup, backup_folder, backup_name)
+        image_store = mist_image_store.ImageStore(
+            ".", [previous["path"]] if previous else None
+        )
+        if previous:
+            delta, manifest = _backup_incremental_org(
+                mist_session,
+                org_id,
+                org_name,
+                previous,
+                timestamp,
+                image_store,
+                workers,
+                audit_logs,
+            )
+            # a stale full backup would be loaded instead of the delta
+            _remove_stale_files([BACKUP_FILE, ARCHIVE_FILE])
+            _save_to_file(delta, backup_folder, backup_name, DELTA_FILE)
+        else:
+            _remove_stale_files([BACKUP_FILE, DELTA_FILE])
+            writer = mist_backup_store.BackupWriter(".", org_id, timestamp, resume)
+            _backup_full_org(
+                mist_session, org_id, org_name, writer, image_store, workers
+            )
+            PB.log_title(
+                f"Backup saved to {os.path.join(backup_folder, backup_name, ARCHIVE_FILE)}",
+                end=True,
+                display_pbar=False,
+            )
+            manifest = writer.get_manifest()
+        image_store.close()
+        _save_to_file(manifest, backup_folder, backup_name, MANIFEST_FILE)
     except Exception as e:
         print(e)
         LOGGER.error("Exception occurred", exc_info=True)
@@ -754,6 +1219,25 @@ def _start_org_backup(
     return True
 
 
+def _find_interrupted_backup(backup_folder: str, backup_name: str) -> str:
+    """
+    Return the name of the most recent backup folder starting with
+    `backup_name` and containing an interrupted backup
+    """
+    if not os.path.isdir(backup_folder):
+        return ""
+    candidates = []
+    for folder in os.listdir(backup_folder):
+        folder_path = os.path.join(backup_folder, folder)
+        if folder.startswith(f"{backup_name}_") and mist_backup_store.has_journal(
+            folder_path
+        ):
+            candidates.append((os.path.getmtime(folder_path), folder))
+    if not candidates:
+        return ""
+    return max(candidates)[1]
+
+
 def start(
     mist_session: mistapi.APISession,
     org_id: str,
@@ -761,6 +1245,10 @@ def start(
     backup_name: str = "",
     backup_name_date: bool = False,
     backup_name_ts: bool = False,
+    workers: int = DEFAULT_WORKERS,
+    incremental_from: str = "",
+    resume: bool = False,
+    audit_logs: bool = False,
 ):
     """
     Start the process to deploy a backup/template
@@ -785,6 +1273,19 @@ def start(
     backup_name_ts : bool, default = False
         if `backup_name_ts`==`True`, append the current timestamp to the backup
         name
+    workers : int, default = 1
+        number of sites to backup at the same time
+    incremental_from : str
+        path to a previous backup of the same org. If set, only the changes
+        since this backup are saved (incremental backup)
+    resume : bool, default = False
+        if `resume`==`True`, resume the interrupted backup of the org. With
+        `backup_name_date` or `backup_name_ts`, the most recent interrupted
+        backup is resumed
+    audit_logs : bool, default = False
+        only with `incremental_from`. If `audit_logs`==`True`, only the sites
+        with changes in the org audit logs since the previous backup are backed
+        up
 
     RETURNS
     -------
@@ -802,7 +1303,16 @@ def start(
         "org_conf_backup:start:parameters:backup_name_date: %s", backup_name_date
     )
     LOGGER.debug("org_conf_backup:start:parameters:backup_name_ts: %s", backup_name_ts)
+    LOGGER.debug("org_conf_backup:start:parameters:workers: %s", workers)
+    LOGGER.debug(
+        "org_conf_backup:start:parameters:incremental_from: %s", incremental_from
+    )
+    LOGGER.debug("org_conf_backup:start:parameters:resume: %s", resume)
+    LOGGER.debug("org_conf_backup:start:parameters:audit_logs: %s", audit_logs)
+    mist_rate_limiter.attach(mist_session)
     current_folder = os.getcwd()
+    if incremental_from:
+        incremental_from = os.path.abspath(incremental_from)
     if not backup_folder_param:
         backup_folder_param = DEFAULT_BACKUP_FOLDER
     if not org_id:
@@ -811,13 +1321,27 @@ def start(
 
     if not backup_name:
         backup_name = org_name
-    if backup_name_date:
+    interrupted_backup = ""
+    if resume and (backup_name_date or backup_name_ts):
+        # the date/timestamp of the interrupted backup is not known
+        interrupted_backup = _find_interrupted_backup(backup_folder_param, backup_name)
+    if interrupted_backup:
+        backup_name = interrupted_backup
+    elif backup_name_date:
         backup_name = f"{backup_name}_{datetime.datetime.isoformat(datetime.datetime.now()).split('.')[0].replace(':', '.')}"
     elif backup_name_ts:
         backup_name = f"{backup_name}_{round(datetime.datetime.timestamp(datetime.datetime.now()))}"
 
     success = _start_org_backup(
-        mist_session, org_id, org_name, backup_folder_param, backup_name
+        mist_session,
+        org_id,
+        org_name,
+        backup_folder_param,
+        backup_name,
+        workers,
+        incremental_from,
+        resume,
+        audit_logs,
     )
     os.chdir(current_folder)
     return success
@@ -847,6 +1371,23 @@ files to an existing organization (empty or not) or to a new one.
 This script will not change/create/delete/touch any existing objects. It will 
 just retrieve every single object from the organization.
 
+The backup is saved in a compressed archive ("org_conf_archive.gz"). The
+objects of each site are added to the archive as soon as the site is
+retrieved, and the index of the archive is written at the end of the backup.
+
+With the "-i" option, the script will only save the objects created, updated
+or deleted since a previous backup. All the objects are still listed and
+compared with the previous backup, but the files (maps, portal images, ...) of
+the unchanged objects are reused from the previous backup. With the
+"--audit_logs" option, the sites without any change in the org audit logs are
+not requested again (some changes, like the PSKs created from the PSK portal,
+are not in the audit logs). "org_conf_deploy.py" rebuilds the full backup from
+the incremental backup and its previous backup(s).
+
+The progress of the full backups is saved in a journal file. If a backup is
+interrupted, it can be resumed with the "-r" option: the org objects and the
+sites already saved are not requested again.
+
 -------
 Requirements:
 mistapi: https://pypi.org/project/mistapi/
@@ -869,6 +1410,17 @@ Script Parameters:
                         subfolder will be created with the org name)
                         default is "./org_backup"
 
+-w, --workers=          number of sites to backup at the same time
+                        default is 1
+-i, --incremental=      path to a previous backup of the same org. Only the
+                        changes since this backup will be saved (incremental
+                        backup). The backups must be saved in different folders
+                        (see "-d" and "-t")
+--audit_logs            with "-i", only backup the sites with changes in the
+                        org audit logs since the previous backup
+-r, --resume            resume the interrupted backup of the org. With "-d" or
+                        "-t", the most recent interrupted backup is resumed
+
 -d, --datetime          append the current date and time (ISO format) to the
                         backup name 
 -t, --timestamp         append the current timestamp to the backup 
@@ -885,6 +1437,10 @@ Script Parameters:
 Examples:
 python3 ./org_conf_backup.py
 python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 
+python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 --workers=8
+python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -d --resume
+python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -d \
+        --incremental=./org_backup/my_org_2024-01-01T00.00.00
 
 """
     )
@@ -948,6 +1504,10 @@ if __name__ == "__main__":
 Examples:
 python3 ./org_conf_backup.py
 python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4
+python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 --workers=8
+python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -d --resume
+python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -d \
+        --incremental=./org_backup/my_org_2024-01-01T00.00.00
         """,
     )
 
@@ -973,6 +1533,31 @@ python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4
         help="Keyring service name to retrieve the Mist API cloud and API token or username/password",
         default=None,
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of sites to backup at the same time",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        default="",
+        help="path to a previous backup of the same org, only the changes will be saved",
+    )
+    parser.add_argument(
+        "--audit_logs",
+        action="store_true",
+        help="with -i, only backup the sites with changes in the org audit logs",
+    )
+
+    parser.add_argument(
+        "-r",
+        "--resume",
+        action="store_true",
+        help="resume the interrupted backup of the org",
+    )
 
     timestamp_group = parser.add_mutually_exclusive_group()
     timestamp_group.add_argument(
@@ -998,7 +1583,11 @@ python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4
     ENV_FILE = args.env
     LOG_FILE = args.log_file
     KEYRING_SERVICE = args.keyring_service
-    
+    WORKERS = max(1, args.workers)
+    INCREMENTAL_FROM = args.incremental
+    RESUME = args.resume
+    AUDIT_LOGS = args.audit_logs
+
     if KEYRING_SERVICE:
         ENV_FILE = None
 
@@ -1012,5 +1601,14 @@ python3 ./org_conf_backup.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4
 
     ### START ###
     start(
-        APISESSION, ORG_ID, BACKUP_FOLDER, BACKUP_NAME, BACKUP_NAME_DATE, BACKUP_NAME_TS
+        APISESSION,
+        ORG_ID,
+        BACKUP_FOLDER,
+        BACKUP_NAME,
+        BACKUP_NAME_DATE,
+        BACKUP_NAME_TS,
+        WORKERS,
+        INCREMENTAL_FROM,
+        RESUME,
+        AUDIT_LOGS,
     )
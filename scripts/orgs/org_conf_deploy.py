@@ -23,6 +23,20 @@ This script is trying to maintain objects integrity as much as possible. To do s
 an object is referencing another object by its ID, the script will replace be ID from
 the original organization by the corresponding ID from the destination org.
 
+The deployment order is computed from the IDs referenced by the objects: the object
+types are deployed once the object types they are referencing are deployed, and the
+object types which are not depending on each other, and the sites, can be deployed at
+the same time (see the "--workers" parameter, by default they are deployed one by one).
+
+When an existing object is replaced (--merge_action=replace), the backup object is
+compared with the existing one (after replacing the IDs), and the object is only
+updated if it changed. The "--plan" parameter can be used to display the objects
+which would be created or updated, without deploying anything.
+
+The progress of the deployment is saved in a journal file (in the backup folder).
+If a deployment is interrupted or some objects were not deployed, it can be resumed
+with the "-r" option: the objects already deployed are not deployed again.
+
 -------
 Requirements:
 mistapi: https://pypi.org/project/mistapi/
@@ -60,6 +74,13 @@ Script Parameters:
                         default is "./org_backup"
 -b, --source_backup=    Name of the backup/template to deploy. This is the name of
                         the folder where all the backup files are stored.
+-w, --workers=          number of object types, and number of sites, to deploy at
+                        the same time
+                        default is 1
+-p, --plan              only display the objects which would be created/updated
+                        in the destination org (requires -o), without deploying
+                        them
+-r, --resume            resume the interrupted deployment to the org (requires -o)
 -l, --log_file=         define the filepath/filename where to write the logs
                         default is "./script.log"
 -e, --env=              define the env file to use (see mistapi env file documentation
@@ -70,6 +91,9 @@ Script Parameters:
 Examples:
 python3 ./org_conf_deploy.py
 python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "my test org"
+python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "my test org" --workers=4
+python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "my test org" -m replace --plan
+python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "my test org" --resume
 
 """
 
@@ -78,9 +102,11 @@ import logging
 import json
 import os
 import sys
-import re
 import argparse
 import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
 
 MISTAPI_MIN_VERSION = "0.55.5"
@@ -103,6 +129,31 @@ except ImportError:
     )
     sys.exit(2)
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+try:
+    import mist_backup_store
+    import mist_deploy_journal
+    import mist_deploy_planner
+    import mist_pagination
+    import mist_rate_limiter
+    import mist_uuid_mapping
+except ImportError:
+    print(
+        """
+        Critical:
+        This script is using other scripts from the mist_library to perform all the
+        action. Please make sure the following python files are in the "utils" folder
+        of the mist_library:
+            - mist_backup_store.py
+            - mist_deploy_journal.py
+            - mist_deploy_planner.py
+            - mist_pagination.py
+            - mist_rate_limiter.py
+            - mist_uuid_mapping.py
+        """
+    )
+    sys.exit(2)
+
 #####################################################################
 #### PARAMETERS #####
 BACKUP_FOLDER = "./org_backup"
@@ -110,6 +161,24 @@ BACKUP_FILE = "org_conf_file.json"
 LOG_FILE = "./script.log"
 FILE_PREFIX = ".".join(BACKUP_FILE.split(".")[:-1])
 ENV_FILE = "~/.mist_env"
+DEFAULT_WORKERS = 1
+# bulk imports (PSKs, usermacs): objects per request, requests at the same time
+# and number of retries for each chunk
+PSKS_CHUNK_SIZE = 1000
+USERMACS_CHUNK_SIZE = 1000
+BULK_IMPORT_WORKERS = 4
+BULK_IMPORT_RETRIES = 3
+BULK_IMPORT_RETRY_DELAY = 5
+# fields set by the Mist Cloud, not compared when checking if an object changed
+READ_ONLY_FIELDS = [
+    "id",
+    "msp_id",
+    "org_id",
+    "site_id",
+    "created_time",
+    "modified_time",
+    "for_site",
+]
 
 #####################################################################
 #### LOGS ####
@@ -152,6 +221,25 @@ class Step:
         self.text = text
         self.attr_name = attr_name
         self.existing_objects = []
+        # existing objects by name, None if the existing objects are not loaded
+        self.existing_index = None
+        self.existing_ids = {}
+
+    def copy(self) -> "Step":
+        """
+        Create a new step with the same API functions, without the existing
+        objects (used to deploy multiple sites at the same time).
+
+        :return: The new step.
+        """
+        return Step(
+            create_mistapi_function=self.create_mistapi_function,
+            list_mistapi_function=self.list_mistapi_function,
+            update_mistapi_function=self.update_mistapi_function,
+            list_type_query_param=self.list_type_query_param,
+            text=self.text,
+            attr_name=self.attr_name,
+        )
 
     def load_existing_objects(self, apisession, org_id):
         """
@@ -172,12 +260,12 @@ class Step:
                     limit=1000,
                     page=1,
                 )
-                self.existing_objects = mistapi.get_all(apisession, resp)
+                self.existing_objects = mist_pagination.get_all(apisession, resp)
             elif self.list_mistapi_function:
                 resp = self.list_mistapi_function(
                     apisession, org_id, limit=1000, page=1
                 )
-                self.existing_objects = mistapi.get_all(apisession, resp)
+                self.existing_objects = mist_pagination.get_all(apisession, resp)
             else:
                 self.existing_objects = []
             PB.log_success(message, display_pbar=False, inc=False)
@@ -185,6 +273,43 @@ class Step:
             PB.log_failure(message, display_pbar=False, inc=False)
             LOGGER.error("Error loading existing objects for step %s: %s", self.text, e)
             self.existing_objects = []
+        self.existing_index = {}
+        self.existing_ids = {}
+        for existing_obj in self.existing_objects:
+            self.existing_index.setdefault(
+                existing_obj.get(self.attr_name, ""), existing_obj
+            )
+            self.existing_ids[existing_obj.get("id")] = existing_obj
+
+    def add_existing_object(self, obj: dict):
+        """
+        Add an object created in the destination organization to the existing
+        objects, so the next objects with the same name are detected.
+
+        :param obj: The created object.
+        """
+        if self.existing_index is None:
+            return
+        self.existing_objects.append(obj)
+        self.existing_index.setdefault(obj.get(self.attr_name, ""), obj)
+        self.existing_ids[obj.get("id")] = obj
+
+    def get_existing_object(self, object_id: str) -> dict | None:
+        """
+        Get an existing object by id.
+
+        :param object_id: The object ID.
+        :return: The existing object, or None if the object is not loaded.
+        """
+        return self.existing_ids.get(object_id)
+
+    def _get_copy_name(self, obj_name: str) -> str:
+        new_name = f"{obj_name}_copy"
+        index = 2
+        while new_name in self.existing_index:
+            new_name = f"{obj_name}_copy_{index}"
+            index += 1
+        return new_name
 
     def search_existing_object(
         self, obj: dict, obj_name: str, action: str
@@ -199,35 +324,36 @@ class Step:
         """
         LOGGER.debug("Searching for existing object %s with name %s", self.text, obj_name)
         LOGGER.debug("merge action: %s", action)
-        for existing_obj in self.existing_objects:
-            if existing_obj.get(self.attr_name, "") == obj_name:
-                if action == "skip":
-                    LOGGER.debug(
-                        "Object %s with name %s already exists, skipping...",
-                        self.text,
-                        obj_name,
-                    )
-                    UUID_MATCHING.add_uuid(existing_obj["id"], obj["id"])
-                    return False, None, existing_obj["id"]
-                elif action == "replace":
-                    LOGGER.debug(
-                        "Object %s with name %s already exists, replacing...",
-                        self.text,
-                        obj_name,
-                    )
-                    UUID_MATCHING.add_uuid(existing_obj["id"], obj["id"])
-                    obj["id"] = existing_obj["id"]
-                    return False, obj, existing_obj["id"]
-                elif action == "rename":
-                    new_name = f"{obj_name}_copy"
-                    LOGGER.debug(
-                        "Object %s with name %s already exists, renaming to %s...",
-                        self.text,
-                        obj_name,
-                        new_name,
-                    )
-                    obj[self.attr_name] = new_name
-                    return True, obj, existing_obj["id"]
+        existing_obj = (self.existing_index or {}).get(obj_name)
+        if existing_obj:
+            if action == "skip":
+                LOGGER.debug(
+                    "Object %s with name %s already exists, skipping...",
+                    self.text,
+                    obj_name,
+                )
+                UUID_MATCHING.add_uuid(existing_obj["id"], obj["id"])
+                PLAN.add(self.text, "noop")
+                return False, None, existing_obj["id"]
+            elif action == "replace":
+                LOGGER.debug(
+                    "Object %s with name %s already exists, replacing...",
+                    self.text,
+                    obj_name,
+                )
+                UUID_MATCHING.add_uuid(existing_obj["id"], obj["id"])
+                obj["id"] = existing_obj["id"]
+                return False, obj, existing_obj["id"]
+            elif action == "rename":
+                new_name = self._get_copy_name(obj_name)
+                LOGGER.debug(
+                    "Object %s with name %s already exists, renaming to %s...",
+                    self.text,
+                    obj_name,
+                    new_name,
+                )
+                obj[self.attr_name] = new_name
+                return True, obj, existing_obj["id"]
         LOGGER.debug(
             "Object %s with name %s does not exist, proceeding...",
             self.text,
@@ -548,8 +674,17 @@ class UUIDM:
     """
 
     def __init__(self):
+        # the mapping is updated by the worker threads. The lookups are not
+        # locked (single dict operations)
         self.uuids = {}
-        self.requests_to_replay = []
+        # ids of the objects from the backup, which will be deployed
+        self.backup_ids = set()
+        self.deferred_updates = []
+        # journal of the deployment, and ids of the objects deployed by the
+        # interrupted deployment
+        self.journal = None
+        self.deployed = set()
+        self._lock = threading.Lock()
 
     def add_uuid(self, new: str | None, old: str | None) -> None:
         """
@@ -559,10 +694,49 @@ class UUIDM:
         """
         if new and old:
             LOGGER.debug("add_uuid: old_id %s matching new_id %s", old, new)
-            self.uuids[old] = new
+            with self._lock:
+                self.uuids[old] = new
+            if self.journal:
+                self.journal.add_uuid(old, new)
         else:
             LOGGER.warning("add_uuid: old_id %s matching new_id %s", old, new)
 
+    def set_journal(self, journal: mist_deploy_journal.DeployJournal) -> None:
+        """
+        Save the UUIDs mapping in the deployment journal. The UUIDs already in
+        the journal (resumed deployment) are loaded.
+        :param journal: The deployment journal.
+        """
+        self.journal = journal
+        with self._lock:
+            self.uuids.update(journal.uuids)
+            self.deployed = set(journal.uuids)
+
+    def is_deployed(self, old: str | None) -> bool:
+        """
+        Check if the object was deployed by the interrupted deployment.
+        :param old: The old UUID of the object.
+        :return: True if the object is already deployed.
+        """
+        return bool(old) and old in self.deployed
+
+    def is_done(self, key: str) -> bool:
+        """
+        Check if a deployment task (e.g. "org/settings") was completed by the
+        interrupted deployment.
+        :param key: The task key.
+        :return: True if the task is already completed.
+        """
+        return bool(self.journal) and self.journal.is_done(key)
+
+    def add_done(self, key: str) -> None:
+        """
+        Save a completed deployment task in the journal.
+        :param key: The task key.
+        """
+        if self.journal:
+            self.journal.add_done(key)
+
     def get_new_uuid(self, old: str) -> str:
         """
         Get the new UUID that replaces the old UUID.
@@ -571,84 +745,85 @@ class UUIDM:
         """
         return self.uuids.get(old, "")
 
-    def add_replay(
+    def set_backup_ids(self, backup_ids: set) -> None:
+        """
+        Set the ids of the objects from the backup.
+        :param backup_ids: The ids of the objects which will be deployed.
+        """
+        self.backup_ids = backup_ids
+
+    def is_deferred(self, missing_uuids: list) -> bool:
+        """
+        Check if some missing UUIDs belong to objects from the backup which
+        are not deployed yet (dependency cycle).
+        :param missing_uuids: The missing UUIDs returned by find_and_replace.
+        :return: True if the object must be updated once these objects are deployed.
+        """
+        for missing_uuid in missing_uuids:
+            for uuid in missing_uuid.values():
+                if uuid in self.backup_ids and uuid not in self.uuids:
+                    return True
+        return False
+
+    def add_deferred_update(
         self,
         mist_step: Step,
         scope_id: str,
         object_id: str,
         object_type: str,
         data: dict,
+        old_id: str | None = None,
     ) -> None:
         """
-        Add a request to the replay list.
-        :param create_mistapi_function: The function to create the object.
-        :param update_mistapi_function: The function to update the object.
+        Add a request to the deferred updates list. The deferred update is
+        saved in the journal until it is done, so it can be resumed.
+        :param mist_step: The step of the object.
         :param scope_id: The scope ID where the object is located.
-        :param object_id: The ID of the object to be created or updated.
+        :param object_id: The ID of the object to be updated.
         :param object_type: The type of the object (e.g., "wlans", "sites").
-        :param data: The data to be used for creating or updating the object.
-        """
-        self.requests_to_replay.append(
-            {
-                "mist_step": mist_step,
-                "scope_id": scope_id,
-                "object_id": object_id,
-                "data": data,
-                "object_type": object_type,
-                "retry": 0,
-            }
-        )
+        :param data: The data to be used for updating the object.
+        :param old_id: The old UUID of the object.
+        """
+        if self.journal and old_id:
+            self.journal.add_deferred(old_id)
+        with self._lock:
+            self.deferred_updates.append(
+                {
+                    "mist_step": mist_step,
+                    "scope_id": scope_id,
+                    "object_id": object_id,
+                    "data": data,
+                    "object_type": object_type,
+                    "old_id": old_id,
+                }
+            )
 
-    def get_replay(self) -> list:
-        """
-        Get the list of requests to replay.
-        :return: A list of requests to replay.
-        """
-        return self.requests_to_replay
-
-    def _uuid_string(self, obj_str: str, missing_uuids: list):
-        #        uuid_re = '"[a-zA-Z_-]*": "[0-9a-f]{8}-[0-9a-f]{4}-[0-5][0-9a-f]{3}-[089ab][0-9a-f]{3}-[0-9a-f]{12}"'
-        uuid_re = r"\"[a-zA-Z_-]*\": \"[0-9a-f]{8}-[0-9a-f]{4}-[0-5][0-9a-f]{3}-[089ab][0-9a-f]{3}-[0-9a-f]{12}\""
-        uuids_to_replace = re.findall(uuid_re, obj_str)
-        if uuids_to_replace:
-            for uuid in uuids_to_replace:
-                uuid_key = uuid.replace('"', "").split(":")[0].strip()
-                uuid_val = uuid.replace('"', "").split(":")[1].strip()
-                if self.get_new_uuid(uuid_val):
-                    obj_str = obj_str.replace(uuid_val, self.get_new_uuid(uuid_val))
-                elif uuid_key not in [
-                    "issuer",
-                    "idp_sso_url",
-                    "custom_logout_url",
-                    "sso_issuer",
-                    "sso_idp_sso_url",
-                    "ibeacon_uuid",
-                ]:
-                    missing_uuids.append({uuid_key: uuid_val})
-        return obj_str, missing_uuids
-
-    def _uuid_list(self, obj_str: str, missing_uuids: list):
-        #        uuid_list_re = '("[a-zA-Z_-]*": \["[0-9a-f]{8}-[0-9a-f]{4}-[0-5][0-9a-f]{3}-[089ab][0-9a-f]{3}-[0-9a-f]{12}"[^\]]*)\]'
-        uuid_list_re = r"(\"[a-zA-Z_-]*\": \[\"[0-9a-f]{8}-[0-9a-f]{4}-[0-5][0-9a-f]{3}-[089ab][0-9a-f]{3}-[0-9a-f]{12}\"[^\]]*)\]"
-
-        uuid_lists_to_replace = re.findall(uuid_list_re, obj_str)
-        if uuid_lists_to_replace:
-            for uuid_list in uuid_lists_to_replace:
-                uuid_key = uuid_list.replace('"', "").split(":")[0].strip()
-                uuids = (
-                    uuid_list.replace('"', "")
-                    .replace("[", "")
-                    .replace("]", "")
-                    .split(":")[1]
-                    .split(",")
-                )
-                for uuid in uuids:
-                    uuid_val = uuid.strip()
-                    if self.get_new_uuid(uuid_val):
-                        obj_str = obj_str.replace(uuid_val, self.get_new_uuid(uuid_val))
-                    else:
-                        missing_uuids.append({uuid_key: uuid_val})
-        return obj_str, missing_uuids
+    def has_deferred_update(self, old: str | None) -> bool:
+        """
+        Check if the object was created by the interrupted deployment, but not
+        updated yet with the ids of the objects it is referencing.
+        :param old: The old UUID of the object.
+        :return: True if the deferred update of the object is not done.
+        """
+        return bool(old) and bool(self.journal) and old in self.journal.deferred
+
+    def remove_deferred_update(self, old: str | None) -> None:
+        """
+        Save the completion of the deferred update of an object in the journal.
+        :param old: The old UUID of the object.
+        """
+        if old and self.journal:
+            self.journal.remove_deferred(old)
+
+    def pop_deferred_updates(self) -> list:
+        """
+        Get the list of deferred updates and empty it.
+        :return: A list of requests to update.
+        """
+        with self._lock:
+            deferred_updates = self.deferred_updates
+            self.deferred_updates = []
+        return deferred_updates
 
     def find_and_replace(self, obj: dict, object_type: str) -> tuple:
         """
@@ -683,17 +858,67 @@ class UUIDM:
                     del service_policy["id"]
 
         # REPLACE REMAINING IDS
-        obj_str = json.dumps(obj)
-        obj_str, missing_uuids = self._uuid_string(obj_str, [])
-        obj_str, missing_uuids = self._uuid_list(obj_str, missing_uuids)
-        obj = json.loads(obj_str)
-
-        return obj, missing_uuids
+        return mist_uuid_mapping.remap(obj, self.uuids)
 
 
 UUID_MATCHING = UUIDM()
 
 
+##########################################################################################
+# CLASS TO TRACK THE CHANGES (create/update/noop for each object type)
+class DeploymentPlan:
+    """
+    CLASS TO TRACK THE CHANGES (create/update/noop for each object type)
+
+    When `dry_run` is True, the changes are only tracked and no object is created
+    or updated in the destination org.
+    """
+
+    def __init__(self):
+        self.dry_run = False
+        self.changes = {}
+        self._lock = threading.Lock()
+
+    def add(self, object_type: str, action: str, count: int = 1) -> None:
+        """
+        Add a change to the plan.
+        :param object_type: The type of the object (e.g., "Org wlans").
+        :param action: The action ("create", "update" or "noop").
+        :param count: The number of objects.
+        """
+        with self._lock:
+            changes = self.changes.setdefault(
+                object_type, {"create": 0, "update": 0, "noop": 0}
+            )
+            changes[action] += count
+
+    def display(self) -> None:
+        """
+        Display the changes summary.
+        """
+        print()
+        print(f"{'Object Type':<30} {'Create':>8} {'Update':>8} {'No Change':>10}")
+        print("".ljust(59, "-"))
+        total = {"create": 0, "update": 0, "noop": 0}
+        for object_type, changes in self.changes.items():
+            print(
+                f"{object_type[:30]:<30} {changes['create']:>8} "
+                f"{changes['update']:>8} {changes['noop']:>10}"
+            )
+            for action, count in changes.items():
+                total[action] += count
+        print("".ljust(59, "-"))
+        print(
+            f"{'Total':<30} {total['create']:>8} {total['update']:>8} "
+            f"{total['noop']:>10}"
+        )
+        print()
+        LOGGER.info("DeploymentPlan:display:%s", self.changes)
+
+
+PLAN = DeploymentPlan()
+
+
 #####################################################################
 # PROGRESS BAR AND DISPLAY
 class ProgressBar:
@@ -704,6 +929,10 @@ class ProgressBar:
     def __init__(self):
         self.steps_total = 0
         self.steps_count = 0
+        self.failures = 0
+        self._lock = threading.RLock()
+        # results logged by the current thread (e.g. for the current site)
+        self._local = threading.local()
 
     def _pb_update(self, size: int = 80):
         if self.steps_count > self.steps_total:
@@ -724,22 +953,43 @@ class ProgressBar:
         size: int = 80,
         display_pbar: bool = True,
     ):
-        if inc:
-            self.steps_count += 1
-        text = f"\033[A\033[F{message}"
-        print(f"{text} ".ljust(size + 4, "."), result)
-        print("".ljust(80))
-        if display_pbar:
-            self._pb_update(size)
+        with self._lock:
+            if inc:
+                self.steps_count += 1
+            text = f"\033[A\033[F{message}"
+            print(f"{text} ".ljust(size + 4, "."), result)
+            print("".ljust(80))
+            if display_pbar:
+                self._pb_update(size)
 
     def _pb_title(
         self, text: str, size: int = 80, end: bool = False, display_pbar: bool = True
     ):
-        print("\033[A")
-        print(f" {text} ".center(size, "-"), "\n")
-        if not end and display_pbar:
-            print("".ljust(80))
-            self._pb_update(size)
+        with self._lock:
+            print("\033[A")
+            print(f" {text} ".center(size, "-"), "\n")
+            if not end and display_pbar:
+                print("".ljust(80))
+                self._pb_update(size)
+
+    def _report(self, result: str) -> None:
+        report = getattr(self._local, "report", None)
+        if report is not None:
+            report[result] += 1
+
+    def start_report(self) -> dict:
+        """
+        Start counting the results logged by the current thread.
+        :return: The report, updated until stop_report() is called
+        """
+        self._local.report = {"success": 0, "warning": 0, "failure": 0}
+        return self._local.report
+
+    def stop_report(self) -> None:
+        """
+        Stop counting the results logged by the current thread.
+        """
+        self._local.report = None
 
     def set_steps_total(self, steps_total: int) -> None:
         """
@@ -748,6 +998,14 @@ class ProgressBar:
         """
         self.steps_total = steps_total
 
+    def inc_steps(self, count: int = 1) -> None:
+        """
+        Increment the step count without logging a message.
+        :param count: The number of steps to add
+        """
+        with self._lock:
+            self.steps_count += count
+
     def log_message(self, message, display_pbar: bool = True) -> None:
         """
         Log a message in the progress bar.
@@ -773,6 +1031,7 @@ class ProgressBar:
         :param display_pbar: If True, the progress bar will be displayed after the success
         """
         LOGGER.info("%s: Success", message)
+        self._report("success")
         self._pb_new_step(
             message, "\033[92m\u2714\033[0m\n", inc=inc, display_pbar=display_pbar
         )
@@ -787,6 +1046,7 @@ class ProgressBar:
         :param display_pbar: If True, the progress bar will be displayed after the warning
         """
         LOGGER.warning(message)
+        self._report("warning")
         self._pb_new_step(
             message, "\033[93m\u2b58\033[0m\n", inc=inc, display_pbar=display_pbar
         )
@@ -801,6 +1061,9 @@ class ProgressBar:
         :param display_pbar: If True, the progress bar will be displayed after the failure
         """
         LOGGER.error("%s: Failure", message)
+        self._report("failure")
+        with self._lock:
+            self.failures += 1
         self._pb_new_step(
             message, "\033[31m\u2716\033[0m\n", inc=inc, display_pbar=display_pbar
         )
@@ -824,6 +1087,22 @@ PB = ProgressBar()
 # DEPLOY FUNCTIONS
 ##########################################################################################
 # COMMON FUNCTION
+def _is_unchanged(existing_obj: dict | None, data: dict) -> bool:
+    """
+    Check if the existing object already has the values of the (remapped) backup
+    object. Only the fields from the backup object are compared, without the
+    read-only fields.
+    """
+    if existing_obj is None:
+        return False
+    for key, value in data.items():
+        if key in READ_ONLY_FIELDS:
+            continue
+        if key not in existing_obj or existing_obj[key] != value:
+            return False
+    return True
+
+
 def _common_process(
     apisession: mistapi.APISession,
     scope_id: str,
@@ -858,7 +1137,7 @@ def _common_process(
                 object_to_deploy,
             )
         else:
-            PB.steps_count += 1
+            PB.inc_steps()
 
 
 def _common_deploy(
@@ -895,6 +1174,21 @@ def _common_deploy(
         data["overwrite"] = True
 
     message = f"Creating {object_type} {object_name}"
+    if UUID_MATCHING.is_deployed(old_id):
+        new_id = UUID_MATCHING.get_new_uuid(old_id)
+        if UUID_MATCHING.has_deferred_update(old_id):
+            # the interrupted deployment stopped before the object was updated
+            # with the ids of the objects it is referencing
+            UUID_MATCHING.add_deferred_update(
+                mist_step, scope_id, new_id, object_type, data, old_id
+            )
+        PLAN.add(mist_step.text, "noop")
+        PB.log_success(f"{message} (already deployed)", inc=True)
+        return new_id
+    if PLAN.dry_run:
+        PLAN.add(mist_step.text, "create")
+        PB.log_success(f"{message} (plan)", inc=True)
+        return new_id
     PB.log_message(message)
     data, missing_uuids = UUID_MATCHING.find_and_replace(data, object_type)
 
@@ -902,16 +1196,20 @@ def _common_deploy(
         response = mist_step.create_mistapi_function(apisession, scope_id, data)
         if response.status_code == 200:
             new_id = response.data.get("id")
+            mist_step.add_existing_object(response.data)
+            PLAN.add(mist_step.text, "create")
             if not missing_uuids:
                 PB.log_success(message, inc=True)
-            elif not retry:
-                UUID_MATCHING.add_replay(
-                    mist_step,
-                    scope_id,
-                    new_id,
-                    object_type,
-                    data,
-                )
+            else:
+                if not retry and UUID_MATCHING.is_deferred(missing_uuids):
+                    UUID_MATCHING.add_deferred_update(
+                        mist_step,
+                        scope_id,
+                        new_id,
+                        object_type,
+                        data,
+                        old_id,
+                    )
                 PB.log_warning(message, inc=True)
         else:
             PB.log_failure(message, inc=True)
@@ -949,8 +1247,18 @@ def _common_update(
         data["overwrite"] = True
 
     message = f"Updating {object_type} {object_name} (id: {object_id})"
-    PB.log_message(message)
     data, _ = UUID_MATCHING.find_and_replace(data, object_type)
+    if _is_unchanged(mist_step.get_existing_object(object_id), data):
+        PLAN.add(mist_step.text, "noop")
+        PB.log_success(f"{message} (no change)", inc=True)
+        UUID_MATCHING.add_uuid(object_id, old_id)
+        return object_id
+    if PLAN.dry_run:
+        PLAN.add(mist_step.text, "update")
+        PB.log_success(f"{message} (plan)", inc=True)
+        UUID_MATCHING.add_uuid(object_id, old_id)
+        return object_id
+    PB.log_message(message)
 
     try:
         if mist_step.update_mistapi_function is None:
@@ -964,6 +1272,7 @@ def _common_update(
         )
         if response.status_code == 200:
             new_id = response.data.get("id")
+            PLAN.add(mist_step.text, "update")
             PB.log_success(message, inc=True)
         else:
             PB.log_failure(message, inc=True)
@@ -980,69 +1289,137 @@ def _bulk_import_process(
     apisession: mistapi.APISession,
     scope_id: str,
     step_name: str,
-    step_data: dict,
+    step_data: list,
     step: Step,
 ) -> None:
-    if step_name == "psks" and step_data:
-        _import_psks(apisession, step.create_mistapi_function, scope_id, step_data)
+    done_key = f"{scope_id}/{step_name}"
+    if UUID_MATCHING.is_done(done_key) and step_data:
+        PLAN.add(step.text, "noop", len(step_data))
+        PB.log_success(f"Importing {step_name} (already deployed)", inc=True)
+    elif PLAN.dry_run and step_data:
+        PLAN.add(step.text, "create", len(step_data))
+        PB.log_success(f"Importing {len(step_data)} {step_name} (plan)", inc=True)
+    elif step_name == "psks" and step_data:
+        if _import_psks(apisession, step.create_mistapi_function, scope_id, step_data):
+            UUID_MATCHING.add_done(done_key)
     elif step_name == "usermacs" and step_data:
-        _import_usermacs(apisession, step.create_mistapi_function, scope_id, step_data)
+        if _import_usermacs(
+            apisession, step.create_mistapi_function, scope_id, step_data
+        ):
+            UUID_MATCHING.add_done(done_key)
 
 
-def _import_psks(
+def _import_chunk(
+    apisession: mistapi.APISession,
+    mistapi_function: Callable,
+    scope_id: str,
+    object_type: str,
+    chunk: list,
+    message: str,
+    done_key: str,
+) -> bool:
+    if UUID_MATCHING.is_done(done_key):
+        PB.log_success(f"{message} (already deployed)", inc=True)
+        return True
+    for retry in range(BULK_IMPORT_RETRIES + 1):
+        if SYS_EXIT:
+            sys.exit(0)
+        if retry:
+            time.sleep(BULK_IMPORT_RETRY_DELAY * retry)
+            LOGGER.warning("conf_deploy:_import_chunk:%s: retry %s", message, retry)
+        try:
+            response = mistapi_function(apisession, scope_id, chunk)
+            if response.status_code == 200:
+                PB.log_success(message, inc=True)
+                UUID_MATCHING.add_done(done_key)
+                return True
+            LOGGER.error(
+                "conf_deploy:_import_chunk:%s: HTTP %s %s",
+                message,
+                response.status_code,
+                response.data,
+            )
+        except Exception:
+            LOGGER.error("Exception occurred", exc_info=True)
+    PB.log_failure(f"{message} ({len(chunk)} {object_type} not imported)", inc=True)
+    return False
+
+
+def _import_chunks(
     apisession: mistapi.APISession,
     mistapi_function: Callable | None,
     scope_id: str,
-    data: dict,
-) -> None:
-    LOGGER.debug("conf_deploy:_import_psks")
-    if SYS_EXIT:
-        sys.exit(0)
+    object_type: str,
+    data: list,
+    chunk_size: int,
+) -> bool:
+    """
+    Import the objects by chunks of `chunk_size` objects, BULK_IMPORT_WORKERS
+    chunks at the same time. Each chunk is retried if the import failed, and
+    is saved in the deployment journal once imported.
+    """
+    LOGGER.debug("conf_deploy:_import_chunks:%s", object_type)
     if not mistapi_function:
-        LOGGER.error("conf_deploy:_import_psks: No import function provided for PSKs")
-        return None
+        LOGGER.error(
+            "conf_deploy:_import_chunks: No import function provided for %s",
+            object_type,
+        )
+        return False
+    chunks = [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]
 
-    message = "Importing PSKs"
-    PB.log_message(message)
+    def _import(i: int) -> bool:
+        first = i * chunk_size + 1
+        message = (
+            f"Importing {object_type} {first}-{first + len(chunks[i]) - 1} "
+            f"({i + 1}/{len(chunks)})"
+        )
+        return _import_chunk(
+            apisession,
+            mistapi_function,
+            scope_id,
+            object_type,
+            chunks[i],
+            message,
+            f"{scope_id}/{object_type}/{i}",
+        )
+
+    if BULK_IMPORT_WORKERS > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=BULK_IMPORT_WORKERS) as executor:
+            results = list(executor.map(_import, range(len(chunks))))
+    else:
+        results = [_import(i) for i in range(len(chunks))]
+    if not all(results):
+        LOGGER.error(
+            "conf_deploy:_import_chunks:%s: %s/%s chunks not imported",
+            object_type,
+            results.count(False),
+            len(chunks),
+        )
+    return all(results)
 
-    try:
-        response = mistapi_function(apisession, scope_id, data)
-        if response.status_code == 200:
-            PB.log_success(message, inc=True)
-        else:
-            PB.log_failure(message, inc=True)
-    except Exception:
-        PB.log_failure(message, inc=True)
-        LOGGER.error("Exception occurred", exc_info=True)
-    return None
+
+def _import_psks(
+    apisession: mistapi.APISession,
+    mistapi_function: Callable | None,
+    scope_id: str,
+    data: list,
+) -> bool:
+    LOGGER.debug("conf_deploy:_import_psks")
+    return _import_chunks(
+        apisession, mistapi_function, scope_id, "psks", data, PSKS_CHUNK_SIZE
+    )
 
 
 def _import_usermacs(
     apisession: mistapi.APISession,
     mistapi_function: Callable | None,
     scope_id: str,
-    data: dict,
-) -> None:
+    data: list,
+) -> bool:
     LOGGER.debug("conf_deploy:_import_usermacs")
-    if SYS_EXIT:
-        sys.exit(0)
-    if not mistapi_function:
-        LOGGER.error(
-            "conf_deploy:_import_usermacs: No import function provided for User Macs"
-        )
-        return None
-
-    message = "Importing Usermacs "
-    PB.log_message(message)
-    try:
-        response = mistapi_function(apisession, scope_id, data)
-        if response.status_code == 200:
-            PB.log_success(message, inc=True)
-        else:
-            PB.log_failure(message, inc=True)
-    except Exception:
-        PB.log_failure(message, inc=True)
-        LOGGER.error("Exception occurred", exc_info=True)
+    return _import_chunks(
+        apisession, mistapi_function, scope_id, "usermacs", data, USERMACS_CHUNK_SIZE
+    )
 
 
 ##########################################################################################
@@ -1079,7 +1456,7 @@ def _wlan_process(
                 old_scope_id,
             )
         else:
-            PB.steps_count += 1
+            PB.inc_steps()
 
 
 def _deploy_wlan(
@@ -1167,6 +1544,8 @@ def _deploy_wlan_portal(
     portal_file_name = ""
     if SYS_EXIT:
         sys.exit(0)
+    elif PLAN.dry_run:
+        return
     elif not old_site_id:
         portal_file_name = f"{FILE_PREFIX}_org_{old_org_id}_wlan_{old_wlan_id}.json"
         portal_image = f"{FILE_PREFIX}_org_{old_org_id}_wlan_{old_wlan_id}.png"
@@ -1225,6 +1604,7 @@ def _deploy_wlan_portal(
 # SITE FUNCTIONS
 def _deploy_site_maps(
     apisession: mistapi.APISession,
+    mist_step: Step,
     old_org_id: str,
     old_site_id: str,
     new_site_id: str,
@@ -1245,11 +1625,13 @@ def _deploy_site_maps(
 
     new_map_id = _common_deploy(
         apisession,
-        SITE_STEPS["maps"],
+        mist_step,
         new_site_id,
         "maps",
         data,
     )
+    if PLAN.dry_run:
+        return
 
     if not new_map_id:
         LOGGER.warning(
@@ -1284,12 +1666,14 @@ def _deploy_site(
     sites_backup: dict,
     merge: bool,
     merge_action: str,
-) -> None:
+) -> bool:
     LOGGER.debug("conf_deploy:_deploy_site - merge action: %s", merge_action)
     if SYS_EXIT:
         sys.exit(0)
 
     PB.log_title(f" Deploying Site {site_info['name']} ".center(80, "_"))
+    # the site id is replaced by the existing site id with the "replace" action
+    old_site_id = site_info["id"]
     create, object_to_deploy, new_site_id = ORG_STEPS["sites"].search_existing_object(
         site_info, site_info["name"], merge_action
     )
@@ -1300,7 +1684,6 @@ def _deploy_site(
         new_site_id,
     )
 
-    old_site_id = site_info["id"]
     update_site_settings = False
 
     if object_to_deploy and create:
@@ -1322,14 +1705,24 @@ def _deploy_site(
             site_info,
         )
 
+    site_data = sites_backup.get(old_site_id, {})
+    if PLAN.dry_run and create:
+        # new site, all the site objects will be created
+        for step_name, step in SITE_STEPS.items():
+            step_data = site_data.get(step_name)
+            if step_data:
+                count = len(step_data) if isinstance(step_data, list) else 1
+                PLAN.add(step.text, "create", count)
+                PB.inc_steps(count)
+        return True
+
     if not new_site_id:
         LOGGER.error(
             "conf_deploy:_deploy_site: Unable to create or update site %s",
             site_info["name"],
         )
-        return
+        return False
 
-    site_data = sites_backup.get(old_site_id, {})
     LOGGER.debug(
         "conf_deploy:_deploy_site:site %s, old id=%s, new id=%s",
         site_info["name"],
@@ -1337,7 +1730,9 @@ def _deploy_site(
         new_site_id,
     )
 
-    for step_name, step in SITE_STEPS.items():
+    # the sites may be deployed at the same time, each site uses its own steps
+    for step_name, site_step in SITE_STEPS.items():
+        step = site_step.copy()
         if not site_data.get(step_name):
             LOGGER.debug("%s > %s: nothing to process", site_info["name"], step_name)
         else:
@@ -1370,7 +1765,12 @@ def _deploy_site(
                     )
                     if object_to_deploy and create:
                         _deploy_site_maps(
-                            apisession, old_org_id, old_site_id, new_site_id, step_data
+                            apisession,
+                            step,
+                            old_org_id,
+                            old_site_id,
+                            new_site_id,
+                            step_data,
                         )
             elif step_name == "wlans":
                 _wlan_process(
@@ -1392,10 +1792,253 @@ def _deploy_site(
                     merge,
                     merge_action,
                 )
+    return True
+
+
+def _deploy_sites(
+    apisession: mistapi.APISession,
+    org_id: str,
+    old_org_id: str,
+    sites: list,
+    sites_backup: dict,
+    merge: bool,
+    merge_action: str,
+    workers: int = DEFAULT_WORKERS,
+) -> None:
+    """
+    Deploy the sites and their objects, `workers` sites at the same time, and
+    display the sites with failures
+    """
+    LOGGER.debug("conf_deploy:_deploy_sites - workers: %s", workers)
+    results = []
+    lock = threading.Lock()
+
+    def _deploy_and_report(site_info: dict) -> None:
+        report = PB.start_report()
+        try:
+            success = _deploy_site(
+                apisession,
+                org_id,
+                old_org_id,
+                site_info,
+                sites_backup,
+                merge,
+                merge_action,
+            )
+        except Exception:
+            success = False
+            LOGGER.error("Exception occurred", exc_info=True)
+        finally:
+            PB.stop_report()
+        with lock:
+            results.append({"name": site_info.get("name"), "success": success, **report})
+            message = f"Site {site_info.get('name')} ({len(results)}/{len(sites)})"
+        if success and not report["failure"]:
+            PB.log_success(message)
+        else:
+            PB.log_failure(message)
+
+    if workers > 1 and len(sites) > 1:
+        PB.log_title(f"Deploying {len(sites)} Sites ({workers} workers)")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # consume the results to raise the exceptions from the workers
+            list(executor.map(_deploy_and_report, sites))
+    else:
+        for site_info in sites:
+            _deploy_and_report(site_info)
+
+    failed_sites = [
+        result for result in results if not result["success"] or result["failure"]
+    ]
+    LOGGER.info(
+        "conf_deploy:_deploy_sites: %s sites deployed, %s with failures",
+        len(results),
+        len(failed_sites),
+    )
+    if failed_sites:
+        PB.log_title(f"{len(failed_sites)} Sites with failures", end=True)
+        print(f"{'Site Name':<50} {'Site':>6} {'Failures':>9}")
+        print("".ljust(67, "-"))
+        for result in failed_sites:
+            print(
+                f"{str(result['name'])[:50]:<50} "
+                f"{'ok' if result['success'] else 'failed':>6} {result['failure']:>9}"
+            )
+        print()
+
+
+##########################################################################################
+#  DEPLOYMENT PLAN
+def _iter_step_objects(step_name: str, org_backup: dict, sites_backup: dict):
+    for obj in org_backup.get(step_name, []):
+        yield obj
+        if step_name == "sites" and isinstance(obj, dict):
+            # the site objects are deployed with the site. The sites backup may
+            # be read from the backup archive, only read each site once
+            yield sites_backup.get(obj.get("id"), {})
+
+
+def _get_object_ids(obj) -> list:
+    if isinstance(obj, dict) and obj.get("id"):
+        return [obj["id"]]
+    object_ids = []
+    if isinstance(obj, dict):
+        # site objects
+        for site_objects in obj.values():
+            if isinstance(site_objects, list):
+                for site_object in site_objects:
+                    object_ids += _get_object_ids(site_object)
+    return object_ids
+
+
+def _plan_org_deployment(org_backup: dict, sites_backup: dict) -> list:
+    """
+    Group the org steps in layers. Each step only depends on the steps from
+    the previous layers (based on the UUIDs referenced by the backup objects),
+    so the steps of the same layer can be deployed at the same time.
+    """
+    LOGGER.debug("conf_deploy:_plan_org_deployment")
+    owners = {}
+    references = {}
+    for step_name in ORG_STEPS:
+        if step_name not in org_backup:
+            continue
+        references[step_name] = set()
+        for obj in _iter_step_objects(step_name, org_backup, sites_backup):
+            for object_id in _get_object_ids(obj):
+                owners.setdefault(object_id, step_name)
+            references[step_name].update(mist_uuid_mapping.find_uuids(obj))
+    UUID_MATCHING.set_backup_ids(set(owners))
+
+    dependencies = {}
+    for step_name, uuids in references.items():
+        dependencies[step_name] = {owners[uuid] for uuid in uuids if uuid in owners}
+        LOGGER.debug(
+            "conf_deploy:_plan_org_deployment:%s depends on %s",
+            step_name,
+            dependencies[step_name],
+        )
+    layers = mist_deploy_planner.get_layers(dependencies)
+    LOGGER.info("conf_deploy:_plan_org_deployment:layers %s", layers)
+    return layers
+
+
+def _sort_step_objects(objects: list) -> list:
+    """
+    Sort the objects of a step so the objects referenced by other objects of
+    the same step are deployed first.
+    """
+    positions = {
+        obj["id"]: i
+        for i, obj in enumerate(objects)
+        if isinstance(obj, dict) and obj.get("id")
+    }
+    if len(positions) < 2:
+        return objects
+    dependencies = {}
+    for i, obj in enumerate(objects):
+        dependencies[i] = [
+            positions[uuid]
+            for uuid in mist_uuid_mapping.find_uuids(obj)
+            if uuid in positions
+        ]
+    return [objects[i] for i in mist_deploy_planner.get_order(dependencies)]
+
+
+def _deploy_deferred_updates(apisession: mistapi.APISession) -> None:
+    """
+    Update the objects created before the objects they are referencing (objects
+    referencing each other)
+    """
+    for deferred in UUID_MATCHING.pop_deferred_updates():
+        if deferred.get("object_id"):
+            new_id = _common_update(
+                apisession,
+                deferred["mist_step"],
+                deferred["scope_id"],
+                deferred["object_id"],
+                deferred["object_type"],
+                deferred["data"],
+            )
+        else:
+            new_id = _common_deploy(
+                apisession,
+                deferred["mist_step"],
+                deferred["scope_id"],
+                deferred["object_type"],
+                deferred["data"],
+                True,
+            )
+        # the failed updates are retried when the deployment is resumed
+        if new_id:
+            UUID_MATCHING.remove_deferred_update(deferred["old_id"])
 
 
 ##########################################################################################
 #  ORG FUNCTIONS
+def _deploy_org_steps(
+    apisession: mistapi.APISession,
+    org_id: str,
+    old_org_id: str,
+    step_names: list,
+    org_backup: dict,
+    sites_backup: dict,
+    merge: bool,
+    merge_action: str,
+    workers: int = DEFAULT_WORKERS,
+) -> None:
+    """
+    Deploy the org steps of the same component (steps referencing each other),
+    one after the other
+    """
+    for step_name in step_names:
+        step = ORG_STEPS[step_name]
+        if step_name in ["psks", "usermacs"]:
+            step_data = org_backup.get(step_name)
+            _bulk_import_process(
+                apisession,
+                org_id,
+                step_name,
+                step_data,
+                step,
+            )
+
+        elif step_name == "sites":
+            if merge:
+                step.load_existing_objects(apisession, org_id)
+            _deploy_sites(
+                apisession,
+                org_id,
+                old_org_id,
+                org_backup[step_name],
+                sites_backup,
+                merge,
+                merge_action,
+                workers,
+            )
+
+        elif step_name == "wlans":
+            _wlan_process(
+                apisession,
+                org_id,
+                old_org_id,
+                _sort_step_objects(org_backup[step_name]),
+                step,
+                merge,
+                merge_action,
+            )
+        else:
+            _common_process(
+                apisession,
+                org_id,
+                _sort_step_objects(org_backup[step_name]),
+                step,
+                step_name,
+                merge,
+                merge_action,
+            )
+
+
 def _deploy_org(
     apisession: mistapi.APISession,
     org_id: str,
@@ -1403,6 +2046,7 @@ def _deploy_org(
     backup: dict,
     merge: bool,
     merge_action: str,
+    workers: int = DEFAULT_WORKERS,
 ) -> None:
     LOGGER.debug("conf_deploy:_deploy_org - merge action: %s", merge_action)
     PB.log_title(f"Deploying Org {org_name}")
@@ -1416,7 +2060,10 @@ def _deploy_org(
     old_org_id = org_data["id"]
     UUID_MATCHING.add_uuid(org_id, old_org_id)
 
-    if not merge:
+    if not merge and UUID_MATCHING.is_done("org/info"):
+        PB.log_success("Org Info (already deployed)", inc=True)
+        PB.log_success("Org Settings (already deployed)", inc=True)
+    elif not merge:
         message = "Org Info "
         PB.log_message(message)
         try:
@@ -1437,83 +2084,55 @@ def _deploy_org(
                 apisession, org_id, org_settings
             )
             PB.log_success(message, inc=True)
+            UUID_MATCHING.add_done("org/info")
         except Exception:
             PB.log_failure(message, inc=True)
             LOGGER.error("Exception occurred", exc_info=True)
 
     #######################
     ####  ORG OBJECTS  ####
-    PB.log_title("Deploying Common Org Objects")
-    for step_name, step in ORG_STEPS.items():
-        if step_name in org_backup:
-            if step_name in ["psks", "usermacs"]:
-                step_data = org_backup.get(step_name)
-                _bulk_import_process(
-                    apisession,
-                    org_id,
-                    step_name,
-                    step_data,
-                    step,
-                )
-
-            elif step_name == "sites":
-                if merge:
-                    step.load_existing_objects(apisession, org_id)
-                for step_data in org_backup[step_name]:
-                    _deploy_site(
-                        apisession,
-                        org_id,
-                        old_org_id,
-                        step_data,
-                        sites_backup,
-                        merge,
-                        merge_action,
+    layers = _plan_org_deployment(org_backup, sites_backup)
+    for i, layer in enumerate(layers):
+        PB.log_title(f"Deploying Org Objects ({i + 1}/{len(layers)})")
+        if workers > 1 and len(layer) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # consume the results to raise the exceptions from the workers
+                list(
+                    executor.map(
+                        lambda step_names: _deploy_org_steps(
+                            apisession,
+                            org_id,
+                            old_org_id,
+                            step_names,
+                            org_backup,
+                            sites_backup,
+                            merge,
+                            merge_action,
+                            workers,
+                        ),
+                        layer,
                     )
-                    PB.log_title(" Deploying Other Org Objects ".center(80, "_"))
-
-            elif step_name == "wlans":
-                _wlan_process(
-                    apisession,
-                    org_id,
-                    old_org_id,
-                    org_backup[step_name],
-                    step,
-                    merge,
-                    merge_action,
                 )
-            else:
-                _common_process(
+        else:
+            for step_names in layer:
+                _deploy_org_steps(
                     apisession,
                     org_id,
-                    org_backup[step_name],
-                    step,
-                    step_name,
+                    old_org_id,
+                    step_names,
+                    org_backup,
+                    sites_backup,
                     merge,
                     merge_action,
+                    workers,
                 )
+        _deploy_deferred_updates(apisession)
 
-    PB.log_title("Retrying missing objects")
-    for replay in UUID_MATCHING.get_replay():
-        if replay.get("object_id"):
-            _common_update(
-                apisession,
-                replay["mist_step"],
-                replay["scope_id"],
-                replay["object_id"],
-                replay["object_type"],
-                replay["data"],
-            )
-        else:
-            _common_deploy(
-                apisession,
-                replay["mist_step"],
-                replay["scope_id"],
-                replay["object_type"],
-                replay["data"],
-                True,
-            )
-
-    PB.log_title("Deployment Done", end=True)
+    if PLAN.dry_run:
+        PB.log_title("Deployment Plan", end=True)
+    else:
+        PB.log_title("Deployment Done", end=True)
+    PLAN.display()
 
 
 def _start_deploy_org(
@@ -1525,6 +2144,8 @@ def _start_deploy_org(
     merge_action: str,
     src_org_name: str = "",
     source_backup: str = "",
+    workers: int = DEFAULT_WORKERS,
+    resume: bool = False,
 ) -> None:
     LOGGER.debug("conf_deploy:_start_deploy_org")
     _go_to_backup_folder(backup_folder, src_org_name, source_backup)
@@ -1532,8 +2153,8 @@ def _start_deploy_org(
     try:
         message = f"Loading template/backup file {BACKUP_FILE} "
         PB.log_message(message, display_pbar=False)
-        with open(BACKUP_FILE, "r", encoding="utf-8") as f:
-            backup = json.load(f)
+        # incremental backups are rebuilt from their base backup
+        backup = mist_backup_store.load_backup(".")
         PB.log_success(message, display_pbar=False)
     except Exception:
         PB.log_failure(message, display_pbar=False)
@@ -1549,11 +2170,13 @@ def _start_deploy_org(
             if step_name in backup["org"]:
                 steps_total += len(backup["org"][step_name])
         for site_id in backup["sites"]:
+            # the site objects may be read from the site file, only load them once
+            site_backup = backup["sites"][site_id]
             for step_name in SITE_STEPS:
                 if step_name == "settings":
                     steps_total += 1
-                elif backup["sites"][site_id].get("step_name"):
-                    steps_total += len(backup["sites"][site_id].get("step_name", []))
+                elif site_backup.get(step_name):
+                    steps_total += len(site_backup.get(step_name, []))
         PB.set_steps_total(steps_total)
         PB.log_success(message, display_pbar=False)
         console.info(f"The process will deploy {steps_total} new objects")
@@ -1563,11 +2186,56 @@ def _start_deploy_org(
         LOGGER.error("Exception occurred", exc_info=True)
         sys.exit(1)
     if backup:
-        _display_warning(
-            f"Are you sure about this? Do you want to import the configuration "
-            f"into the organization {org_name} with the id {org_id} (y/N)? "
+        journal = None
+        if not PLAN.dry_run:
+            _display_warning(
+                f"Are you sure about this? Do you want to import the configuration "
+                f"into the organization {org_name} with the id {org_id} (y/N)? "
+            )
+            journal, merge = _start_journal(org_id, merge, resume)
+        _deploy_org(
+            apisession, org_id, org_name, backup, merge, merge_action, workers
         )
-        _deploy_org(apisession, org_id, org_name, backup, merge, merge_action)
+        if journal:
+            journal.close(remove=not PB.failures)
+            if PB.failures:
+                console.warning(
+                    "Some objects were not deployed. Use the \"-r\" option to "
+                    "resume the deployment"
+                )
+
+
+def _start_journal(org_id: str, merge: bool, resume: bool) -> tuple:
+    """
+    Start the deployment journal (in the backup folder). When an interrupted
+    deployment is resumed, the objects already deployed are loaded in the UUIDs
+    mapping, and the destination org is processed as during the interrupted
+    deployment (new org or existing org)
+    """
+    if mist_deploy_journal.has_journal(".", org_id):
+        if not resume:
+            console.warning(
+                "The interrupted deployment to this org will be overwritten. "
+                "Use the \"-r\" option to resume it"
+            )
+    elif resume:
+        console.warning("No interrupted deployment found, starting a new deployment")
+        resume = False
+    try:
+        journal = mist_deploy_journal.DeployJournal(
+            ".", org_id, resume, header={"merge": merge}
+        )
+    except Exception:
+        console.critical("Unable to load the deployment journal")
+        LOGGER.error("Exception occurred", exc_info=True)
+        sys.exit(1)
+    if journal.resumed:
+        merge = journal.header.get("merge", merge)
+        console.info(
+            f"Resuming the deployment, {len(journal.uuids)} objects already deployed"
+        )
+    UUID_MATCHING.set_journal(journal)
+    return journal, merge
 
 
 #####################################################################
@@ -1739,6 +2407,9 @@ def start(
     src_org_name: str = "",
     source_backup: str = "",
     merge_action: str = "skip",
+    workers: int = DEFAULT_WORKERS,
+    plan: bool = False,
+    resume: bool = False,
 ):
     """
     Start the process to deploy a backup/template
@@ -1764,11 +2435,32 @@ def start(
         Name of the backup/template to deploy. This is the name of the folder where all the backup
         files are stored. If the backup is found, the script will NOT ask for a confirmation to use
         it
+    merge_action : str, default "skip"
+        Action to perform when an object already exists in the destination org: skip, replace,
+        rename
+    workers : int, default 1
+        Number of independent object types (object types not referencing each other), and
+        number of sites, to deploy at the same time
+    plan : bool, default False
+        If True, only display the changes (objects to create, to update, or without change) which
+        would be deployed to the destination org, without deploying them. Requires an existing
+        destination org (org_id)
+    resume : bool, default False
+        If True, resume the interrupted deployment to the org: the objects already deployed
+        (saved in the deployment journal in the backup folder) are not deployed again
     """
+    mist_rate_limiter.attach(apisession)
     current_folder = os.getcwd()
     merge = True
     if not backup_folder_param:
         backup_folder_param = BACKUP_FOLDER
+    if plan and not org_id:
+        console.critical("The plan mode requires an existing destination org (org_id)")
+        sys.exit(0)
+    if resume and not org_id:
+        console.critical("The resume mode requires the destination org (org_id)")
+        sys.exit(0)
+    PLAN.dry_run = plan
 
     if org_id and org_name:
         if not _check_org_name_in_script_param(apisession, org_id, org_name):
@@ -1785,7 +2477,16 @@ def start(
         sys.exit(0)
 
     _start_deploy_org(
-        apisession, org_id, org_name, backup_folder_param, merge, merge_action, src_org_name, source_backup
+        apisession,
+        org_id,
+        org_name,
+        backup_folder_param,
+        merge,
+        merge_action,
+        src_org_name,
+        source_backup,
+        workers,
+        resume,
     )
     os.chdir(current_folder)
 
@@ -1819,6 +2520,20 @@ This script is trying to maintain objects integrity as much as possible. To do s
 an object is referencing another object by its ID, the script will replace be ID from
 the original organization by the corresponding ID from the destination org.
 
+The deployment order is computed from the IDs referenced by the objects: the object
+types are deployed once the object types they are referencing are deployed, and the
+object types which are not depending on each other, and the sites, can be deployed at
+the same time (see the "--workers" parameter, by default they are deployed one by one).
+
+When an existing object is replaced (--merge_action=replace), the backup object is
+compared with the existing one (after replacing the IDs), and the object is only
+updated if it changed. The "--plan" parameter can be used to display the objects
+which would be created or updated, without deploying anything.
+
+The progress of the deployment is saved in a journal file (in the backup folder).
+If a deployment is interrupted or some objects were not deployed, it can be resumed
+with the "-r" option: the objects already deployed are not deployed again.
+
 -------
 Requirements:
 mistapi: https://pypi.org/project/mistapi/
@@ -1857,6 +2572,13 @@ Script Parameters:
                         default is "./org_backup"
 -b, --source_backup=    Name of the backup/template to deploy. This is the name of
                         the folder where all the backup files are stored.
+-w, --workers=          number of object types, and number of sites, to deploy at
+                        the same time
+                        default is 1
+-p, --plan              only display the objects which would be created/updated
+                        in the destination org (requires -o), without deploying
+                        them
+-r, --resume            resume the interrupted deployment to the org (requires -o)
                         
 -l, --log_file=         define the filepath/filename where to write the logs
                         default is "./script.log"
@@ -1868,6 +2590,9 @@ Script Parameters:
 Examples:
 python3 ./org_conf_deploy.py
 python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "my test org"
+python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "my test org" --workers=4
+python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "my test org" -m replace --plan
+python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "my test org" --resume
 
 """
     )
@@ -1929,6 +2654,9 @@ if __name__ == "__main__":
 Examples:
 python3 ./org_conf_deploy.py
 python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "my test org"
+python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "my test org" --workers=4
+python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "my test org" -m replace --plan
+python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "my test org" --resume
         """,
     )
 
@@ -1972,6 +2700,26 @@ python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "m
         default="skip",
         choices=["skip", "replace", "rename"],
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of object types, and number of sites, to deploy at the same time",
+    )
+    parser.add_argument(
+        "-p",
+        "--plan",
+        action="store_true",
+        default=False,
+        help="only display the objects which would be created/updated, without deploying them",
+    )
+    parser.add_argument(
+        "-r",
+        "--resume",
+        action="store_true",
+        help="resume the interrupted deployment to the org",
+    )
 
     args = parser.parse_args()
 
@@ -1983,6 +2731,9 @@ python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "m
     LOG_FILE = args.log_file
     KEYRING_SERVICE = args.keyring_service
     MERGE_ACTION = args.merge_action
+    WORKERS = max(1, args.workers)
+    PLAN_MODE = args.plan
+    RESUME = args.resume
     if KEYRING_SERVICE:
         ENV_FILE = None
 
@@ -2001,6 +2752,17 @@ python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "m
     LOGGER.info("Destination Org ID: %s", ORG_ID if ORG_ID else "ask user")
     LOGGER.info("Destination Org Name: %s", ORG_NAME if ORG_NAME else "ask user")
     LOGGER.info("Merge action: %s", MERGE_ACTION)
+    LOGGER.info("Workers: %s", WORKERS)
+    LOGGER.info("Plan mode: %s", PLAN_MODE)
+    LOGGER.info("Resume: %s", RESUME)
     start(
-        APISESSION, ORG_ID, ORG_NAME, BACKUP_FOLDER_PARAM, SOURCE_BACKUP, merge_action=MERGE_ACTION
+        APISESSION,
+        ORG_ID,
+        ORG_NAME,
+        BACKUP_FOLDER_PARAM,
+        SOURCE_BACKUP,
+        merge_action=MERGE_ACTION,
+        workers=WORKERS,
+        plan=PLAN_MODE,
+        resume=RESUME,
     )
@@ -73,7 +73,6 @@ python3 ./org_conf_deploy_maps.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4
 
 #### IMPORTS ####
 import logging
-import json
 import os
 import sys
 import argparse
@@ -99,6 +98,21 @@ except ImportError:
     )
     sys.exit(2)
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+try:
+    import mist_backup_store
+except ImportError:
+    print(
+        """
+        Critical:
+        This script is using other scripts from the mist_library to perform all the
+        action. Please make sure the following python files are in the "utils" folder
+        of the mist_library:
+            - mist_backup_store.py
+        """
+    )
+    sys.exit(2)
+
 #####################################################################
 #### PARAMETERS #####
 BACKUP_FOLDER = "./org_backup"
@@ -515,8 +529,9 @@ def _start_deploy_maps(
     try:
         message = f"Loading template/backup file {BACKUP_FILE} "
         PB.log_message(message, display_pbar=False)
-        with open(BACKUP_FILE) as f:
-            backup = json.load(f)
+        # only the org sites list is needed, and the objects of each site are
+        # only read from the backup when the site maps are deployed
+        backup = mist_backup_store.load_backup(".", org_steps=["sites"])
         PB.log_success(message, display_pbar=False)
     except Exception:
         PB.log_failure(message, display_pbar=False)
@@ -536,13 +551,14 @@ def _start_deploy_maps(
         for site_id in backup.get("sites", []):
             if UUID_MATCHING.get_new_uuid(site_id):
                 sites_in_new_org.append(site_id)
-                if len(backup["sites"][site_id].get("maps", [])) > 0:
+                site_backup = backup["sites"][site_id]
+                if len(site_backup.get("maps", [])) > 0:
                     sites_with_maps.append(site_id)
-                    maps_to_restore += len(backup["sites"][site_id].get("maps", []))
-                    steps += len(backup["sites"][site_id].get("maps", []))
-                steps += len(backup["sites"][site_id].get("zones", []))
-                steps += len(backup["sites"][site_id].get("rssizones", []))
-                steps += len(backup["sites"][site_id].get("vbeacons", []))
+                    maps_to_restore += len(site_backup.get("maps", []))
+                    steps += len(site_backup.get("maps", []))
+                steps += len(site_backup.get("zones", []))
+                steps += len(site_backup.get("rssizones", []))
+                steps += len(site_backup.get("vbeacons", []))
         PB.set_steps_total(steps)
         PB.log_success(message, display_pbar=False)
         console.info(f"The process will deploy {maps_to_restore} new objects")
@@ -566,7 +582,8 @@ def _start_deploy_maps(
             new_site_id = UUID_MATCHING.get_new_uuid(old_site_id)
             site_name = UUID_MATCHING.get_uuid_name(old_site_id)
             PB.log_title(f"Deploying maps for site {site_name}")
-            for map_data in backup["sites"][old_site_id].get("maps", []):
+            site_backup = backup["sites"][old_site_id]
+            for map_data in site_backup.get("maps", []):
                 old_map_id = map_data.get("id", "")
                 floorplan_name = map_data.get("name", "<unknown>")
                 new_map_id = _deploy_floorplan(
@@ -583,19 +600,19 @@ def _start_deploy_maps(
                     new_map_id,
                     floorplan_name,
                 )
-            for zone_data in backup["sites"][old_site_id].get("zones", []):
+            for zone_data in site_backup.get("zones", []):
                 _deploy_zones(
                     apisession,
                     new_site_id,
                     zone_data,
                 )
-            for rssi_zone_data in backup["sites"][old_site_id].get("rssizones", []):
+            for rssi_zone_data in site_backup.get("rssizones", []):
                 _deploy_rssi_zones(
                     apisession,
                     new_site_id,
                     rssi_zone_data,
                 )
-            for vbeacon_data in backup["sites"][old_site_id].get("vbeacons", []):
+            for vbeacon_data in site_backup.get("vbeacons", []):
                 _deploy_virtual_beacons(
                     apisession,
                     new_site_id,
@@ -9,7 +9,9 @@
 -------------------------------------------------------------------------------
 Python script to deploy organization backup/template file.
 You can use the script "org_conf_backup.py" to generate the backup file from an
-existing organization.
+existing organization. The backups saved in the backup archive
+(org_conf_archive.gz), the incremental backups and the legacy backup files
+(org_conf_file.json) can be deployed.
 
 This script cannot restore the configuration to an existing organization, and 
 will only allow to deploy the configuration to a new org.
@@ -22,6 +24,10 @@ destination org.
 Requirements:
 mistapi: https://pypi.org/project/mistapi/
 
+This script requires the following scripts to be in the "utils" folder of the
+mist_library:
+- mist_backup_store.py
+
 -------
 Usage:
 This script can be run as is (without parameters), or with the options below.
@@ -85,6 +91,19 @@ except:
         """)
         sys.exit(2)
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+try:
+    import mist_backup_store
+except ImportError:
+    print("""
+        Critical: 
+        This script is using other scripts from the mist_library to perform all the
+        action. Please make sure the following python files are in the "utils" folder
+        of the mist_library:
+            - mist_backup_store.py
+        """)
+    sys.exit(2)
+
 #####################################################################
 #### PARAMETERS #####
 backup_folder = "./org_backup"
@@ -544,8 +563,8 @@ def _start_deploy_org(apisession: mistapi.APISession, org_id: str, org_name: str
     try:
         message = f"Loading template/backup file {backup_file} "
         pb.log_message(message, display_pbar=False)
-        with open(backup_file) as f:
-            backup = json.load(f)
+        # incremental backups are rebuilt from their base backup
+        backup = mist_backup_store.load_backup(".")
         pb.log_success(message, display_pbar=False)
     except:
         pb.log_failure(message, display_pbar=False)
@@ -759,7 +778,9 @@ def usage():
 -------------------------------------------------------------------------------
 Python script to deploy organization backup/template file.
 You can use the script "org_conf_backup.py" to generate the backup file from an
-existing organization.
+existing organization. The backups saved in the backup archive
+(org_conf_archive.gz), the incremental backups and the legacy backup files
+(org_conf_file.json) can be deployed.
 
 This script cannot restore the configuration to an existing organization, and 
 will only allow to deploy the configuration to a new org.
@@ -772,6 +793,10 @@ destination org.
 Requirements:
 mistapi: https://pypi.org/project/mistapi/
 
+This script requires the following scripts to be in the "utils" folder of the
+mist_library:
+- mist_backup_store.py
+
 -------
 Usage:
 This script can be run as is (without parameters), or with the options below.
@@ -62,7 +62,6 @@ import os
 import datetime
 import json
 import argparse
-import urllib.request
 
 
 MISTAPI_MIN_VERSION = "0.44.1"
@@ -85,6 +84,23 @@ except ImportError:
     )
     sys.exit(2)
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+try:
+    import mist_image_store
+    import mist_rate_limiter
+except ImportError:
+    print(
+        """
+        Critical:
+        This script is using other scripts from the mist_library to perform all the
+        action. Please make sure the following python files are in the "utils" folder
+        of the mist_library:
+            - mist_image_store.py
+            - mist_rate_limiter.py
+        """
+    )
+    sys.exit(2)
+
 #####################################################################
 #### PARAMETERS #####
 DEFAULT_BACKUP_FOLDER = "./org_backup"
@@ -100,6 +116,8 @@ LOGGER = logging.getLogger(__name__)
 #####################################################################
 # BACKUP OBJECTS REFS
 DEVICE_TYPES = ["ap", "switch", "gateway", "mxedge"]
+# device types returned by listSiteDevices
+SITE_DEVICE_TYPES = ["ap", "switch", "gateway"]
 
 
 #####################################################################
@@ -306,13 +324,21 @@ def _backup_inventory(
     org_id: str,
     org_name: str = "",
     backup: dict|None = None,
+    image_store: mist_image_store.ImageStore|None = None,
 ) -> None:
     PB.log_title(f"Backing up Org {org_name} Elements ")
+    close_image_store = image_store is None
+    if close_image_store:
+        image_store = mist_image_store.ImageStore(".")
     if backup is None:
         backup = {}
     backup["org"]["id"] = org_id
     ################################################
     ##  Backing up inventory
+    # the inventory is also used to find the sites with devices assigned, so
+    # the devices are only listed (with their configuration) for these sites
+    inventory_sites = {}
+    inventory_complete = True
     for device_type in DEVICE_TYPES:
         message = f"Backing up {device_type} magics"
         PB.log_message(message)
@@ -322,6 +348,8 @@ def _backup_inventory(
             )
             inventory = mistapi.get_all(mist_session, response)
             for data in inventory:
+                if data.get("site_id") and device_type in SITE_DEVICE_TYPES:
+                    inventory_sites.setdefault(data["site_id"], []).append(data["mac"])
                 if data.get("magic"):
                     backup["org"]["magics"][data["mac"]] = data["magic"]
                     backup["org"]["devices"].append({
@@ -331,6 +359,7 @@ def _backup_inventory(
                     })
             PB.log_success(message, True)
         except Exception:
+            inventory_complete = False
             PB.log_failure(message, True)
             LOGGER.error("Exception occurred", exc_info=True)
 
@@ -408,33 +437,49 @@ def _backup_inventory(
         PB.log_title(f"Backing up Site {site['name']}")
         message = "Devices List"
         PB.log_message(message)
+        devices = []
         try:
             _backup_site_id_dict(site, backup)
-            backup["org"]["sites"][site["name"]]["old_maps_ids"] = _backup_site_maps(
-                mist_session, site
-            )
-            response = mistapi.api.v1.sites.devices.listSiteDevices(
-                mist_session, site["id"], type="all", limit=1000
-            )
-            devices = mistapi.get_all(mist_session, response)
-            backup["org"]["sites"][site["name"]]["devices"] = devices
+            if inventory_complete and site["id"] not in inventory_sites:
+                # no device assigned to the site, nothing else to backup
+                LOGGER.debug(
+                    "_backup_inventory:no device assigned to site %s", site["id"]
+                )
+            else:
+                response = mistapi.api.v1.sites.devices.listSiteDevices(
+                    mist_session, site["id"], type="all", limit=1000
+                )
+                devices = mistapi.get_all(mist_session, response)
+                backup["org"]["sites"][site["name"]]["devices"] = devices
+                # the maps are only required to restore the devices position
+                if any(device.get("map_id") for device in devices):
+                    backup["org"]["sites"][site["name"]]["old_maps_ids"] = (
+                        _backup_site_maps(mist_session, site)
+                    )
             PB.log_success(message, True)
         except Exception:
             PB.log_failure(message, True)
             LOGGER.error("Exception occurred", exc_info=True)
         ################################################
         ## Backing up Site Devices Images
+        # the images of all the site devices are downloaded in parallel by the
+        # image store
+        downloads = {}
+        for device in devices:
+            downloads[device["mac"]] = []
+            i = 1
+            while f"image{i}_url" in device:
+                url = device[f"image{i}_url"]
+                image_name = f"{FILE_PREFIX}_org_{org_id}_device_{device['serial']}_image_{i}.png"
+                downloads[device["mac"]].append(image_store.submit(url, image_name))
+                i += 1
         for device in devices:
             _no_magic(backup, site["name"], device)
             message = f"Backing up {device['type'].upper()} {device['serial']} images"
             PB.log_message(message)
             try:
-                i = 1
-                while f"image{i}_url" in device:
-                    url = device[f"image{i}_url"]
-                    image_name = f"{FILE_PREFIX}_org_{org_id}_device_{device['serial']}_image_{i}.png"
-                    urllib.request.urlretrieve(url, image_name)
-                    i += 1
+                for download in downloads[device["mac"]]:
+                    download.result()
                 PB.log_success(message, True)
             except Exception:
                 PB.log_failure(message, True)
@@ -442,6 +487,8 @@ def _backup_inventory(
 
     ################################################
     ## End
+    if close_image_store:
+        image_store.close()
     PB.log_title("Backup Done", end=True)
     print()
 
@@ -558,6 +605,7 @@ def start(
         name 
 
     """
+    mist_rate_limiter.attach(mist_session)
     current_folder = os.getcwd()
     if not backup_folder:
         backup_folder = DEFAULT_BACKUP_FOLDER
@@ -98,9 +98,10 @@ python3 ./org_inventory_deploy.py \
 import json
 import os
 import sys
-import re
 import logging
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
 
 MISTAPI_MIN_VERSION = "0.44.1"
@@ -123,6 +124,23 @@ except ImportError:
     )
     sys.exit(2)
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+try:
+    import mist_rate_limiter
+    import mist_uuid_mapping
+except ImportError:
+    print(
+        """
+        Critical:
+        This script is using other scripts from the mist_library to perform all the
+        action. Please make sure the following python files are in the "utils" folder
+        of the mist_library:
+            - mist_rate_limiter.py
+            - mist_uuid_mapping.py
+        """
+    )
+    sys.exit(2)
+
 
 #####################################################################
 #### PARAMETERS #####
@@ -132,6 +150,10 @@ FILE_PREFIX = ".".join(BACKUP_FILE.split(".")[:-1])
 LOG_FILE = "./script.log"
 SOURCE_ENV_FILE = "~/.mist_env"
 DEST_ENV_FILE = None
+# number of devices unclaimed/claimed per request, and number of requests
+# sent at the same time
+CLAIM_BATCH_SIZE = 100
+CLAIM_WORKERS = 4
 
 #####################################################################
 #### LOGS ####
@@ -248,59 +270,6 @@ class UUIDM:
         """
         return self.requests_to_replay
 
-    def _uuid_string(self, obj_str: str, missing_uuids: list) -> tuple:
-        """
-        Find and replace UUIDs in a string representation of an object.
-        :param obj_str: The string representation of the object
-        :param missing_uuids: A list to store missing UUIDs
-        :return: A tuple containing the updated string and the list of missing UUIDs
-        """
-        uuid_re = '"[a-zA_Z_-]*": "[0-9a-f]{8}-[0-9a-f]{4}-[0-5][0-9a-f]{3}-[089ab][0-9a-f]{3}-[0-9a-f]{12}"'
-        uuids_to_replace = re.findall(uuid_re, obj_str)
-        if uuids_to_replace:
-            for uuid in uuids_to_replace:
-                uuid_key = uuid.replace('"', "").split(":")[0].strip()
-                uuid_val = uuid.replace('"', "").split(":")[1].strip()
-                if self.get_new_uuid(uuid_val):
-                    obj_str = obj_str.replace(uuid_val, self.get_new_uuid(uuid_val))
-                elif uuid_key not in [
-                    "issuer",
-                    "idp_sso_url",
-                    "custom_logout_url",
-                    "sso_issuer",
-                    "sso_idp_sso_url",
-                    "ibeacon_uuid",
-                ]:
-                    missing_uuids.append({uuid_key: uuid_val})
-        return obj_str, missing_uuids
-
-    def _uuid_list(self, obj_str: str, missing_uuids: list) -> tuple:
-        """
-        Find and replace UUIDs in a list representation of an object.
-        :param obj_str: The string representation of the object
-        :param missing_uuids: A list to store missing UUIDs
-        :return: A tuple containing the updated string and the list of missing UUIDs
-        """
-        uuid_list_re = r"(\"[a-zA_Z_-]*\": \[\"[0-9a-f]{8}-[0-9a-f]{4}-[0-5][0-9a-f]{3}-[089ab][0-9a-f]{3}-[0-9a-f]{12}\"[^\]]*)]"
-        uuid_lists_to_replace = re.findall(uuid_list_re, obj_str)
-        if uuid_lists_to_replace:
-            for uuid_list in uuid_lists_to_replace:
-                uuid_key = uuid_list.replace('"', "").split(":")[0].strip()
-                uuids = (
-                    uuid_list.replace('"', "")
-                    .replace("[", "")
-                    .replace("]", "")
-                    .split(":")[1]
-                    .split(",")
-                )
-                for uuid in uuids:
-                    uuid_val = uuid.strip()
-                    if self.get_new_uuid(uuid_val):
-                        obj_str = obj_str.replace(uuid_val, self.get_new_uuid(uuid_val))
-                    else:
-                        missing_uuids.append({uuid_key: uuid_val})
-        return obj_str, missing_uuids
-
     def find_and_replace(self, obj: dict, object_type: str) -> tuple:
         """
         Find and replace UUIDs in a dictionary object.
@@ -316,12 +285,7 @@ class UUIDM:
                 del obj[id_name]
 
         # REPLACE REMAINING IDS
-        obj_str = json.dumps(obj)
-        obj_str, missing_uuids = self._uuid_string(obj_str, [])
-        obj_str, missing_uuids = self._uuid_list(obj_str, missing_uuids)
-        obj = json.loads(obj_str)
-
-        return obj, missing_uuids
+        return mist_uuid_mapping.remap(obj, self.uuids)
 
 
 uuid_matching = UUIDM()
@@ -337,6 +301,7 @@ class ProgressBar:
     def __init__(self):
         self.steps_total = 0
         self.steps_count = 0
+        self._lock = threading.RLock()
 
     def _pb_update(self, size: int = 80):
         if self.steps_count > self.steps_total:
@@ -357,22 +322,24 @@ class ProgressBar:
         size: int = 80,
         display_pbar: bool = True,
     ):
-        if inc:
-            self.steps_count += 1
-        text = f"\033[A\033[F{message}"
-        print(f"{text} ".ljust(size + 4, "."), result)
-        print("".ljust(80))
-        if display_pbar:
-            self._pb_update(size)
+        with self._lock:
+            if inc:
+                self.steps_count += 1
+            text = f"\033[A\033[F{message}"
+            print(f"{text} ".ljust(size + 4, "."), result)
+            print("".ljust(80))
+            if display_pbar:
+                self._pb_update(size)
 
     def _pb_title(
         self, text: str, size: int = 80, end: bool = False, display_pbar: bool = True
     ):
-        print("\033[A")
-        print(f" {text} ".center(size, "-"), "\n")
-        if not end and display_pbar:
-            print("".ljust(80))
-            self._pb_update(size)
+        with self._lock:
+            print("\033[A")
+            print(f" {text} ".center(size, "-"), "\n")
+            if not end and display_pbar:
+                print("".ljust(80))
+                self._pb_update(size)
 
     def set_steps_total(self, steps_total: int) -> None:
         """
@@ -461,24 +428,18 @@ def _unclaim_devices(
     src_apisession: mistapi.APISession,
     src_org_id: str,
     devices: list,
-    magics: dict,
     failed_devices: dict,
     proceed: bool = False,
-    unclaim_all: bool = False,
 ) -> None:
     LOGGER.debug("inventory_deploy:_unclaim_devices")
     serials = []
-    macs = []
     serial_to_mac = {}
     for device in devices:
-        if device.get("mac") in magics:
-            if device.get("type") == "ap" or unclaim_all:
-                serials.append(device["serial"])
-                macs.append(device["mac"])
-                serial_to_mac[device["serial"]] = device["mac"]
+        serials.append(device["serial"])
+        serial_to_mac[device["serial"]] = device["mac"]
     if serials:
+        message = f"Unclaiming {len(serials)} devices from source Org"
         try:
-            message = f"Unclaiming {len(serials)} devices from source Org"
             PB.log_message(message)
             if not proceed:
                 PB.log_success(message, inc=True)
@@ -491,7 +452,6 @@ def _unclaim_devices(
                     i = 0
                     for failed_serial in response.data["error"]:
                         mac = serial_to_mac[failed_serial]
-                        message = f"Unable to claim device {mac}: {response.data['reason'][i]}"
                         failed_devices[mac] = (
                             f"Unable to unclaim device {mac}: {response.data['reason'][i]}"
                         )
@@ -501,14 +461,14 @@ def _unclaim_devices(
                 else:
                     PB.log_failure(message, inc=True)
                     for device in devices:
-                        if (
-                            device.get("mac") in magics
-                            and device.get("serial") not in failed_devices
-                        ):
-                            failed_devices[device["mac"]] = "Unable to claim the device"
+                        if device["mac"] not in failed_devices:
+                            failed_devices[device["mac"]] = "Unable to unclaim the device"
         except Exception:
             PB.log_failure(message, inc=True)
             LOGGER.error("Exception occurred", exc_info=True)
+            for device in devices:
+                if device["mac"] not in failed_devices:
+                    failed_devices[device["mac"]] = "Unable to unclaim the device"
 
 
 def _claim_devices(
@@ -518,23 +478,18 @@ def _claim_devices(
     magics: dict,
     failed_devices: dict,
     proceed: bool = False,
-    unclaim_all: bool = False,
 ) -> None:
     LOGGER.debug("inventory_deploy:_claim_devices")
     magics_to_claim = []
     magic_to_mac = {}
     for device in devices:
-        if device.get("mac") in magics and device.get("mac") not in failed_devices:
-            if device.get("type") == "ap" or unclaim_all:
-                magics_to_claim.append(magics[device["mac"]])
-                magic_to_mac[magics[device["mac"]]] = device["mac"]
+        if device["mac"] not in failed_devices:
+            magics_to_claim.append(magics[device["mac"]])
+            magic_to_mac[magics[device["mac"]]] = device["mac"]
 
-    if not magics_to_claim:
-        PB.log_success("No device to claim", inc=True)
-        return
-    else:
+    if magics_to_claim:
+        message = f"Claiming {len(magics_to_claim)} devices"
         try:
-            message = f"Claiming {len(magics_to_claim)} devices"
             PB.log_message(message)
             if not proceed:
                 PB.log_success(message, inc=True)
@@ -547,7 +502,6 @@ def _claim_devices(
                     i = 0
                     for failed_magic in response.data["error"]:
                         mac = magic_to_mac[failed_magic]
-                        message = f"Unable to claim device {mac}: {response.data['reason'][i]}"
                         failed_devices[mac] = (
                             f"Unable to claim device {mac}: {response.data['reason'][i]}"
                         )
@@ -556,15 +510,69 @@ def _claim_devices(
                     PB.log_success(message, inc=True)
                 else:
                     PB.log_failure(message, inc=True)
-                    for device in devices:
-                        if (
-                            device.get("mac") in magics
-                            and device.get("serial") not in failed_devices
-                        ):
-                            failed_devices[device["mac"]] = "Unable to claim the device"
+                    for mac in magic_to_mac.values():
+                        if mac not in failed_devices:
+                            failed_devices[mac] = "Unable to claim the device"
         except Exception:
             PB.log_failure(message, inc=True)
             LOGGER.error("Exception occurred", exc_info=True)
+            for mac in magic_to_mac.values():
+                if mac not in failed_devices:
+                    failed_devices[mac] = "Unable to claim the device"
+
+
+def _claim_inventory(
+    src_apisession: mistapi.APISession | None,
+    dst_apisession: mistapi.APISession,
+    src_org_id: str,
+    dst_org_id: str,
+    devices: list,
+    magics: dict,
+    failed_devices: dict,
+    proceed: bool = False,
+    unclaim: bool = False,
+    unclaim_all: bool = False,
+) -> None:
+    """
+    Unclaim the devices from the source org (if `unclaim`) and claim them in
+    the destination org.
+
+    The devices from all the sites are grouped in batches of CLAIM_BATCH_SIZE
+    devices, and CLAIM_WORKERS batches are processed at the same time. Each
+    batch is claimed in the destination org as soon as it is unclaimed from
+    the source org. The devices which cannot be unclaimed/claimed are added
+    to `failed_devices` (per MAC address).
+    """
+    LOGGER.debug("inventory_deploy:_claim_inventory")
+    devices_to_claim = []
+    macs = set()
+    for device in devices:
+        mac = device.get("mac")
+        if mac in magics and mac not in macs and mac not in failed_devices:
+            if device.get("type") == "ap" or unclaim_all:
+                devices_to_claim.append(device)
+                macs.add(mac)
+    if not devices_to_claim:
+        PB.log_success("No device to claim", inc=True)
+        return
+
+    batches = [
+        devices_to_claim[i : i + CLAIM_BATCH_SIZE]
+        for i in range(0, len(devices_to_claim), CLAIM_BATCH_SIZE)
+    ]
+    LOGGER.debug(
+        "inventory_deploy:_claim_inventory:%s devices in %s batches",
+        len(devices_to_claim),
+        len(batches),
+    )
+
+    def _process_batch(batch: list) -> None:
+        if unclaim and src_apisession:
+            _unclaim_devices(src_apisession, src_org_id, batch, failed_devices, proceed)
+        _claim_devices(dst_apisession, dst_org_id, batch, magics, failed_devices, proceed)
+
+    with ThreadPoolExecutor(max_workers=CLAIM_WORKERS) as executor:
+        list(executor.map(_process_batch, batches))
 
 
 def _assign_device_to_site(
@@ -587,11 +595,12 @@ def _assign_device_to_site(
     if not macs_to_assign:
         PB.log_success("No device to assign", inc=True)
         return
-    else:
-        if len(macs_to_assign) == 1:
-            message = f"Assigning {len(macs_to_assign)} device to the Site"
+    for i in range(0, len(macs_to_assign), CLAIM_BATCH_SIZE):
+        macs = macs_to_assign[i : i + CLAIM_BATCH_SIZE]
+        if len(macs) == 1:
+            message = f"Assigning {len(macs)} device to the Site"
         else:
-            message = f"Assigning {len(macs_to_assign)} devices to the Site"
+            message = f"Assigning {len(macs)} devices to the Site"
 
         try:
             PB.log_message(message)
@@ -601,22 +610,21 @@ def _assign_device_to_site(
                 response = mistapi.api.v1.orgs.inventory.updateOrgInventoryAssignment(
                     dst_apisession,
                     dst_org_id,
-                    {"macs": macs_to_assign, "site_id": dst_site_id, "op": "assign"},
+                    {"macs": macs, "site_id": dst_site_id, "op": "assign"},
                 )
                 if response.data.get("error"):
                     PB.log_warning(message, inc=True)
-                    i = 0
+                    j = 0
                     for failed_mac in response.data["error"]:
-                        message = f"Unable to assign device {failed_mac} to site {site_name}: {response.data['reason'][i]}"
                         failed_devices[failed_mac] = (
-                            f"Unable to assign device {failed_mac} to site {site_name}: {response.data['reason'][i]}"
+                            f"Unable to assign device {failed_mac} to site {site_name}: {response.data['reason'][j]}"
                         )
-                        i += 1
+                        j += 1
                 elif response.status_code == 200:
                     PB.log_success(message, inc=True)
                 else:
                     PB.log_failure(message, inc=True)
-                    for mac in macs_to_assign:
+                    for mac in macs:
                         if mac and mac not in failed_devices:
                             failed_devices[mac] = (
                                 f"Unable to assign the device to site {site_name}"
@@ -693,40 +701,17 @@ def _restore_device_images(
 
 
 def _restore_devices(
-    src_apisession: mistapi.APISession | None,
     dst_apisession: mistapi.APISession,
     src_org_id: str,
     dst_org_id: str,
     dst_site_id: str,
     site_name: str,
     devices: list,
-    magics: dict,
-    processed_macs: list,
     failed_devices: dict,
     proceed: bool = False,
-    unclaim: bool = False,
     unclaim_all: bool = False,
 ) -> None:
     LOGGER.debug("inventory_deploy:_restore_devices")
-    if unclaim and src_apisession:
-        _unclaim_devices(
-            src_apisession,
-            src_org_id,
-            devices,
-            magics,
-            failed_devices,
-            proceed,
-            unclaim_all,
-        )
-    _claim_devices(
-        dst_apisession,
-        dst_org_id,
-        devices,
-        magics,
-        failed_devices,
-        proceed,
-        unclaim_all,
-    )
     _assign_device_to_site(
         dst_apisession,
         dst_org_id,
@@ -738,7 +723,6 @@ def _restore_devices(
         unclaim_all,
     )
     for device in devices:
-        processed_macs.append(device["mac"])
         if device["mac"] not in failed_devices:
             if device.get("type") == "ap" or unclaim_all:
                 issue_config = _update_device_configuration(
@@ -763,54 +747,6 @@ def _restore_devices(
                     )
 
 
-def _restore_unassigned_devices(
-    src_apisession: mistapi.APISession | None,
-    dst_apisession: mistapi.APISession,
-    src_org_id: str,
-    dst_org_id: str,
-    processed_macs: list,
-    magics: dict,
-    devices: dict,
-    failed_devices: dict,
-    proceed: bool = False,
-    unclaim: bool = False,
-    unclaim_all: bool = False,
-) -> None:
-    LOGGER.debug("inventory_deploy:_restore_unassigned_devices")
-    devices_not_assigned = []
-
-    for device in devices:
-        if device["mac"] not in processed_macs:
-            LOGGER.debug(
-                "inventory_deploy:_restore_unassigned_devices:new unassigned device found %s",
-                device["mac"],
-            )
-            devices_not_assigned.append(device)
-    LOGGER.debug(
-        "inventory_deploy:_restore_unassigned_devices:list of unassigned device found %s",
-        devices_not_assigned,
-    )
-    if unclaim and src_apisession:
-        _unclaim_devices(
-            src_apisession,
-            src_org_id,
-            devices_not_assigned,
-            magics,
-            failed_devices,
-            proceed,
-            unclaim_all,
-        )
-    _claim_devices(
-        dst_apisession,
-        dst_org_id,
-        devices_not_assigned,
-        magics,
-        failed_devices,
-        proceed,
-        unclaim_all,
-    )
-
-
 ##########################################################################################
 ### IDs Matching
 def _process_ids(
@@ -933,11 +869,12 @@ def _deploy(
     _process_org_ids(dst_apisession, dst_org_id, org_backup)
 
     failed_devices = {}
-    processed_macs: list[str] = []
+    sites_to_restore = []
+    processed_macs = set()
 
+    PB.log_title("Checking Sites")
     for restore_site_name in org_backup["sites"]:
         if not filter_site_names or restore_site_name in filter_site_names:
-            PB.log_title(f"Processing Site {restore_site_name}")
             site = org_backup["sites"][restore_site_name]
             dst_site_id = uuid_matching.get_new_uuid(site["id"])
 
@@ -945,33 +882,45 @@ def _deploy(
                 uuid_matching.add_missing_uuid("site", site["id"], restore_site_name)
             else:
                 _process_site_ids(dst_apisession, dst_site_id, restore_site_name, site)
-                _restore_devices(
-                    src_apisession,
-                    dst_apisession,
-                    src_org_id,
-                    dst_org_id,
-                    dst_site_id,
-                    restore_site_name,
-                    site["devices"],
-                    org_backup["magics"],
-                    processed_macs,
-                    failed_devices,
-                    proceed,
-                    unclaim,
-                    unclaim_all,
-                )
+                sites_to_restore.append((restore_site_name, dst_site_id, site))
+                processed_macs.update(device["mac"] for device in site["devices"])
+
+    # devices from all the sites (and the unassigned devices) are claimed
+    # first, by batches
+    devices_to_claim = [
+        device for _, _, site in sites_to_restore for device in site["devices"]
+    ]
     if not filter_site_names:
-        _restore_unassigned_devices(
-            src_apisession,
+        devices_to_claim += [
+            device
+            for device in org_backup["devices"]
+            if device["mac"] not in processed_macs
+        ]
+    PB.log_title("Claiming Devices")
+    _claim_inventory(
+        src_apisession,
+        dst_apisession,
+        src_org_id,
+        dst_org_id,
+        devices_to_claim,
+        org_backup["magics"],
+        failed_devices,
+        proceed,
+        unclaim,
+        unclaim_all,
+    )
+
+    for restore_site_name, dst_site_id, site in sites_to_restore:
+        PB.log_title(f"Processing Site {restore_site_name}")
+        _restore_devices(
             dst_apisession,
             src_org_id,
             dst_org_id,
-            processed_macs,
-            org_backup["magics"],
-            org_backup["devices"],
+            dst_site_id,
+            restore_site_name,
+            site["devices"],
             failed_devices,
             proceed,
-            unclaim,
             unclaim_all,
         )
     return _result(failed_devices, proceed)
@@ -1261,6 +1210,9 @@ def start(
         filter_site_names = []
     if not backup_folder_param:
         backup_folder_param = BACKUP_FOLDER
+    mist_rate_limiter.attach(dst_apisession)
+    if src_apisession:
+        mist_rate_limiter.attach(src_apisession)
 
     current_folder = os.getcwd()
 
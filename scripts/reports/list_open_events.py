@@ -57,7 +57,7 @@ with the "-t"/"--event_types=" CLI parameter to configure the script):
 | ME_FAN                        | ME_FAN_UNPLUGGED                                                                  | ME_FAN_PLUGGED                                                |
 | ME_POWERINPUT                 | ME_POWERINPUT_DISCONNECTED                                                        | ME_POWERINPUT_CONNECTED                                       |
 | ME_PSU                        | ME_PSU_UNPLUGGED                                                                  | ME_PSU_PLUGGED                                                |
-| ME_SERVICE                    | ME_SERVICE_CRASHED,ME_SERVICE_FAILED                                              | ME_SERVICE_STARTED                                            |
+| ME_SERVICE                    | ME_SERVICE_FAILED,ME_SERVICE_CRASHED                                              | ME_SERVICE_STARTED                                            |
 | SW_ALARM_CHASSIS_FAN          | SW_ALARM_CHASSIS_FAN                                                              | SW_ALARM_CHASSIS_FAN_CLEAR                                    |
 | SW_ALARM_CHASSIS_HOT          | SW_ALARM_CHASSIS_HOT                                                              | SW_ALARM_CHASSIS_HOT_CLEAR                                    |
 | SW_ALARM_CHASSIS_HUMIDITY     | SW_ALARM_CHASSIS_HUMIDITY                                                         | SW_ALARM_CHASSIS_HUMIDITY_CLEAR                               |
@@ -106,6 +106,28 @@ watch -n 30 python3 ./list_open_events.py \
         -o 9777c1a0-xxxx-xxxx-xxxx-xxxxxxxxxxxx \
         -d 1w -t GW_ARP,GW_BGP_NEIGHBOR,GW_TUNNEL
 
+NOTE 3:
+When the script is run periodically, the "-f"/"--state_file=" parameter can be
+used to save the status of the events in a local SQLite file, with the
+timestamp of the last processed event. The next runs only retrieve the events
+received since this timestamp (with a 10 minutes overlap for the events
+ingested late, the events already processed are ignored), and apply them to the
+saved status.
+The state file is reset (and the events retrieved for the whole duration) if
+the Org or the event types are changed, or if the last processed event is
+older than the duration. The status of the events which did not change during
+the duration is removed from the state file.
+When using a state file, the Trigger Count and Clear Count are cumulative: they
+are counting the events since the status of the event was added to the state
+file (which may be before the duration), not only the events received during
+the duration.
+
+example:
+watch -n 300 python3 ./list_open_events.py \
+        -e ~/.mist_env \
+        -o 9777c1a0-xxxx-xxxx-xxxx-xxxxxxxxxxxx \
+        -d 1w -f ./list_open_events.sqlite
+
 -------
 Requirements:
 mistapi: https://pypi.org/project/mistapi/
@@ -135,6 +157,13 @@ Script Parameters:
                             and processed.
 -d, --duration              duration of the events to look at
                             default: 1d
+-s, --slices=               number of time slices used to retrieve the events. When set to more
+                            than 1, the duration is split in time slices retrieved concurrently
+                            (recommended for big Organizations with many events)
+                            default: 1
+-f, --state_file=           Path to the SQLite file where to save the status of the events
+                            between two runs (see "Note 3" above). If not defined, the events
+                            are processed for the whole duration at each run
 -r, --trigger_timeout=      timeout (in minutes) before listing the event if it is not cleared.
                             Set to 0 to list all the events (even the cleared ones)
                             default: 5
@@ -167,11 +196,16 @@ python3 ./list_open_events.py \
 """
 
 #### IMPORTS ####
+import os
 import sys
 import argparse
 import logging
 import csv
+import functools
+import sqlite3
+import time
 from datetime import datetime
+from typing import Callable, Iterable
 
 MISTAPI_MIN_VERSION = "0.52.4"
 
@@ -193,157 +227,425 @@ except ImportError:
     )
     sys.exit(2)
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+try:
+    import mist_pagination
+    import mist_rate_limiter
+except ImportError:
+    print(
+        """
+        Critical:
+        This script is using other scripts from the mist_library to perform all the
+        action. Please make sure the following python files are in the "utils" folder
+        of the mist_library:
+            - mist_pagination.py
+            - mist_rate_limiter.py
+        """
+    )
+    sys.exit(2)
+
 #### PARAMETERS #####
 ENV_FILE = "~/.mist_env"
 CSV_FILE = "./list_open_events.csv"
 LOG_FILE = "./script.log"
+STATE_VERSION = 3
+# the events are retrieved from STATE_OVERLAP seconds (10 minutes) before the
+# checkpoint, to get the events ingested late by the Mist Cloud
+STATE_OVERLAP = 600
 
 #####################################################################
 #### LOGS ####
 LOGGER = logging.getLogger(__name__)
 
 #####################################################################
-#### CONSTANTS ####
+#### EVENT DEFINITIONS ####
+def _from_field(field: str, default: str | None = None) -> Callable:
+    # identifier read from an event field
+    return lambda event: event.get(field) or default
+
+
+def _from_text(field: str | None, marker: str, separator: str = " ") -> Callable:
+    # identifier read from an event field, or extracted from the event text
+    # (first word after `marker`)
+    return lambda event: (field and event.get(field)) or event.get(
+        "text", ""
+    ).split(marker)[1].strip().split(separator)[0]
+
+
+# Event Options (see "Note 1" above). For each option:
+# - trigger: Mist events opening the event
+# - clear: Mist events closing the event
+# - identifier (optional): (header, function extracting the identifier from the
+#   Mist event), when the option can be opened multiple times on the same
+#   device (e.g. one per port)
+# - details (optional): if True, the event text is saved with the event
+# The events are reported under the first "trigger" event type.
 EVENT_TYPES_DEFINITIONS = {
     # AP Events
-    "AP_CONFIG": ["AP_CONFIG_FAILED", "AP_CONFIGURED", "AP_RECONFIGURED"],
-    "AP_DISCONNECTED": ["AP_DISCONNECTED", "AP_CONNECTED"],
-    "AP_PORT": ["AP_PORT_DOWN", "AP_PORT_UP"],
-    "AP_RADSEC": ["AP_RADSEC_FAILURE", "AP_RADSEC_RECOVERY"],
-    "AP_UPGRADE": ["AP_UPGRADE_FAILED", "AP_UPGRADED"],
+    "AP_CONFIG": {
+        "trigger": ["AP_CONFIG_FAILED"],
+        "clear": ["AP_CONFIGURED", "AP_RECONFIGURED"],
+    },
+    "AP_DISCONNECTED": {
+        "trigger": ["AP_DISCONNECTED"],
+        "clear": ["AP_CONNECTED"],
+    },
+    "AP_PORT": {
+        "trigger": ["AP_PORT_DOWN"],
+        "clear": ["AP_PORT_UP"],
+        "identifier": ("Port ID", _from_field("port_id", "unknown")),
+    },
+    "AP_RADSEC": {
+        "trigger": ["AP_RADSEC_FAILURE"],
+        "clear": ["AP_RADSEC_RECOVERY"],
+    },
+    "AP_UPGRADE": {
+        "trigger": ["AP_UPGRADE_FAILED"],
+        "clear": ["AP_UPGRADED"],
+    },
     # ESL Events
-    "ESL_HUNG": ["ESL_HUNG", "ESL_RECOVERED"],
+    "ESL_HUNG": {
+        "trigger": ["ESL_HUNG"],
+        "clear": ["ESL_RECOVERED"],
+    },
     # GW Events
-    "GW_ALARM_CHASSIS_FAN": ["GW_ALARM_CHASSIS_FAN", "GW_ALARM_CHASSIS_FAN_CLEAR"],
-    "GW_ALARM_CHASSIS_HOT": ["GW_ALARM_CHASSIS_HOT", "GW_ALARM_CHASSIS_HOT_CLEAR"],
-    "GW_ALARM_CHASSIS_HUMIDITY": [
-        "GW_ALARM_CHASSIS_HUMIDITY",
-        "GW_ALARM_CHASSIS_HUMIDITY_CLEAR",
-    ],
-    "GW_ALARM_CHASSIS_MGMT_LINK": [
-        "GW_ALARM_CHASSIS_MGMT_LINK_DOWN",
-        "GW_ALARM_CHASSIS_MGMT_LINK_DOWN_CLEAR",
-    ],
-    "GW_ALARM_CHASSIS_PARTITION": [
-        "GW_ALARM_CHASSIS_PARTITION",
-        "GW_ALARM_CHASSIS_PARTITION_CLEAR",
-    ],
-    "GW_ALARM_CHASSIS_PEM": ["GW_ALARM_CHASSIS_PEM", "GW_ALARM_CHASSIS_PEM_CLEAR"],
-    "GW_ALARM_CHASSIS_POE": ["GW_ALARM_CHASSIS_POE", "GW_ALARM_CHASSIS_POE_CLEAR"],
-    "GW_ALARM_CHASSIS_PSU": ["GW_ALARM_CHASSIS_PSU", "GW_ALARM_CHASSIS_PSU_CLEAR"],
-    "GW_ALARM_CHASSIS_WARM": ["GW_ALARM_CHASSIS_WARM", "GW_ALARM_CHASSIS_WARM_CLEAR"],
-    "GW_APPID_INSTALL": ["GW_APPID_INSTALL_FAILED", "GW_APPID_INSTALLED"],
-    "GW_ARP": ["GW_ARP_UNRESOLVED", "GW_ARP_RESOLVED"],
-    "GW_BGP_NEIGHBOR": ["GW_BGP_NEIGHBOR_DOWN", "GW_BGP_NEIGHBOR_UP"],
-    "GW_CONDUCTOR": ["GW_CONDUCTOR_DISCONNECTED", "GW_CONDUCTOR_CONNECTED"],
-    "GW_CONFIG": [
-        "GW_CONFIG_FAILED",
-        "GW_CONFIG_LOCK_FAILED",
-        "GW_CONFIG_ERROR_ADDTL_COMMAND",
-        "GW_CONFIGURED",
-    ],
-    "GW_DHCP": ["GW_DHCP_UNRESOLVED", "GW_DHCP_RESOLVED"],
-    "GW_DISCONNECTED": ["GW_DISCONNECTED", "GW_CONNECTED"],
-    "GW_FIB_COUNT": [
-        "GW_FIB_COUNT_THRESHOLD_EXCEEDED",
-        "GW_FIB_COUNT_RETURNED_TO_NORMAL",
-    ],
-    "GW_FLOW_COUNT": [
-        "GW_FLOW_COUNT_THRESHOLD_EXCEEDED",
-        "GW_FLOW_COUNT_RETURNED_TO_NORMAL",
-    ],
-    "GW_HA_CONTROL_LINK": ["GW_HA_CONTROL_LINK_DOWN", "GW_HA_CONTROL_LINK_UP"],
-    "GW_HA_HEALTH_WEIGHT": ["GW_HA_HEALTH_WEIGHT_LOW", "GW_HA_HEALTH_WEIGHT_RECOVERY"],
-    "GW_IDP_INSTALL": ["GW_IDP_INSTALL_FAILED", "GW_IDP_INSTALLED"],
-    "GW_OSPF_NEIGHBOR": ["GW_OSPF_NEIGHBOR_DOWN", "GW_OSPF_NEIGHBOR_UP"],
-    "GW_PORT": ["GW_PORT_DOWN", "GW_PORT_UP"],
-    "GW_RECOVERY_SNAPSHOT": [
-        "GW_RECOVERY_SNAPSHOT_FAILED",
-        "GW_RECOVERY_SNAPSHOT_SUCCEEDED",
-        "GW_RECOVERY_SNAPSHOT_NOTNEEDED",
-    ],
-    "GW_TUNNEL": ["GW_TUNNEL_DOWN", "GW_TUNNEL_UP"],
-    "GW_UPGRADE": ["GW_UPGRADE_FAILED", "GW_UPGRADED"],
-    "GW_VPN_PATH": ["GW_VPN_PATH_DOWN", "GW_VPN_PATH_UP"],
-    "GW_VPN_PEER": ["GW_VPN_PEER_DOWN", "GW_VPN_PEER_UP"],
-    "GW_ZTP": ["GW_ZTP_FAILED", "GW_ZTP_FINISHED"],
+    "GW_ALARM_CHASSIS_FAN": {
+        "trigger": ["GW_ALARM_CHASSIS_FAN"],
+        "clear": ["GW_ALARM_CHASSIS_FAN_CLEAR"],
+    },
+    "GW_ALARM_CHASSIS_HOT": {
+        "trigger": ["GW_ALARM_CHASSIS_HOT"],
+        "clear": ["GW_ALARM_CHASSIS_HOT_CLEAR"],
+    },
+    "GW_ALARM_CHASSIS_HUMIDITY": {
+        "trigger": ["GW_ALARM_CHASSIS_HUMIDITY"],
+        "clear": ["GW_ALARM_CHASSIS_HUMIDITY_CLEAR"],
+    },
+    "GW_ALARM_CHASSIS_MGMT_LINK": {
+        "trigger": ["GW_ALARM_CHASSIS_MGMT_LINK_DOWN"],
+        "clear": ["GW_ALARM_CHASSIS_MGMT_LINK_DOWN_CLEAR"],
+    },
+    "GW_ALARM_CHASSIS_PARTITION": {
+        "trigger": ["GW_ALARM_CHASSIS_PARTITION"],
+        "clear": ["GW_ALARM_CHASSIS_PARTITION_CLEAR"],
+    },
+    "GW_ALARM_CHASSIS_PEM": {
+        "trigger": ["GW_ALARM_CHASSIS_PEM"],
+        "clear": ["GW_ALARM_CHASSIS_PEM_CLEAR"],
+    },
+    "GW_ALARM_CHASSIS_POE": {
+        "trigger": ["GW_ALARM_CHASSIS_POE"],
+        "clear": ["GW_ALARM_CHASSIS_POE_CLEAR"],
+    },
+    "GW_ALARM_CHASSIS_PSU": {
+        "trigger": ["GW_ALARM_CHASSIS_PSU"],
+        "clear": ["GW_ALARM_CHASSIS_PSU_CLEAR"],
+    },
+    "GW_ALARM_CHASSIS_WARM": {
+        "trigger": ["GW_ALARM_CHASSIS_WARM"],
+        "clear": ["GW_ALARM_CHASSIS_WARM_CLEAR"],
+    },
+    "GW_APPID_INSTALL": {
+        "trigger": ["GW_APPID_INSTALL_FAILED"],
+        "clear": ["GW_APPID_INSTALLED"],
+    },
+    "GW_ARP": {
+        "trigger": ["GW_ARP_UNRESOLVED"],
+        "clear": ["GW_ARP_RESOLVED"],
+        "identifier": (
+            "Port ID",
+            lambda event: event.get("port_id")
+            or event.get("text", "")
+            .replace('"', "")
+            .split("network-interface:")[1]
+            .strip()
+            .split(",")[0],
+        ),
+    },
+    "GW_BGP_NEIGHBOR": {
+        "trigger": ["GW_BGP_NEIGHBOR_DOWN"],
+        "clear": ["GW_BGP_NEIGHBOR_UP"],
+        "identifier": ("Neighbor", _from_text(None, "neighbor")),
+    },
+    "GW_CONDUCTOR": {
+        "trigger": ["GW_CONDUCTOR_DISCONNECTED"],
+        "clear": ["GW_CONDUCTOR_CONNECTED"],
+    },
+    "GW_CONFIG": {
+        "trigger": [
+            "GW_CONFIG_FAILED",
+            "GW_CONFIG_LOCK_FAILED",
+            "GW_CONFIG_ERROR_ADDTL_COMMAND",
+        ],
+        "clear": ["GW_CONFIGURED", "GW_RECONFIGURED"],
+        "details": True,
+    },
+    "GW_DHCP": {
+        "trigger": ["GW_DHCP_UNRESOLVED"],
+        "clear": ["GW_DHCP_RESOLVED"],
+    },
+    "GW_DISCONNECTED": {
+        "trigger": ["GW_DISCONNECTED"],
+        "clear": ["GW_CONNECTED"],
+    },
+    "GW_FIB_COUNT": {
+        "trigger": ["GW_FIB_COUNT_THRESHOLD_EXCEEDED"],
+        "clear": ["GW_FIB_COUNT_RETURNED_TO_NORMAL"],
+    },
+    "GW_FLOW_COUNT": {
+        "trigger": ["GW_FLOW_COUNT_THRESHOLD_EXCEEDED"],
+        "clear": ["GW_FLOW_COUNT_RETURNED_TO_NORMAL"],
+    },
+    "GW_HA_CONTROL_LINK": {
+        "trigger": ["GW_HA_CONTROL_LINK_DOWN"],
+        "clear": ["GW_HA_CONTROL_LINK_UP"],
+    },
+    "GW_HA_HEALTH_WEIGHT": {
+        "trigger": ["GW_HA_HEALTH_WEIGHT_LOW"],
+        "clear": ["GW_HA_HEALTH_WEIGHT_RECOVERY"],
+        "identifier": ("Tunnel", _from_text(None, "Detected")),
+    },
+    "GW_IDP_INSTALL": {
+        "trigger": ["GW_IDP_INSTALL_FAILED"],
+        "clear": ["GW_IDP_INSTALLED"],
+    },
+    "GW_OSPF_NEIGHBOR": {
+        "trigger": ["GW_OSPF_NEIGHBOR_DOWN"],
+        "clear": ["GW_OSPF_NEIGHBOR_UP"],
+        "identifier": ("Neighbor", _from_text(None, "neighbor")),
+    },
+    "GW_PORT": {
+        "trigger": ["GW_PORT_DOWN"],
+        "clear": ["GW_PORT_UP"],
+        "identifier": ("Port ID", _from_field("port_id", "unknown")),
+    },
+    "GW_RECOVERY_SNAPSHOT": {
+        "trigger": ["GW_RECOVERY_SNAPSHOT_FAILED"],
+        "clear": [
+            "GW_RECOVERY_SNAPSHOT_SUCCEEDED",
+            "GW_RECOVERY_SNAPSHOT_NOTNEEDED",
+        ],
+    },
+    "GW_TUNNEL": {
+        "trigger": ["GW_TUNNEL_DOWN"],
+        "clear": ["GW_TUNNEL_UP"],
+        "identifier": ("Tunnel", _from_text(None, "Tunnel")),
+    },
+    "GW_UPGRADE": {
+        "trigger": ["GW_UPGRADE_FAILED"],
+        "clear": ["GW_UPGRADED"],
+    },
+    "GW_VPN_PATH": {
+        "trigger": ["GW_VPN_PATH_DOWN"],
+        "clear": ["GW_VPN_PATH_UP"],
+        "identifier": ("Path", _from_text(None, "path")),
+    },
+    "GW_VPN_PEER": {
+        "trigger": ["GW_VPN_PEER_DOWN"],
+        "clear": ["GW_VPN_PEER_UP"],
+        "identifier": ("Peer", _from_text(None, "peer")),
+    },
+    "GW_ZTP": {
+        "trigger": ["GW_ZTP_FAILED"],
+        "clear": ["GW_ZTP_FINISHED"],
+    },
     # ME Events
-    "ME_DISCONNECTED": ["ME_DISCONNECTED", "ME_CONNECTED"],
-    "ME_FAN": ["ME_FAN_UNPLUGGED", "ME_FAN_PLUGGED"],
-    "ME_POWERINPUT": ["ME_POWERINPUT_DISCONNECTED", "ME_POWERINPUT_CONNECTED"],
-    "ME_PSU": ["ME_PSU_UNPLUGGED", "ME_PSU_PLUGGED"],
-    "ME_SERVICE": ["ME_SERVICE_CRASHED", "ME_SERVICE_FAILED", "ME_SERVICE_STARTED"],
+    "ME_DISCONNECTED": {
+        "trigger": ["ME_DISCONNECTED"],
+        "clear": ["ME_CONNECTED"],
+    },
+    "ME_FAN": {
+        "trigger": ["ME_FAN_UNPLUGGED"],
+        "clear": ["ME_FAN_PLUGGED"],
+        "identifier": ("Component", _from_field("component", "unknown")),
+    },
+    "ME_POWERINPUT": {
+        "trigger": ["ME_POWERINPUT_DISCONNECTED"],
+        "clear": ["ME_POWERINPUT_CONNECTED"],
+        "identifier": ("Component", _from_field("component", "unknown")),
+    },
+    "ME_PSU": {
+        "trigger": ["ME_PSU_UNPLUGGED"],
+        "clear": ["ME_PSU_PLUGGED"],
+        "identifier": ("Component", _from_field("component", "unknown")),
+    },
+    "ME_SERVICE": {
+        "trigger": ["ME_SERVICE_FAILED", "ME_SERVICE_CRASHED"],
+        "clear": ["ME_SERVICE_STARTED"],
+        "identifier": ("Service", _from_field("service", "unknown")),
+    },
     # SW Events
-    "SW_ALARM_CHASSIS_FAN": ["SW_ALARM_CHASSIS_FAN", "SW_ALARM_CHASSIS_FAN_CLEAR"],
-    "SW_ALARM_CHASSIS_HOT": ["SW_ALARM_CHASSIS_HOT", "SW_ALARM_CHASSIS_HOT_CLEAR"],
-    "SW_ALARM_CHASSIS_HUMIDITY": [
-        "SW_ALARM_CHASSIS_HUMIDITY",
-        "SW_ALARM_CHASSIS_HUMIDITY_CLEAR",
-    ],
-    "SW_ALARM_CHASSIS_MGMT_LINK": [
-        "SW_ALARM_CHASSIS_MGMT_LINK_DOWN",
-        "SW_ALARM_CHASSIS_MGMT_LINK_DOWN_CLEAR",
-    ],
-    "SW_ALARM_CHASSIS_PARTITION": [
-        "SW_ALARM_CHASSIS_PARTITION",
-        "SW_ALARM_CHASSIS_PARTITION_CLEAR",
-    ],
-    "SW_ALARM_CHASSIS_PEM": ["SW_ALARM_CHASSIS_PEM", "SW_ALARM_CHASSIS_PEM_CLEAR"],
-    "SW_ALARM_CHASSIS_POE": ["SW_ALARM_CHASSIS_POE", "SW_ALARM_CHASSIS_POE_CLEAR"],
-    "SW_ALARM_CHASSIS_PSU": ["SW_ALARM_CHASSIS_PSU", "SW_ALARM_CHASSIS_PSU_CLEAR"],
-    "SW_ALARM_IOT": ["SW_ALARM_IOT_SET", "SW_ALARM_IOT_CLEAR"],
-    "SW_ALARM_VC_VERSION_MISMATCH": [
-        "SW_ALARM_VIRTUAL_CHASSIS_VERSION_MISMATCH",
-        "SW_ALARM_VIRTUAL_CHASSIS_VERSION_MISMATCH_CLEAR",
-    ],
-    "SW_BFD_SESSION": ["SW_BFD_SESSION_DISCONNECTED", "SW_BFD_SESSION_ESTABLISHED"],
-    "SW_BGP_NEIGHBOR": ["SW_BGP_NEIGHBOR_DOWN", "SW_BGP_NEIGHBOR_UP"],
-    "SW_CONFIG": [
-        "SW_CONFIG_FAILED",
-        "SW_CONFIG_LOCK_FAILED",
-        "SW_CONFIG_ERROR_ADDTL_COMMAND",
-        "SW_CONFIGURED",
-    ],
-    "SW_DDOS_PROTOCOL_VIOLATION": [
-        "SW_DDOS_PROTOCOL_VIOLATION_SET",
-        "SW_DDOS_PROTOCOL_VIOLATION_CLEAR",
-    ],
-    "SW_DISCONNECTED": ["SW_DISCONNECTED", "SW_CONNECTED"],
-    "SW_EVPN_CORE_ISOLATION": [
-        "SW_EVPN_CORE_ISOLATED",
-        "SW_EVPN_CORE_ISOLATION_CLEARED",
-    ],
-    "SW_FPC_POWER": ["SW_FPC_POWER_OFF", "SW_FPC_POWER_ON"],
-    "SW_LACPD_TIMEOUT": ["SW_LACPD_TIMEOUT", "SW_LACPD_TIMEOUT_CLEARED"],
-    "SW_LOOP": ["SW_LOOP_DETECTED", "SW_LOOP_CLEARED"],
-    "SW_MAC_LEARNING": ["SW_MAC_LEARNING_STOPPED", "SW_MAC_LEARNING_RESUMED"],
-    "SW_MAC_LIMIT": ["SW_MAC_LIMIT_EXCEEDED", "SW_MAC_LIMIT_RESET"],
-    "SW_OSPF_NEIGHBOR": ["SW_OSPF_NEIGHBOR_DOWN", "SW_OSPF_NEIGHBOR_UP"],
-    "SW_PORT": ["SW_PORT_DOWN", "SW_PORT_UP"],
-    "SW_PORT_BPDU": ["SW_PORT_BPDU_ERROR_CLEARED", "SW_PORT_BPDU_BLOCKED"],
-    "SW_RECOVERY_SNAPSHOT": [
-        "SW_RECOVERY_SNAPSHOT_FAILED",
-        "SW_RECOVERY_SNAPSHOT_SUCCEEDED",
-        "SW_RECOVERY_SNAPSHOT_NOTNEEDED",
-    ],
-    "SW_UPGRADE": ["SW_UPGRADE_FAILED", "SW_UPGRADED"],
-    "SW_VC_PORT": ["SW_VC_PORT_DOWN", "SW_VC_PORT_UP"],
-    "SW_VC_TRANSITION": ["SW_VC_IN_TRANSITION", "SW_VC_STABLE"],
-    "SW_ZTP": ["SW_ZTP_FAILED", "SW_ZTP_FINISHED"],
+    "SW_ALARM_CHASSIS_FAN": {
+        "trigger": ["SW_ALARM_CHASSIS_FAN"],
+        "clear": ["SW_ALARM_CHASSIS_FAN_CLEAR"],
+    },
+    "SW_ALARM_CHASSIS_HOT": {
+        "trigger": ["SW_ALARM_CHASSIS_HOT"],
+        "clear": ["SW_ALARM_CHASSIS_HOT_CLEAR"],
+    },
+    "SW_ALARM_CHASSIS_HUMIDITY": {
+        "trigger": ["SW_ALARM_CHASSIS_HUMIDITY"],
+        "clear": ["SW_ALARM_CHASSIS_HUMIDITY_CLEAR"],
+    },
+    "SW_ALARM_CHASSIS_MGMT_LINK": {
+        "trigger": ["SW_ALARM_CHASSIS_MGMT_LINK_DOWN"],
+        "clear": ["SW_ALARM_CHASSIS_MGMT_LINK_DOWN_CLEAR"],
+    },
+    "SW_ALARM_CHASSIS_PARTITION": {
+        "trigger": ["SW_ALARM_CHASSIS_PARTITION"],
+        "clear": ["SW_ALARM_CHASSIS_PARTITION_CLEAR"],
+    },
+    "SW_ALARM_CHASSIS_PEM": {
+        "trigger": ["SW_ALARM_CHASSIS_PEM"],
+        "clear": ["SW_ALARM_CHASSIS_PEM_CLEAR"],
+    },
+    "SW_ALARM_CHASSIS_POE": {
+        "trigger": ["SW_ALARM_CHASSIS_POE"],
+        "clear": ["SW_ALARM_CHASSIS_POE_CLEAR"],
+    },
+    "SW_ALARM_CHASSIS_PSU": {
+        "trigger": ["SW_ALARM_CHASSIS_PSU"],
+        "clear": ["SW_ALARM_CHASSIS_PSU_CLEAR"],
+    },
+    "SW_ALARM_IOT": {
+        "trigger": ["SW_ALARM_IOT_SET"],
+        "clear": ["SW_ALARM_IOT_CLEAR"],
+    },
+    "SW_ALARM_VC_VERSION_MISMATCH": {
+        "trigger": ["SW_ALARM_VIRTUAL_CHASSIS_VERSION_MISMATCH"],
+        "clear": ["SW_ALARM_VIRTUAL_CHASSIS_VERSION_MISMATCH_CLEAR"],
+    },
+    "SW_BFD_SESSION": {
+        "trigger": ["SW_BFD_SESSION_DISCONNECTED"],
+        "clear": ["SW_BFD_SESSION_ESTABLISHED"],
+    },
+    "SW_BGP_NEIGHBOR": {
+        "trigger": ["SW_BGP_NEIGHBOR_DOWN"],
+        "clear": ["SW_BGP_NEIGHBOR_UP"],
+    },
+    "SW_CONFIG": {
+        "trigger": [
+            "SW_CONFIG_FAILED",
+            "SW_CONFIG_LOCK_FAILED",
+            "SW_CONFIG_ERROR_ADDTL_COMMAND",
+        ],
+        "clear": ["SW_CONFIGURED", "SW_RECONFIGURED"],
+        "details": True,
+    },
+    "SW_DDOS_PROTOCOL_VIOLATION": {
+        "trigger": ["SW_DDOS_PROTOCOL_VIOLATION_SET"],
+        "clear": ["SW_DDOS_PROTOCOL_VIOLATION_CLEAR"],
+        "identifier": (
+            "Protocol Name",
+            _from_text("protocol_name", "protocol/exception"),
+        ),
+    },
+    "SW_DISCONNECTED": {
+        "trigger": ["SW_DISCONNECTED"],
+        "clear": ["SW_CONNECTED"],
+    },
+    "SW_EVPN_CORE_ISOLATION": {
+        "trigger": ["SW_EVPN_CORE_ISOLATED"],
+        "clear": ["SW_EVPN_CORE_ISOLATION_CLEARED"],
+    },
+    "SW_FPC_POWER": {
+        "trigger": ["SW_FPC_POWER_OFF"],
+        "clear": ["SW_FPC_POWER_ON"],
+        "identifier": ("FRU Slot", _from_text("fru_slot", "jnxFruSlot")),
+    },
+    "SW_LACPD_TIMEOUT": {
+        "trigger": ["SW_LACPD_TIMEOUT"],
+        "clear": ["SW_LACPD_TIMEOUT_CLEARED"],
+        "identifier": ("Port ID", _from_field("port_id", "unknown")),
+    },
+    "SW_LOOP": {
+        "trigger": ["SW_LOOP_DETECTED"],
+        "clear": ["SW_LOOP_CLEARED"],
+    },
+    "SW_MAC_LEARNING": {
+        "trigger": ["SW_MAC_LEARNING_STOPPED"],
+        "clear": ["SW_MAC_LEARNING_RESUMED"],
+    },
+    "SW_MAC_LIMIT": {
+        "trigger": ["SW_MAC_LIMIT_EXCEEDED"],
+        "clear": ["SW_MAC_LIMIT_RESET"],
+        "identifier": (
+            "Port ID",
+            lambda event: event.get("port_id")
+            or event.get("text", "").split(";")[0].split(" ")[-1],
+        ),
+    },
+    "SW_OSPF_NEIGHBOR": {
+        "trigger": ["SW_OSPF_NEIGHBOR_DOWN"],
+        "clear": ["SW_OSPF_NEIGHBOR_UP"],
+        "identifier": ("Neighbor", _from_text(None, "neighbor")),
+    },
+    "SW_PORT": {
+        "trigger": ["SW_PORT_DOWN"],
+        "clear": ["SW_PORT_UP"],
+        "identifier": ("Port ID", _from_field("port_id", "unknown")),
+    },
+    "SW_PORT_BPDU": {
+        "trigger": ["SW_PORT_BPDU_BLOCKED"],
+        "clear": ["SW_PORT_BPDU_ERROR_CLEARED"],
+        "identifier": ("Port ID", _from_text("port_id", "Interface")),
+    },
+    "SW_RECOVERY_SNAPSHOT": {
+        "trigger": ["SW_RECOVERY_SNAPSHOT_FAILED"],
+        "clear": [
+            "SW_RECOVERY_SNAPSHOT_SUCCEEDED",
+            "SW_RECOVERY_SNAPSHOT_NOTNEEDED",
+        ],
+    },
+    "SW_UPGRADE": {
+        "trigger": ["SW_UPGRADE_FAILED"],
+        "clear": ["SW_UPGRADED"],
+    },
+    "SW_VC_PORT": {
+        "trigger": ["SW_VC_PORT_DOWN"],
+        "clear": ["SW_VC_PORT_UP"],
+        "identifier": ("Port ID", _from_text("port_id", " on ", ",")),
+    },
+    "SW_VC_TRANSITION": {
+        "trigger": ["SW_VC_IN_TRANSITION"],
+        "clear": ["SW_VC_STABLE"],
+    },
+    "SW_ZTP": {
+        "trigger": ["SW_ZTP_FAILED"],
+        "clear": ["SW_ZTP_FINISHED"],
+    },
     # TT Events
-    "TT_MONITORED_RESOURCE": [
-        "TT_MONITORED_RESOURCE_FAILED",
-        "TT_MONITORED_RESOURCE_RECOVERED",
-    ],
-    "TT_PORT_BLOCKED": ["TT_PORT_BLOCKED", "TT_PORT_RECOVERY"],
-    "TT_PORT_LACP": [
-        "TT_PORT_DROPPED_FROM_LACP",
-        "TT_PORT_LAST_DROPPED_FROM_LACP",
-        "TT_PORT_JOINED_LACP",
-        "TT_PORT_FIRST_JOIN_LACP",
-    ],
-    "TT_PORT_LINK": ["TT_PORT_LINK_DOWN", "TT_PORT_LINK_RECOVERY"],
-    "TT_TUNNELS": ["TT_TUNNELS_LOST", "TT_TUNNELS_UP"],
+    "TT_MONITORED_RESOURCE": {
+        "trigger": ["TT_MONITORED_RESOURCE_FAILED"],
+        "clear": ["TT_MONITORED_RESOURCE_RECOVERED"],
+        "identifier": ("Resource", _from_field("resource", "unknown")),
+    },
+    "TT_PORT_BLOCKED": {
+        "trigger": ["TT_PORT_BLOCKED"],
+        "clear": ["TT_PORT_RECOVERY"],
+        "identifier": ("Port", _from_field("port", "unknown")),
+    },
+    "TT_PORT_LACP": {
+        "trigger": ["TT_PORT_DROPPED_FROM_LACP", "TT_PORT_LAST_DROPPED_FROM_LACP"],
+        "clear": ["TT_PORT_JOINED_LACP", "TT_PORT_FIRST_JOIN_LACP"],
+        "identifier": (
+            "LAG/Port",
+            lambda event: (
+                f"{event['lag']}/{event.get('port', 'unknown')}"
+                if event.get("lag")
+                else event.get("port", "unknown")
+            ),
+        ),
+    },
+    "TT_PORT_LINK": {
+        "trigger": ["TT_PORT_LINK_DOWN"],
+        "clear": ["TT_PORT_LINK_RECOVERY"],
+        "identifier": ("Port", _from_field("port", "unknown")),
+    },
+    "TT_TUNNELS": {
+        "trigger": ["TT_TUNNELS_LOST"],
+        "clear": ["TT_TUNNELS_UP"],
+    },
 }
 
 
@@ -438,733 +740,190 @@ def _retrieve_events(
     org_id: str,
     event_types: str | None = None,
     duration: str = "1d",
+    slices: int = 1,
+    checkpoint: float = 0,
     retry=False,
 ):
     message = "Retrieving list of Events"
     PB.log_message(message, display_pbar=False)
     try:
+        if checkpoint:
+            # only the events received since the last processed event (with
+            # an overlap for the events ingested late)
+            time_range = {
+                "start": int(checkpoint - STATE_OVERLAP),
+                "end": int(time.time()),
+            }
+        else:
+            time_range = {"duration": duration}
+        if slices > 1:
+            # the time slices are retrieved concurrently when the events are
+            # processed, from the most recent to the oldest
+            if checkpoint:
+                start, end = time_range["start"], time_range["end"]
+            else:
+                start, end = mist_pagination.get_time_range(duration)
+            search = functools.partial(
+                mistapi.api.v1.orgs.devices.searchOrgDeviceEvents,
+                mist_session,
+                org_id,
+                device_type="all",
+                type=event_types,
+                limit=1000,
+            )
+            pages = mist_pagination.iter_time_slices(
+                mist_session, search, start, end, slices
+            )
+            PB.log_success(message, inc=False, display_pbar=False)
+            return True, pages
         resp = mistapi.api.v1.orgs.devices.searchOrgDeviceEvents(
             mist_session,
             org_id,
             device_type="all",
             type=event_types,
-            duration=duration,
             limit=1000,
+            **time_range,
         )
         if resp.status_code == 200:
-            events = mistapi.get_all(mist_session, resp)
+            # the next pages are only retrieved when the events are processed
+            pages = mist_pagination.iter_pages(mist_session, resp)
             PB.log_success(message, inc=False, display_pbar=False)
-            return True, events
+            return True, pages
         elif not retry:
             PB.log_failure(message, inc=False, display_pbar=False)
-            return _retrieve_events(mist_session, org_id, event_types, duration, True)
+            LOGGER.error(
+                "_retrieve_events: HTTP %s, rate limit budget: %s",
+                resp.status_code,
+                mist_rate_limiter.get_budget(mist_session),
+            )
+            return _retrieve_events(
+                mist_session,
+                org_id,
+                event_types,
+                duration,
+                slices,
+                checkpoint,
+                True,
+            )
         else:
             PB.log_failure(message, inc=False, display_pbar=False)
-            return False, []
+            return False, iter([])
     except Exception:
         PB.log_failure(message, inc=False, display_pbar=False)
         LOGGER.error("Exception occurred", exc_info=True)
         if not retry:
-            return _retrieve_events(mist_session, org_id, event_types, duration, True)
+            return _retrieve_events(
+                mist_session,
+                org_id,
+                event_types,
+                duration,
+                slices,
+                checkpoint,
+                True,
+            )
         else:
-            return False, []
+            return False, iter([])
 
 
 ###################################################################################################
 ###################################################################################################
 ##                                                                                               ##
-##                                       COMMON                                                  ##
+##                                       EVENTS                                                  ##
 ##                                                                                               ##
 ###################################################################################################
 ###################################################################################################
-################################# COMMON PROCESSING
-def _process_common(
-    devices: dict,
-    event_type: str,
-    event: dict,
-    event_category: str,
-    trigger_events: list,
-    clear_events: list,
-):
-    LOGGER.debug("_process_common (category %s): %s", event_category, event)
-    event_timestamp = event.get("timestamp", 0)
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        event_category,
-        None,
-        None,
-    )
-    if event_type in trigger_events:
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type in clear_events:
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-def _process_config(
-    devices: dict,
-    event_type: str,
-    event: dict,
-    event_category: str,
-    trigger_events: list,
-    clear_events: list,
-):
-    LOGGER.debug("_process_config (category %s): %s", event_category, event)
-    event_text = ""
-    for text in event.get("text", "").split("\n"):
-        event_text += f"{text.strip()}\n"
-    event_timestamp = event.get("timestamp", 0)
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        event_category,
-        None,
-        None,
-    )
-    device_entry["details"] = event_text
-    if event_type in trigger_events:
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type in clear_events:
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-###################################################################################################
-###################################################################################################
-##                                                                                               ##
-##                                       GATEWAY                                                 ##
-##                                                                                               ##
-###################################################################################################
-###################################################################################################
-################################# GW_ARP_UNRESOLVED
-def _process_gw_arp(devices: dict, event_type: str, event: dict):
-    LOGGER.debug("_process_gw_arp: %s", event)
-    event_text = event.get("text", "")
-    event_timestamp = event.get("timestamp", 0)
-    event_port_id = event.get("port_id")
-    if not event_port_id:
-        try:
-            event_port_id = (
-                event_text.replace('"', "")
-                .split("network-interface:")[1]
-                .strip()
-                .split(",")[0]
-            )
-        except Exception:
-            LOGGER.error("_process_gw_arp: Unable to extract peer from %s", event_text)
-            return
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "GW_ARP_UNRESOLVED",
-        "Port ID",
-        event_port_id,
-    )
-    if event_type == "GW_ARP_UNRESOLVED":
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "GW_ARP_RESOLVED":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-###################################################################################################
-################################# GW_BGP_NEIGHBOR_DOWN
-def _process_gw_bgp_neighbor(devices: dict, event_type: str, event: dict):
-    LOGGER.debug("_process_gw_bgp_neighbor: %s", event)
-    event_text = event.get("text", "")
-    event_timestamp = event.get("timestamp", 0)
-    event_neighbor = None
-    if not event_neighbor:
-        try:
-            event_neighbor = event_text.split("neighbor")[1].strip().split(" ")[0]
-        except Exception:
-            LOGGER.error(
-                "_process_gw_bgp_neighbor: Unable to extract peer from %s", event_text
-            )
-            return
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "GW_BGP_NEIGHBOR_DOWN",
-        "Neighbor",
-        event_neighbor,
-    )
-    if event_type == "GW_BGP_NEIGHBOR_DOWN":
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "GW_BGP_NEIGHBOR_UP":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-###################################################################################################
-################################# GW_HA_HEALTH_WEIGHT_LOW
-def _process_gw_health_weight(devices: dict, event_type: str, event: dict):
-    LOGGER.debug("_process_gw_health_weight: %s", event)
-    event_text = event.get("text", "")
-    event_timestamp = event.get("timestamp", 0)
-    event_node = None
-    if not event_node:
-        try:
-            event_node = event_text.split("Detected")[1].strip().split(" ")[0]
-        except Exception:
-            LOGGER.error(
-                "_process_gw_health_weight: Unable to extract node from %s", event_text
-            )
-            return
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "GW_HA_HEALTH_WEIGHT_LOW",
-        "Tunnel",
-        event_node,
-    )
-    if event_type == "GW_HA_HEALTH_WEIGHT_LOW":
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "GW_HA_HEALTH_WEIGHT_RECOVERY":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-###################################################################################################
-################################# GW_TUNNEL_DOWN
-def _process_gw_tunnel(devices: dict, event_type: str, event: dict):
-    LOGGER.debug("_process_gw_tunnel: %s", event)
-    event_text = event.get("text", "")
-    event_timestamp = event.get("timestamp", 0)
-    event_tunnel = None
-    if not event_tunnel:
-        try:
-            event_tunnel = event_text.split("Tunnel")[1].strip().split(" ")[0]
-        except Exception:
-            LOGGER.error(
-                "_process_gw_tunnel: Unable to extract peer from %s", event_text
-            )
-            return
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "GW_TUNNEL_DOWN",
-        "Tunnel",
-        event_tunnel,
-    )
-    if event_type == "GW_TUNNEL_DOWN":
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "GW_TUNNEL_UP":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-###################################################################################################
-################################# GW_VPN_PATH_DOWN
-def _process_gw_vpn_path(devices: dict, event_type: str, event: dict):
-    LOGGER.debug("_process_gw_vpn_path: %s", event)
-    event_text = event.get("text", "")
-    event_timestamp = event.get("timestamp", 0)
-    event_path = None
-    if not event_path:
-        try:
-            event_path = event_text.split("path")[1].strip().split(" ")[0]
-        except Exception:
-            LOGGER.error(
-                "_process_gw_vpn_path: Unable to extract peer from %s", event_text
-            )
-            return
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "GW_VPN_PATH_DOWN",
-        "Path",
-        event_path,
-    )
-    if event_type == "GW_VPN_PATH_DOWN":
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "GW_VPN_PATH_UP":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-###################################################################################################
-################################# GW_VPN_PEER_DOWN
-def _process_gw_vpn_peer(devices: dict, event_type: str, event: dict):
-    LOGGER.debug("_process_gw_vpn_peer: %s", event)
-    event_text = event.get("text", "")
-    event_timestamp = event.get("timestamp", 0)
-    event_peer = None
-    if not event_peer:
-        try:
-            event_peer = event_text.split("peer")[1].strip().split(" ")[0]
-        except Exception:
-            LOGGER.error(
-                "_process_gw_vpn_peer: Unable to extract peer from %s", event_text
-            )
-            return
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "GW_VPN_PEER_DOWN",
-        "Peer",
-        event_peer,
-    )
-    if event_type == "GW_VPN_PEER_DOWN":
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "GW_VPN_PEER_UP":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
+def _get_event_handlers(definitions: dict) -> dict:
+    """
+    Build the dispatch table used to process the Mist events
 
-###################################################################################################
-################################# GW_OSPF_NEIGHBOR_DOWN
-def _process_gw_ospf_neighbor(devices: dict, event_type: str, event: dict):
-    LOGGER.debug("_process_gw_ospf_neighbor: %s", event)
-    event_text = event.get("text", "")
-    event_timestamp = event.get("timestamp", 0)
-    event_neighbor = None
-    if not event_neighbor:
-        try:
-            event_neighbor = event_text.split("neighbor")[1].strip().split(" ")[0]
-        except Exception:
-            LOGGER.error(
-                "_process_gw_ospf_neighbor: Unable to extract peer from %s", event_text
-            )
-            return
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "GW_OSPF_NEIGHBOR_DOWN",
-        "Neighbor",
-        event_neighbor,
-    )
-    if event_type == "GW_OSPF_NEIGHBOR_DOWN":
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "GW_OSPF_NEIGHBOR_UP":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
+    PARAMS
+    -----------
+    definitions : dict
+        Event Options definitions (see EVENT_TYPES_DEFINITIONS)
+
+    RETURN
+    -----------
+    dict
+        {Mist event type: (event category, status, identifier header, identifier
+        function, details)}, where "status" is "triggered" or "cleared"
+    """
+    handlers = {}
+    for definition in definitions.values():
+        event_category = definition["trigger"][0]
+        identifier_header, get_identifier = definition.get("identifier", (None, None))
+        details = definition.get("details", False)
+        for status, event_types in [
+            ("triggered", definition["trigger"]),
+            ("cleared", definition["clear"]),
+        ]:
+            for event_type in event_types:
+                handlers[event_type] = (
+                    event_category,
+                    status,
+                    identifier_header,
+                    get_identifier,
+                    details,
+                )
+    return handlers
 
 
-###################################################################################################
-################################# PORT EVENTS (generic for AP/GW/SW)
-def _process_port_event(
-    devices: dict,
-    event_type: str,
-    event: dict,
-    event_category: str,
-    trigger_events: list,
-    clear_events: list,
-):
-    LOGGER.debug("_process_port_event (category %s): %s", event_category, event)
-    event_timestamp = event.get("timestamp", 0)
-    event_port_id = event.get("port_id")
-    if not event_port_id:
-        event_port_id = "unknown"
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        event_category,
-        "Port ID",
-        event_port_id,
-    )
-    if event_type in trigger_events:
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type in clear_events:
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
+EVENT_HANDLERS = _get_event_handlers(EVENT_TYPES_DEFINITIONS)
+# {event category: identifier header} for the event types with identifier
+IDENTIFIER_HEADERS = {
+    definition["trigger"][0]: definition["identifier"][0]
+    for definition in EVENT_TYPES_DEFINITIONS.values()
+    if "identifier" in definition
+}
 
-###################################################################################################
-###################################################################################################
-##                                                                                               ##
-##                                       MXEDGE                                                  ##
-##                                                                                               ##
-###################################################################################################
-###################################################################################################
-################################# ME_COMPONENT (FAN/PSU/POWERINPUT)
-def _process_me_component(
-    devices: dict, event_type: str, event: dict, event_category: str
-):
-    LOGGER.debug("_process_me_component (category %s): %s", event_category, event)
-    event_timestamp = event.get("timestamp", 0)
-    event_component = event.get("component", "unknown")
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        event_category,
-        "Component",
-        event_component,
-    )
-    if "UNPLUGGED" in event_type or "DISCONNECTED" in event_type:
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if "PLUGGED" in event_type or "CONNECTED" in event_type:
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
 
+def _get_event_identifier(event: dict, handler: tuple) -> tuple:
+    """
+    Extract the identifier (port, peer, ...) of an event
 
-###################################################################################################
-################################# ME_SERVICE
-def _process_me_service(devices: dict, event_type: str, event: dict):
-    LOGGER.debug("_process_me_service: %s", event)
-    event_timestamp = event.get("timestamp", 0)
-    event_service = event.get("service", "unknown")
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "ME_SERVICE_FAILED",
-        "Service",
-        event_service,
-    )
-    if event_type in ["ME_SERVICE_CRASHED", "ME_SERVICE_FAILED"]:
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "ME_SERVICE_STARTED":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
+    RETURN
+    -----------
+    tuple
+        (success, identifier). "identifier" is None for the event types without
+        identifier
+    """
+    _, _, identifier_header, get_identifier, _ = handler
+    if not get_identifier:
+        return True, None
+    try:
+        return True, get_identifier(event)
+    except Exception:
+        LOGGER.error(
+            "_get_event_identifier: Unable to extract %s from %s",
+            identifier_header,
+            event.get("text", ""),
+        )
+        return False, None
 
 
-###################################################################################################
-###################################################################################################
-##                                                                                               ##
-##                                       SWITCH                                                  ##
-##                                                                                               ##
-###################################################################################################
-###################################################################################################
-################################# SW_DDOS_PROTOCOL_VIOLATION_SET
-def _process_sw_ddos_protocol_violation(
-    devices: dict, event_type: str, event: dict
+def _process_event(
+    devices: dict, event: dict, handler: tuple, event_identifier: str | None
 ) -> None:
-    LOGGER.debug("_process_sw_ddos_protocol_violation: %s", event)
-    event_text = event.get("text", "")
-    event_timestamp = event.get("timestamp", 0)
-    event_protocol_name = event.get("protocol_name")
-    if not event_protocol_name:
-        try:
-            event_protocol_name = (
-                event_text.split("protocol/exception")[1].strip().split(" ")[0]
-            )
-        except Exception:
-            LOGGER.error(
-                "_process_sw_ddos_protocol_violation: Unable to extract interface name from %s",
-                event_text,
-            )
-            return
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "SW_DDOS_PROTOCOL_VIOLATION_SET",
-        "Protocol Name",
-        event_protocol_name,
-    )
-
-    if event_type == "SW_DDOS_PROTOCOL_VIOLATION_SET":
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "SW_DDOS_PROTOCOL_VIOLATION_CLEAR":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-###################################################################################################
-################################# SW_FPC_POWER
-def _process_sw_fpc_power(devices: dict, event_type: str, event: dict) -> None:
-    LOGGER.debug("_process_sw_fpc_power: %s", event)
-    event_text = event.get("text", "")
-    event_timestamp = event.get("timestamp", 0)
-    event_fru_slot = event.get("fru_slot")
-    if not event_fru_slot:
-        try:
-            event_fru_slot = event_text.split("jnxFruSlot")[1].strip().split(" ")[0]
-        except Exception:
-            LOGGER.error(
-                "_process_sw_fpc_power: Unable to extract interface name from %s",
-                event_text,
-            )
-            return
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "SW_DDOS_PROTOCOL_VIOLATION_SET",
-        "FRU Slot",
-        event_fru_slot,
-    )
-
-    if event_type == "SW_FPC_POWER_OFF":
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "SW_FPC_POWER_ON":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-###################################################################################################
-################################# SW_PORT_BPDU_BLOCKED
-def _process_sw_mac_limit(devices: dict, event_type: str, event: dict) -> None:
-    LOGGER.debug("_process_sw_mac_limit: %s", event)
-    event_text = event.get("text", "")
-    event_timestamp = event.get("timestamp", 0)
-    event_port_id = event.get("port_id")
-    if not event_port_id:
-        try:
-            event_port_id = event_text.split(";")[0].split(" ")[-1]
-        except Exception:
-            LOGGER.error(
-                "_process_sw_mac_limit: Unable to extract interface name from %s",
-                event_text,
-            )
-            return
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "SW_MAC_LIMIT_EXCEEDED",
-        "Port ID",
-        event_port_id,
-    )
-
-    if event_type == "SW_MAC_LIMIT_EXCEEDED":
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "SW_MAC_LIMIT_RESET":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-###################################################################################################
-################################# SW_OSPF_NEIGHBOR
-def _process_sw_ospf_neighbor(devices: dict, event_type: str, event: dict):
-    LOGGER.debug("_process_sw_ospf_neighbor: %s", event)
-    event_text = event.get("text", "")
-    event_timestamp = event.get("timestamp", 0)
-    event_neighbor = None
-    if not event_neighbor:
-        try:
-            event_neighbor = event_text.split("neighbor")[1].strip().split(" ")[0]
-        except Exception:
-            LOGGER.error(
-                "_process_sw_ospf_neighbor: Unable to extract peer from %s", event_text
-            )
-            return
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "SW_OSPF_NEIGHBOR_DOWN",
-        "Neighbor",
-        event_neighbor,
-    )
-    if event_type == "SW_OSPF_NEIGHBOR_DOWN":
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "SW_OSPF_NEIGHBOR_UP":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-###################################################################################################
-################################# SW_PORT_BPDU_BLOCKED
-def _process_sw_port_bpdu(devices: dict, event_type: str, event: dict) -> None:
-    LOGGER.debug("_process_sw_port_bpdu: %s", event)
-    event_text = event.get("text", "")
-    event_timestamp = event.get("timestamp", 0)
-    event_port_id = event.get("port_id")
-    if not event_port_id:
-        try:
-            event_port_id = event_text.split("Interface")[1].strip().split(" ")[0]
-        except Exception:
-            LOGGER.error(
-                "_process_sw_port_bpdu: Unable to extract interface name from %s",
-                event_text,
-            )
-            return
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "SW_PORT_BPDU_BLOCKED",
-        "Port ID",
-        event_port_id,
-    )
-
-    if event_type == "SW_PORT_BPDU_BLOCKED":
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "SW_PORT_BPDU_ERROR_CLEARED":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-###################################################################################################
-################################# SW_VC_PORT_DOWN
-def _process_sw_vc_port(devices: dict, event_type: str, event: dict) -> None:
-    LOGGER.debug("_process_sw_vc_port: %s", event)
-    event_text = event.get("text", "")
-    event_timestamp = event.get("timestamp", 0)
-    event_port_id = event.get("port_id")
-    if not event_port_id:
-        try:
-            event_port_id = event_text.split(" on ")[1].strip().split(",")[0]
-        except Exception:
-            LOGGER.error(
-                "_process_sw_vc_port: Unable to extract interface name from %s",
-                event_text,
-            )
-            return
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "SW_VC_PORT_DOWN",
-        "Port ID",
-        event_port_id,
-    )
-
-    if event_type == "SW_VC_PORT_DOWN":
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "SW_VC_PORT_UP":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-###################################################################################################
-###################################################################################################
-##                                                                                               ##
-##                                       TUNTERM                                                 ##
-##                                                                                               ##
-###################################################################################################
-###################################################################################################
-################################# TT_MONITORED_RESOURCE
-def _process_tt_monitored_resource(devices: dict, event_type: str, event: dict):
-    LOGGER.debug("_process_tt_monitored_resource: %s", event)
-    event_timestamp = event.get("timestamp", 0)
-    event_resource = event.get("resource", "unknown")
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "TT_MONITORED_RESOURCE_FAILED",
-        "Resource",
-        event_resource,
-    )
-    if event_type == "TT_MONITORED_RESOURCE_FAILED":
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type == "TT_MONITORED_RESOURCE_RECOVERED":
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-###################################################################################################
-################################# TT_PORT
-def _process_tt_port(
-    devices: dict, event_type: str, event: dict, event_category: str
-):
-    LOGGER.debug("_process_tt_port (category %s): %s", event_category, event)
-    event_timestamp = event.get("timestamp", 0)
-    event_port = event.get("port", "unknown")
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        event_category,
-        "Port",
-        event_port,
-    )
-    if event_type in ["TT_PORT_BLOCKED", "TT_PORT_LINK_DOWN"]:
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type in ["TT_PORT_RECOVERY", "TT_PORT_LINK_RECOVERY"]:
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
-
-
-###################################################################################################
-################################# TT_PORT_LACP
-def _process_tt_port_lacp(devices: dict, event_type: str, event: dict):
-    LOGGER.debug("_process_tt_port_lacp: %s", event)
+    event_category, status, _, _, details = handler
+    LOGGER.debug("_process_event (category %s): %s", event_category, event)
+    device = _check_device(devices, event)
+    device_entry = _check_device_events(device, event_category, event_identifier)
+    if status == "triggered":
+        device_entry.triggered += 1
+    else:
+        device_entry.cleared += 1
+    # the events may not be processed in chronological order (e.g. the most
+    # recent events are returned first), the status is only changed by a
+    # more recent event
     event_timestamp = event.get("timestamp", 0)
-    event_port = event.get("port", "unknown")
-    event_lag = event.get("lag", "")
-    identifier = f"{event_lag}/{event_port}" if event_lag else event_port
-    _check_device(devices, event)
-    device_entry = _check_device_events(
-        devices,
-        event.get("device_type", ""),
-        event.get("mac", ""),
-        "TT_PORT_DROPPED_FROM_LACP",
-        "LAG/Port",
-        identifier,
-    )
-    if event_type in ["TT_PORT_DROPPED_FROM_LACP", "TT_PORT_LAST_DROPPED_FROM_LACP"]:
-        device_entry["status"] = "triggered"
-        device_entry["triggered"] += 1
-    if event_type in ["TT_PORT_JOINED_LACP", "TT_PORT_FIRST_JOIN_LACP"]:
-        device_entry["status"] = "cleared"
-        device_entry["cleared"] += 1
-    device_entry["last_change"] = datetime.fromtimestamp(round(event_timestamp))
+    if event_timestamp < device_entry.timestamp:
+        return
+    if details:
+        event_text = ""
+        for text in event.get("text", "").split("\n"):
+            event_text += f"{text.strip()}\n"
+        device_entry.details = event_text
+    device_entry.status = status
+    device_entry.timestamp = event_timestamp
 
 
 ###################################################################################################
@@ -1243,604 +1002,398 @@ def _get_devices(apisession: mistapi.APISession, org_id: str) -> dict:
 ##                                                                                               ##
 ###################################################################################################
 ###################################################################################################
+def _intern(value):
+    # the same values (site ids, models, port names, ...) are used by many
+    # devices, only one copy of each value is kept in memory
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class _EventState:
+    """
+    Status of an event type for a device (or for a device and an identifier)
+    """
+
+    __slots__ = ("status", "triggered", "cleared", "timestamp", "details")
+
+    def __init__(self):
+        self.status = None
+        self.triggered = 0
+        self.cleared = 0
+        self.timestamp = -1
+        self.details = ""
+
+    @property
+    def last_change(self) -> datetime | int:
+        """
+        Date of the last status change, or -1 if the status was never changed
+        """
+        if self.timestamp < 0:
+            return -1
+        return datetime.fromtimestamp(round(self.timestamp))
+
+
+class _DeviceState:
+    """
+    Information and events of a device. `timestamp` is the timestamp of the
+    event the information (model, version, site_id) was taken from. `events` is
+    {event type: _EventState} for the event types without identifier, and
+    {event type: {identifier: _EventState}} for the event types with identifier
+    (see IDENTIFIER_HEADERS)
+    """
+
+    __slots__ = ("model", "version", "site_id", "timestamp", "events")
+
+    def __init__(self):
+        self.model = None
+        self.version = None
+        self.site_id = None
+        self.timestamp = -1
+        self.events = {}
+
+
 def _check_device_events(
-    devices: dict,
-    event_device_type: str,
-    event_device_mac: str,
+    device: _DeviceState,
     event_type: str,
-    event_identifier_header: str | None = None,
     event_identifier: str | None = None,
-) -> dict:
-    if event_identifier:
-        if not devices[event_device_type][event_device_mac]["events"].get(event_type):
-            devices[event_device_type][event_device_mac]["events"][event_type] = {
-                "identifier_header": event_identifier_header
-            }
-        device_event = devices[event_device_type][event_device_mac]["events"][
-            event_type
-        ]
-        if not device_event.get(event_identifier):
-            device_event[event_identifier] = {
-                "status": None,
-                "triggered": 0,
-                "cleared": 0,
-                "last_change": -1,
-                "details": "",
-            }
-        return device_event[event_identifier]
-    else:
-        if not devices[event_device_type][event_device_mac]["events"].get(event_type):
-            devices[event_device_type][event_device_mac]["events"][event_type] = {
-                "identifier_header": event_identifier_header,
-                "status": None,
-                "triggered": 0,
-                "cleared": 0,
-                "last_change": -1,
-                "details": "",
-            }
-        return devices[event_device_type][event_device_mac]["events"][event_type]
+) -> _EventState:
+    if event_type in IDENTIFIER_HEADERS:
+        identifiers = device.events.get(event_type)
+        if identifiers is None:
+            identifiers = device.events[event_type] = {}
+        device_event = identifiers.get(event_identifier)
+        if device_event is None:
+            device_event = _EventState()
+            identifiers[_intern(event_identifier or "")] = device_event
+        return device_event
+    device_event = device.events.get(event_type)
+    if device_event is None:
+        device_event = device.events[event_type] = _EventState()
+    return device_event
 
 
 def _check_device(
     devices: dict,
     event: dict,
-):
+) -> _DeviceState:
     event_site_id = event.get("site_id")
     event_device_mac = event.get("mac")
     event_device_type = event.get("device_type")
     event_device_model = event.get("device_model")
     event_device_version = event.get("device_version")
-    if not devices.get(event_device_type):
+    if event_device_type not in devices:
         devices[event_device_type] = {}
-    if not devices[event_device_type].get(event_device_mac):
-        devices[event_device_type][event_device_mac] = {
-            "model": None,
-            "version": None,
-            "site_id": None,
-            "events": {},
-        }
-    if event_device_model:
-        devices[event_device_type][event_device_mac]["model"] = event_device_model
-    if event_device_version:
-        devices[event_device_type][event_device_mac]["version"] = event_device_version
-    if event_site_id:
-        devices[event_device_type][event_device_mac]["site_id"] = event_site_id
-
-
-def _process_events(events: list) -> dict:
+    device = devices[event_device_type].get(event_device_mac)
+    if device is None:
+        device = devices[event_device_type][event_device_mac] = _DeviceState()
+    # the events may not be processed in chronological order, the device
+    # information is only changed by a more recent event (e.g. after a firmware
+    # upgrade or when the device is moved to another site)
+    event_timestamp = event.get("timestamp", 0)
+    if event_timestamp < device.timestamp:
+        return device
+    device.timestamp = event_timestamp
+    if event_device_model and event_device_model != device.model:
+        device.model = _intern(event_device_model)
+    if event_device_version and event_device_version != device.version:
+        device.version = _intern(event_device_version)
+    if event_site_id and event_site_id != device.site_id:
+        device.site_id = _intern(event_site_id)
+    return device
+
+
+def _get_device_events(device: _DeviceState):
+    """
+    Yield the (event type, identifier, event info, event status) of a device.
+    "identifier" is None and "event info" is empty for the event types without
+    identifier
+    """
+    for event_type, event_data in device.events.items():
+        identifier_header = IDENTIFIER_HEADERS.get(event_type)
+        if identifier_header:
+            for identifier, device_event in event_data.items():
+                yield (
+                    event_type,
+                    identifier,
+                    f"{identifier_header} {identifier}",
+                    device_event,
+                )
+        else:
+            yield event_type, None, "", event_data
+
+
+def _process_events(
+    pages: Iterable,
+    device_events: dict | None = None,
+    checkpoint: float = 0,
+    processed_events: set | None = None,
+) -> tuple:
+    """
+    Process the events page by page (each page is processed and released
+    before the next one is retrieved), so the memory usage only depends on
+    the number of devices/events types, not on the number of events.
+
+    The events are applied to `device_events` (status loaded from the state
+    file). The events are retrieved from STATE_OVERLAP seconds before the
+    `checkpoint`, and the events already processed during a previous run are
+    ignored with `processed_events`, the (mac, event type, timestamp,
+    identifier) of the last processed events. `processed_events` is updated
+    with the events processed less than STATE_OVERLAP seconds before the most
+    recent one. Returns the device events and the timestamp of the most recent
+    event processed.
+    """
     message = "Processing list of Events"
     PB.log_message(message, display_pbar=False)
+    if device_events is None:
+        device_events = {"gateway": {}, "switch": {}, "ap": {}, "mxedge": {}}
+    last_timestamp = checkpoint
+    event_count = 0
+    try:
+        for events in pages:
+            for event in events:
+                event_type = event.get("type")
+                handler = EVENT_HANDLERS.get(event_type)
+                if not handler:
+                    continue
+                event_timestamp = event.get("timestamp", 0)
+                if checkpoint and event_timestamp < checkpoint - STATE_OVERLAP:
+                    continue
+                success, event_identifier = _get_event_identifier(event, handler)
+                if not success:
+                    continue
+                last_timestamp = max(last_timestamp, event_timestamp)
+                if processed_events is not None:
+                    event_key = (
+                        event.get("mac"),
+                        event_type,
+                        event_timestamp,
+                        event_identifier or "",
+                    )
+                    if event_key in processed_events:
+                        continue
+                    # the older events will not be retrieved by the next run
+                    if event_timestamp >= last_timestamp - STATE_OVERLAP:
+                        processed_events.add(event_key)
+                _process_event(device_events, event, handler, event_identifier)
+            event_count += len(events)
+    except Exception:
+        PB.log_failure(message, inc=False, display_pbar=False)
+        LOGGER.error("Exception occurred", exc_info=True)
+        CONSOLE.error("Unable to retrieve device events")
+        sys.exit(0)
+    LOGGER.info("_process_events: %s events processed", event_count)
+    PB.log_success(message, inc=False, display_pbar=False)
+    return device_events, last_timestamp
+
+
+###################################################################################################
+###################################################################################################
+##                                                                                               ##
+##                                       STATE                                                   ##
+##                                                                                               ##
+###################################################################################################
+###################################################################################################
+def _open_state(state_file: str) -> sqlite3.Connection:
+    db = sqlite3.connect(state_file)
+    db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    version = db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    if version and version[0] != str(STATE_VERSION):
+        # state file created by another version of the script, the tables are
+        # recreated with the current schema
+        with db:
+            db.execute("DELETE FROM meta")
+            db.execute("DROP TABLE IF EXISTS devices")
+            db.execute("DROP TABLE IF EXISTS events")
+            db.execute("DROP TABLE IF EXISTS processed_events")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS devices ("
+        "device_type TEXT, mac TEXT, model TEXT, version TEXT, site_id TEXT, "
+        "timestamp REAL, PRIMARY KEY (device_type, mac))"
+    )
+    # identifier is "" for the event types without identifier
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS events ("
+        "device_type TEXT, mac TEXT, event_type TEXT, identifier_header TEXT, "
+        "identifier TEXT, status TEXT, triggered INTEGER, cleared INTEGER, "
+        "timestamp REAL, details TEXT, "
+        "PRIMARY KEY (device_type, mac, event_type, identifier))"
+    )
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS processed_events ("
+        "mac TEXT, event_type TEXT, timestamp REAL, identifier TEXT, "
+        "PRIMARY KEY (mac, event_type, timestamp, identifier))"
+    )
+    return db
+
+
+def _load_state(
+    state_file: str, org_id: str, event_types: str | None, duration: str
+) -> tuple:
+    """
+    Load the device events, the checkpoint (timestamp of the last processed
+    event) and the last processed events from the state file. The status of
+    the events which did not change during the duration is expired. Returns
+    empty device events and processed events, and a checkpoint set to 0 if the
+    state file cannot be used for this run.
+    """
+    message = "Loading state file"
+    PB.log_message(message, display_pbar=False)
     device_events = {"gateway": {}, "switch": {}, "ap": {}, "mxedge": {}}
-    for event in events:
-        event_type = event.get("type")
-        ####### AP
-        if event_type in ["AP_CONFIG_FAILED", "AP_CONFIGURED", "AP_RECONFIGURED"]:
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "AP_CONFIG_FAILED",
-                ["AP_CONFIG_FAILED"],
-                ["AP_CONFIGURED", "AP_RECONFIGURED"],
-            )
-        elif event_type in ["AP_DISCONNECTED", "AP_CONNECTED"]:
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "AP_DISCONNECTED",
-                ["AP_DISCONNECTED"],
-                ["AP_CONNECTED"],
-            )
-        elif event_type.startswith("AP_RADSEC"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "AP_RADSEC_FAILURE",
-                ["AP_RADSEC_FAILURE"],
-                ["AP_RADSEC_RECOVERY"],
-            )
-        elif event_type.startswith("AP_UPGRADE"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "AP_UPGRADE_FAILED",
-                ["AP_UPGRADE_FAILED"],
-                ["AP_UPGRADED"],
-            )
-        elif event_type in ["AP_PORT_DOWN", "AP_PORT_UP"]:
-            _process_port_event(
-                device_events,
-                event_type,
-                event,
-                "AP_PORT_DOWN",
-                ["AP_PORT_DOWN"],
-                ["AP_PORT_UP"],
-            )
-        ####### ESL
-        elif event_type in ["ESL_HUNG", "ESL_RECOVERED"]:
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "ESL_HUNG",
-                ["ESL_HUNG"],
-                ["ESL_RECOVERED"],
-            )
-        ####### GW
-        elif event_type.startswith("GW_ALARM_CHASSIS_FAN"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_ALARM_CHASSIS_FAN",
-                ["GW_ALARM_CHASSIS_FAN"],
-                ["GW_ALARM_CHASSIS_FAN_CLEAR"],
-            )
-        elif event_type.startswith("GW_ALARM_CHASSIS_HOT"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_ALARM_CHASSIS_HOT",
-                ["GW_ALARM_CHASSIS_HOT"],
-                ["GW_ALARM_CHASSIS_HOT_CLEAR"],
-            )
-        elif event_type.startswith("GW_ALARM_CHASSIS_HUMIDITY"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_ALARM_CHASSIS_HUMIDITY",
-                ["GW_ALARM_CHASSIS_HUMIDITY"],
-                ["GW_ALARM_CHASSIS_HUMIDITY_CLEAR"],
-            )
-        elif event_type.startswith("GW_ALARM_CHASSIS_MGMT_LINK"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_ALARM_CHASSIS_MGMT_LINK_DOWN",
-                ["GW_ALARM_CHASSIS_MGMT_LINK_DOWN"],
-                ["GW_ALARM_CHASSIS_MGMT_LINK_DOWN_CLEAR"],
-            )
-        elif event_type.startswith("GW_ALARM_CHASSIS_PARTITION"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_ALARM_CHASSIS_PARTITION",
-                ["GW_ALARM_CHASSIS_PARTITION"],
-                ["GW_ALARM_CHASSIS_PARTITION_CLEAR"],
-            )
-        elif event_type.startswith("GW_ALARM_CHASSIS_PEM"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_ALARM_CHASSIS_PEM",
-                ["GW_ALARM_CHASSIS_PEM"],
-                ["GW_ALARM_CHASSIS_PEM_CLEAR"],
-            )
-        elif event_type.startswith("GW_ALARM_CHASSIS_POE"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_ALARM_CHASSIS_POE",
-                ["GW_ALARM_CHASSIS_POE"],
-                ["GW_ALARM_CHASSIS_POE_CLEAR"],
-            )
-        elif event_type.startswith("GW_ALARM_CHASSIS_PSU"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_ALARM_CHASSIS_PSU",
-                ["GW_ALARM_CHASSIS_PSU"],
-                ["GW_ALARM_CHASSIS_PSU_CLEAR"],
-            )
-        elif event_type.startswith("GW_ALARM_CHASSIS_WARM"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_ALARM_CHASSIS_WARM",
-                ["GW_ALARM_CHASSIS_WARM"],
-                ["GW_ALARM_CHASSIS_WARM_CLEAR"],
-            )
-        elif event_type.startswith("GW_APPID_INSTALL"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_APPID_INSTALL_FAILED",
-                ["GW_APPID_INSTALL_FAILED"],
-                ["GW_APPID_INSTALLED"],
-            )
-        elif event_type.startswith("GW_ARP"):
-            _process_gw_arp(device_events, event_type, event)
-        elif event_type.startswith("GW_BGP_NEIGHBOR"):
-            _process_gw_bgp_neighbor(device_events, event_type, event)
-        elif event_type.startswith("GW_CONFIG_") or event_type in [
-            "GW_CONFIGURED",
-            "GW_RECONFIGURED",
-        ]:
-            _process_config(
-                device_events,
-                event_type,
-                event,
-                "GW_CONFIG_FAILED",
-                [
-                    "GW_CONFIG_FAILED",
-                    "GW_CONFIG_LOCK_FAILED",
-                    "GW_CONFIG_ERROR_ADDTL_COMMAND",
-                ],
-                ["GW_CONFIGURED", "GW_RECONFIGURED"],
-            )
-        elif event_type in ["GW_CONDUCTOR_DISCONNECTED", "GW_CONDUCTOR_CONNECTED"]:
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_CONDUCTOR_DISCONNECTED",
-                ["GW_CONDUCTOR_DISCONNECTED"],
-                ["GW_CONDUCTOR_CONNECTED"],
-            )
-        elif event_type in ["GW_DHCP_UNRESOLVED", "GW_DHCP_RESOLVED"]:
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_DHCP_UNRESOLVED",
-                ["GW_DHCP_UNRESOLVED"],
-                ["GW_DHCP_RESOLVED"],
-            )
-        elif event_type in ["GW_DISCONNECTED", "GW_CONNECTED"]:
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_DISCONNECTED",
-                ["GW_DISCONNECTED"],
-                ["GW_CONNECTED"],
-            )
-        elif event_type.startswith("GW_FIB_COUNT"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_FIB_COUNT_THRESHOLD_EXCEEDED",
-                ["GW_FIB_COUNT_THRESHOLD_EXCEEDED"],
-                ["GW_FIB_COUNT_RETURNED_TO_NORMAL"],
-            )
-        elif event_type.startswith("GW_FLOW_COUNT"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_FLOW_COUNT_THRESHOLD_EXCEEDED",
-                ["GW_FLOW_COUNT_THRESHOLD_EXCEEDED"],
-                ["GW_FLOW_COUNT_RETURNED_TO_NORMAL"],
-            )
-        elif event_type.startswith("GW_HA_CONTROL_LINK"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_HA_CONTROL_LINK_DOWN",
-                ["GW_HA_CONTROL_LINK_DOWN"],
-                ["GW_HA_CONTROL_LINK_UP"],
-            )
-        elif event_type.startswith("GW_HA_HEALTH_WEIGHT"):
-            _process_gw_health_weight(device_events, event_type, event)
-        elif event_type.startswith("GW_IDP_INSTALL"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_IDP_INSTALL_FAILED",
-                ["GW_IDP_INSTALL_FAILED"],
-                ["GW_IDP_INSTALLED"],
-            )
-        elif event_type.startswith("GW_OSPF_NEIGHBOR"):
-            _process_gw_ospf_neighbor(device_events, event_type, event)
-        elif event_type in ["GW_PORT_DOWN", "GW_PORT_UP"]:
-            _process_port_event(
-                device_events,
-                event_type,
-                event,
-                "GW_PORT_DOWN",
-                ["GW_PORT_DOWN"],
-                ["GW_PORT_UP"],
-            )
-        elif event_type.startswith("GW_RECOVERY_SNAPSHOT"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_RECOVERY_SNAPSHOT_FAILED",
-                ["GW_RECOVERY_SNAPSHOT_FAILED"],
-                ["GW_RECOVERY_SNAPSHOT_SUCCEEDED", "GW_RECOVERY_SNAPSHOT_NOTNEEDED"],
-            )
-        elif event_type.startswith("GW_TUNNEL"):
-            _process_gw_tunnel(device_events, event_type, event)
-        elif event_type.startswith("GW_UPGRADE"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_UPGRADE_FAILED",
-                ["GW_UPGRADE_FAILED"],
-                ["GW_UPGRADED"],
-            )
-        elif event_type.startswith("GW_VPN_PATH"):
-            _process_gw_vpn_path(device_events, event_type, event)
-        elif event_type.startswith("GW_VPN_PEER"):
-            _process_gw_vpn_peer(device_events, event_type, event)
-        elif event_type.startswith("GW_ZTP"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "GW_ZTP_FAILED",
-                ["GW_ZTP_FAILED"],
-                ["GW_ZTP_FINISHED"],
-            )
-        ####### ME
-        elif event_type in ["ME_DISCONNECTED", "ME_CONNECTED"]:
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "ME_DISCONNECTED",
-                ["ME_DISCONNECTED"],
-                ["ME_CONNECTED"],
-            )
-        elif event_type in ["ME_FAN_UNPLUGGED", "ME_FAN_PLUGGED"]:
-            _process_me_component(device_events, event_type, event, "ME_FAN_UNPLUGGED")
-        elif event_type in ["ME_POWERINPUT_DISCONNECTED", "ME_POWERINPUT_CONNECTED"]:
-            _process_me_component(device_events, event_type, event, "ME_POWERINPUT_DISCONNECTED")
-        elif event_type in ["ME_PSU_UNPLUGGED", "ME_PSU_PLUGGED"]:
-            _process_me_component(device_events, event_type, event, "ME_PSU_UNPLUGGED")
-        elif event_type in ["ME_SERVICE_CRASHED", "ME_SERVICE_FAILED", "ME_SERVICE_STARTED"]:
-            _process_me_service(device_events, event_type, event)
-        ####### SW
-        elif event_type.startswith("SW_ALARM_CHASSIS_FAN"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_ALARM_CHASSIS_FAN",
-                ["SW_ALARM_CHASSIS_FAN"],
-                ["SW_ALARM_CHASSIS_FAN_CLEAR"],
-            )
-        elif event_type.startswith("SW_ALARM_CHASSIS_HOT"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_ALARM_CHASSIS_HOT",
-                ["SW_ALARM_CHASSIS_HOT"],
-                ["SW_ALARM_CHASSIS_HOT_CLEAR"],
-            )
-        elif event_type.startswith("SW_ALARM_CHASSIS_HUMIDITY"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_ALARM_CHASSIS_HUMIDITY",
-                ["SW_ALARM_CHASSIS_HUMIDITY"],
-                ["SW_ALARM_CHASSIS_HUMIDITY_CLEAR"],
-            )
-        elif event_type.startswith("SW_ALARM_CHASSIS_MGMT_LINK"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_ALARM_CHASSIS_MGMT_LINK_DOWN",
-                ["SW_ALARM_CHASSIS_MGMT_LINK_DOWN"],
-                ["SW_ALARM_CHASSIS_MGMT_LINK_DOWN_CLEAR"],
-            )
-        elif event_type.startswith("SW_ALARM_CHASSIS_PARTITION"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_ALARM_CHASSIS_PARTITION",
-                ["SW_ALARM_CHASSIS_PARTITION"],
-                ["SW_ALARM_CHASSIS_PARTITION_CLEAR"],
-            )
-        elif event_type.startswith("SW_ALARM_CHASSIS_PEM"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_ALARM_CHASSIS_PEM",
-                ["SW_ALARM_CHASSIS_PEM"],
-                ["SW_ALARM_CHASSIS_PEM_CLEAR"],
-            )
-        elif event_type.startswith("SW_ALARM_CHASSIS_POE"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_ALARM_CHASSIS_POE",
-                ["SW_ALARM_CHASSIS_POE"],
-                ["SW_ALARM_CHASSIS_POE_CLEAR"],
-            )
-        elif event_type.startswith("SW_ALARM_CHASSIS_PSU"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_ALARM_CHASSIS_PSU",
-                ["SW_ALARM_CHASSIS_PSU"],
-                ["SW_ALARM_CHASSIS_PSU_CLEAR"],
-            )
-        elif event_type.startswith("SW_ALARM_IOT"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_ALARM_IOT_SET",
-                ["SW_ALARM_IOT_SET"],
-                ["SW_ALARM_IOT_CLEAR"],
-            )
-        elif event_type.startswith("SW_ALARM_VIRTUAL_CHASSIS_VERSION_MISMATCH"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_ALARM_VIRTUAL_CHASSIS_VERSION_MISMATCH",
-                ["SW_ALARM_VIRTUAL_CHASSIS_VERSION_MISMATCH"],
-                ["SW_ALARM_VIRTUAL_CHASSIS_VERSION_MISMATCH_CLEAR"],
-            )
-        elif event_type.startswith("SW_CONFIG_") or event_type in [
-            "SW_CONFIGURED",
-            "SW_RECONFIGURED",
-        ]:
-            _process_config(
-                device_events,
-                event_type,
-                event,
-                "SW_CONFIG_FAILED",
-                [
-                    "SW_CONFIG_FAILED",
-                    "SW_CONFIG_LOCK_FAILED",
-                    "SW_CONFIG_ERROR_ADDTL_COMMAND",
-                ],
-                ["SW_CONFIGURED", "SW_RECONFIGURED"],
-            )
-        elif event_type.startswith("SW_DDOS_PROTOCOL_VIOLATION"):
-            _process_sw_ddos_protocol_violation(device_events, event_type, event)
-        elif event_type in ["SW_DISCONNECTED", "SW_CONNECTED"]:
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_DISCONNECTED",
-                ["SW_DISCONNECTED"],
-                ["SW_CONNECTED"],
-            )
-        elif event_type.startswith("SW_EVPN_CORE_ISO"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_EVPN_CORE_ISOLATED",
-                ["SW_EVPN_CORE_ISOLATED"],
-                ["SW_EVPN_CORE_ISOLATION_CLEARED"],
-            )
-        elif event_type.startswith("SW_FPC_POWER"):
-            _process_sw_fpc_power(device_events, event_type, event)
-        elif event_type.startswith("SW_LACPD_TIMEOUT"):
-            _process_port_event(
-                device_events,
-                event_type,
-                event,
-                "SW_LACPD_TIMEOUT",
-                ["SW_LACPD_TIMEOUT"],
-                ["SW_LACPD_TIMEOUT_CLEARED"],
-            )
-        elif event_type.startswith("SW_LOOP"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_LOOP_DETECTED",
-                ["SW_LOOP_DETECTED"],
-                ["SW_LOOP_CLEARED"],
-            )
-        elif event_type.startswith("SW_MAC_LEARNING"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_MAC_LEARNING_STOPPED",
-                ["SW_MAC_LEARNING_STOPPED"],
-                ["SW_MAC_LEARNING_RESUMED"],
-            )
-        elif event_type.startswith("SW_MAC_LIMIT"):
-            _process_sw_mac_limit(device_events, event_type, event)
-        elif event_type.startswith("SW_OSPF_NEIGHBOR"):
-            _process_sw_ospf_neighbor(device_events, event_type, event)
-        elif event_type in ["SW_PORT_DOWN", "SW_PORT_UP"]:
-            _process_port_event(
-                device_events,
-                event_type,
-                event,
-                "SW_PORT_DOWN",
-                ["SW_PORT_DOWN"],
-                ["SW_PORT_UP"],
-            )
-        elif event_type.startswith("SW_PORT_BPDU"):
-            _process_sw_port_bpdu(device_events, event_type, event)
-        elif event_type.startswith("SW_RECOVERY_SNAPSHOT"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_RECOVERY_SNAPSHOT_FAILED",
-                ["SW_RECOVERY_SNAPSHOT_FAILED"],
-                ["SW_RECOVERY_SNAPSHOT_SUCCEEDED", "SW_RECOVERY_SNAPSHOT_NOTNEEDED"],
-            )
-        elif event_type.startswith("SW_UPGRADE"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_UPGRADE_FAILED",
-                ["SW_UPGRADE_FAILED"],
-                ["SW_UPGRADED"],
-            )
-        elif event_type.startswith("SW_VC_PORT"):
-            _process_sw_vc_port(device_events, event_type, event)
-        elif event_type.startswith("SW_VC_IN_TRANSITION") or event_type.startswith("SW_VC_STABLE"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_VC_IN_TRANSITION",
-                ["SW_VC_IN_TRANSITION"],
-                ["SW_VC_STABLE"],
-            )
-        elif event_type.startswith("SW_ZTP"):
-            _process_common(
-                device_events,
-                event_type,
-                event,
-                "SW_ZTP_FAILED",
-                ["SW_ZTP_FAILED"],
-                ["SW_ZTP_FINISHED"],
-            )
-        ####### TT
-        elif event_type.startswith("TT_MONITORED_RESOURCE"):
-            _process_tt_monitored_resource(device_events, event_type, event)
-        elif event_type in ["TT_PORT_BLOCKED", "TT_PORT_RECOVERY"]:
-            _process_tt_port(device_events, event_type, event, "TT_PORT_BLOCKED")
-        elif event_type in [
-            "TT_PORT_DROPPED_FROM_LACP",
-            "TT_PORT_LAST_DROPPED_FROM_LACP",
-            "TT_PORT_JOINED_LACP",
-            "TT_PORT_FIRST_JOIN_LACP",
-        ]:
-            _process_tt_port_lacp(device_events, event_type, event)
-        elif event_type in ["TT_PORT_LINK_DOWN", "TT_PORT_LINK_RECOVERY"]:
-            _process_tt_port(device_events, event_type, event, "TT_PORT_LINK_DOWN")
-        elif event_type in ["TT_TUNNELS_LOST", "TT_TUNNELS_UP"]:
-            _process_common(
-                device_events,
+    try:
+        db = _open_state(state_file)
+        try:
+            meta = dict(db.execute("SELECT key, value FROM meta"))
+            start, _ = mist_pagination.get_time_range(duration)
+            if (
+                meta.get("version") != str(STATE_VERSION)
+                or meta.get("org_id") != org_id
+                or meta.get("event_types") != (event_types or "")
+                or float(meta.get("checkpoint", 0)) < start
+            ):
+                LOGGER.info("_load_state: state file %s reset", state_file)
+                PB.log_success(message, inc=False, display_pbar=False)
+                return device_events, 0, set()
+            for device_type, mac, model, version, site_id, timestamp in db.execute(
+                "SELECT device_type, mac, model, version, site_id, timestamp "
+                "FROM devices"
+            ):
+                device = _DeviceState()
+                device.model = _intern(model)
+                device.version = _intern(version)
+                device.site_id = _intern(site_id)
+                device.timestamp = timestamp
+                device_events.setdefault(device_type, {})[mac] = device
+            for (
+                device_type,
+                mac,
                 event_type,
-                event,
-                "TT_TUNNELS_LOST",
-                ["TT_TUNNELS_LOST"],
-                ["TT_TUNNELS_UP"],
+                _,
+                identifier,
+                status,
+                triggered,
+                cleared,
+                timestamp,
+                details,
+            ) in db.execute("SELECT * FROM events"):
+                if timestamp < start:
+                    # not changed during the duration
+                    continue
+                device_event = _EventState()
+                device_event.status = _intern(status)
+                device_event.triggered = triggered
+                device_event.cleared = cleared
+                device_event.timestamp = timestamp
+                device_event.details = details
+                events = device_events[device_type][mac].events
+                if event_type in IDENTIFIER_HEADERS:
+                    identifiers = events.setdefault(event_type, {})
+                    identifiers[_intern(identifier)] = device_event
+                else:
+                    events[event_type] = device_event
+            # the devices without event status during the duration are removed
+            for devices in device_events.values():
+                expired = [mac for mac, device in devices.items() if not device.events]
+                for mac in expired:
+                    del devices[mac]
+            processed_events = set(
+                db.execute(
+                    "SELECT mac, event_type, timestamp, identifier "
+                    "FROM processed_events"
+                )
             )
+            checkpoint = float(meta["checkpoint"])
+        finally:
+            db.close()
+    except Exception:
+        PB.log_failure(message, inc=False, display_pbar=False)
+        LOGGER.error("Exception occurred", exc_info=True)
+        return {"gateway": {}, "switch": {}, "ap": {}, "mxedge": {}}, 0, set()
+    LOGGER.info("_load_state: state loaded, checkpoint %s", checkpoint)
+    PB.log_success(message, inc=False, display_pbar=False)
+    return device_events, checkpoint, processed_events
+
+
+def _get_state_events(device_events: dict):
+    for device_type, devices in device_events.items():
+        for mac, device in devices.items():
+            for event_type, identifier, _, device_event in _get_device_events(device):
+                yield (
+                    device_type,
+                    mac,
+                    event_type,
+                    IDENTIFIER_HEADERS.get(event_type),
+                    identifier or "",
+                    device_event.status,
+                    device_event.triggered,
+                    device_event.cleared,
+                    device_event.timestamp,
+                    device_event.details,
+                )
+
+
+def _save_state(
+    state_file: str,
+    org_id: str,
+    event_types: str | None,
+    device_events: dict,
+    checkpoint: float,
+    processed_events: set,
+) -> None:
+    message = "Saving state file"
+    PB.log_message(message, display_pbar=False)
+    try:
+        db = _open_state(state_file)
+        try:
+            # single transaction, the previous state is kept if the script is
+            # stopped while saving the new one
+            with db:
+                db.execute("DELETE FROM meta")
+                db.execute("DELETE FROM devices")
+                db.execute("DELETE FROM events")
+                db.execute("DELETE FROM processed_events")
+                db.executemany(
+                    "INSERT INTO devices VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        (
+                            device_type,
+                            mac,
+                            device.model,
+                            device.version,
+                            device.site_id,
+                            device.timestamp,
+                        )
+                        for device_type, devices in device_events.items()
+                        for mac, device in devices.items()
+                    ),
+                )
+                db.executemany(
+                    "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    _get_state_events(device_events),
+                )
+                # only the events the next run can retrieve again are kept
+                db.executemany(
+                    "INSERT INTO processed_events VALUES (?, ?, ?, ?)",
+                    (
+                        event_key
+                        for event_key in processed_events
+                        if event_key[2] >= checkpoint - STATE_OVERLAP
+                    ),
+                )
+                db.executemany(
+                    "INSERT INTO meta VALUES (?, ?)",
+                    [
+                        ("version", str(STATE_VERSION)),
+                        ("org_id", org_id),
+                        ("event_types", event_types or ""),
+                        ("checkpoint", str(checkpoint)),
+                    ],
+                )
+        finally:
+            db.close()
+    except Exception:
+        PB.log_failure(message, inc=False, display_pbar=False)
+        LOGGER.error("Exception occurred", exc_info=True)
+        return
     PB.log_success(message, inc=False, display_pbar=False)
-    return device_events
 
 
 def _check_timeout(raised_timeout: int, last_change: datetime, status: str) -> bool:
@@ -1868,56 +1421,28 @@ def _display_device_results(
         if devices:
             for device_mac, device_data in devices.items():
                 data = []
-                events = device_data.get("events", {})
-                for event_type, event_data in events.items():
-                    if event_data.get("identifier_header"):
-                        for (
-                            event_identifier,
-                            event_identifier_data,
-                        ) in event_data.items():
-                            if event_identifier == "identifier_header":
-                                continue
-                            if not event_identifier_data.get("triggered"):
-                                continue
-                            timeout = _check_timeout(
-                                raised_timeout,
-                                event_identifier_data.get("last_change"),
-                                event_identifier_data.get("status"),
-                            )
-                            if raised_timeout == 0 or timeout:
-                                data.append(
-                                    [
-                                        event_type,
-                                        f"{event_data['identifier_header']} {event_identifier}",
-                                        event_identifier_data.get("status"),
-                                        event_identifier_data.get("triggered"),
-                                        event_identifier_data.get("cleared"),
-                                        event_identifier_data.get("last_change"),
-                                        event_identifier_data.get("details"),
-                                    ]
-                                )
-                    else:
-                        if not event_data.get("triggered"):
-                            continue
-                        timeout = _check_timeout(
-                            raised_timeout,
-                            event_data.get("last_change"),
-                            event_data.get("status"),
+                for event_type, _, event_info, event_data in _get_device_events(
+                    device_data
+                ):
+                    if not event_data.triggered:
+                        continue
+                    timeout = _check_timeout(
+                        raised_timeout, event_data.last_change, event_data.status
+                    )
+                    if raised_timeout == 0 or timeout:
+                        data.append(
+                            [
+                                event_type,
+                                event_info,
+                                event_data.status,
+                                event_data.triggered,
+                                event_data.cleared,
+                                event_data.last_change,
+                                event_data.details,
+                            ]
                         )
-                        if raised_timeout == 0 or timeout:
-                            data.append(
-                                [
-                                    event_type,
-                                    "",
-                                    event_data.get("status"),
-                                    event_data.get("triggered"),
-                                    event_data.get("cleared"),
-                                    event_data.get("last_change"),
-                                    event_data.get("details"),
-                                ]
-                            )
                 if data:
-                    site_id = device_data.get("site_id")
+                    site_id = device_data.site_id
                     site_name = resolve_sites.get(site_id)
                     device_name = resolve_devices.get(device_mac)
                     print()
@@ -1930,11 +1455,11 @@ def _display_device_results(
                         print(f"site_id: {site_id}")
                     if device_name:
                         print(
-                            f"{device_type} {device_name} (mac: {device_mac}, model: {device_data.get('model')}, version: {device_data.get('version')})"
+                            f"{device_type} {device_name} (mac: {device_mac}, model: {device_data.model}, version: {device_data.version})"
                         )
                     else:
                         print(
-                            f"{device_type} {device_mac} (model : {device_data.get('model')}, version: {device_data.get('version')})"
+                            f"{device_type} {device_mac} (model : {device_data.model}, version: {device_data.version})"
                         )
                     print()
                     print(
@@ -1961,7 +1486,7 @@ def _display_event_results(
     for _, devices in device_events.items():
         if devices:
             for device_mac, device_data in devices.items():
-                site_id = device_data.get("site_id")
+                site_id = device_data.site_id
                 if resolve_sites.get(site_id):
                     site_entry = resolve_sites.get(site_id)
                 else:
@@ -1971,59 +1496,30 @@ def _display_event_results(
                 else:
                     device_entry = device_mac
 
-                events = device_data.get("events", {})
-                for event_type, event_data in events.items():
+                for event_type, _, event_info, event_data in _get_device_events(
+                    device_data
+                ):
                     timeout = False
                     if event_type not in event_reports:
                         event_reports[event_type] = []
-                    if event_data.get("identifier_header"):
-                        for (
-                            event_identifier,
-                            event_identifier_data,
-                        ) in event_data.items():
-                            if event_identifier == "identifier_header":
-                                continue
-                            if not event_identifier_data.get("triggered"):
-                                continue
-                            timeout = _check_timeout(
-                                raised_timeout,
-                                event_identifier_data.get("last_change"),
-                                event_identifier_data.get("status"),
-                            )
-                            if raised_timeout == 0 or timeout:
-                                event_reports[event_type].append(
-                                    [
-                                        site_entry,
-                                        device_entry,
-                                        f"{event_data['identifier_header']} {event_identifier}",
-                                        event_identifier_data.get("status"),
-                                        event_identifier_data.get("triggered"),
-                                        event_identifier_data.get("cleared"),
-                                        event_identifier_data.get("last_change"),
-                                        event_identifier_data.get("details"),
-                                    ]
-                                )
-                    else:
-                        if not event_data.get("triggered"):
-                            continue
-                        timeout = _check_timeout(
-                            raised_timeout,
-                            event_data.get("last_change"),
-                            event_data.get("status"),
+                    if not event_data.triggered:
+                        continue
+                    timeout = _check_timeout(
+                        raised_timeout, event_data.last_change, event_data.status
+                    )
+                    if raised_timeout == 0 or timeout:
+                        event_reports[event_type].append(
+                            [
+                                site_entry,
+                                device_entry,
+                                event_info,
+                                event_data.status,
+                                event_data.triggered,
+                                event_data.cleared,
+                                event_data.last_change,
+                                event_data.details,
+                            ]
                         )
-                        if raised_timeout == 0 or timeout:
-                            event_reports[event_type].append(
-                                [
-                                    site_entry,
-                                    device_entry,
-                                    "",
-                                    event_data.get("status"),
-                                    event_data.get("triggered"),
-                                    event_data.get("cleared"),
-                                    event_data.get("last_change"),
-                                    event_data.get("details"),
-                                ]
-                            )
     for event_type, report in event_reports.items():
         if report:
             print()
@@ -2081,81 +1577,39 @@ def _export_to_csv(
     for device_type, devices in device_events.items():
         if devices:
             for device_mac, device_data in devices.items():
-                site_id = device_data.get("site_id")
-                events = device_data.get("events", {})
-                for event_type, event_data in events.items():
-                    if event_data.get("identifier_header"):
-                        for (
-                            event_identifier,
-                            event_identifier_data,
-                        ) in event_data.items():
-                            if event_identifier == "identifier_header":
-                                continue
-                            if not event_identifier_data.get("triggered"):
-                                continue
-                            timeout = _check_timeout(
-                                raised_timeout,
-                                event_identifier_data.get("last_change"),
-                                event_identifier_data.get("status"),
-                            )
-                            if raised_timeout == 0 or timeout:
-                                data.append(
-                                    [
-                                        resolve_sites.get(site_id),
-                                        site_id,
-                                        device_type,
-                                        resolve_devices.get(device_mac),
-                                        device_mac,
-                                        event_type,
-                                        f"{event_data['identifier_header']} {event_identifier}",
-                                        event_identifier_data.get("status"),
-                                        event_identifier_data.get("triggered"),
-                                        event_identifier_data.get("cleared"),
-                                        event_identifier_data.get("last_change"),
-                                        _gen_device_insight_url(
-                                            apisession,
-                                            org_id,
-                                            device_type,
-                                            device_mac,
-                                            site_id,
-                                        ),
-                                        event_identifier_data.get(
-                                            "details", ""
-                                        ).replace("\n", " "),
-                                    ]
-                                )
-                    else:
-                        if not event_data.get("triggered"):
-                            continue
-                        timeout = _check_timeout(
-                            raised_timeout,
-                            event_data.get("last_change"),
-                            event_data.get("status"),
-                        )
-                        if raised_timeout == 0 or timeout:
-                            data.append(
-                                [
-                                    resolve_sites.get(site_id),
-                                    site_id,
+                site_id = device_data.site_id
+                for event_type, _, event_info, event_data in _get_device_events(
+                    device_data
+                ):
+                    if not event_data.triggered:
+                        continue
+                    timeout = _check_timeout(
+                        raised_timeout, event_data.last_change, event_data.status
+                    )
+                    if raised_timeout == 0 or timeout:
+                        data.append(
+                            [
+                                resolve_sites.get(site_id),
+                                site_id,
+                                device_type,
+                                resolve_devices.get(device_mac),
+                                device_mac,
+                                event_type,
+                                event_info,
+                                event_data.status,
+                                event_data.triggered,
+                                event_data.cleared,
+                                event_data.last_change,
+                                _gen_device_insight_url(
+                                    apisession,
+                                    org_id,
                                     device_type,
-                                    resolve_devices.get(device_mac),
                                     device_mac,
-                                    event_type,
-                                    "",
-                                    event_data.get("status"),
-                                    event_data.get("triggered"),
-                                    event_data.get("cleared"),
-                                    event_data.get("last_change"),
-                                    _gen_device_insight_url(
-                                        apisession,
-                                        org_id,
-                                        device_type,
-                                        device_mac,
-                                        site_id,
-                                    ),
-                                    event_data.get("details", "").replace("\n", " "),
-                                ]
-                            )
+                                    site_id,
+                                ),
+                                event_data.details.replace("\n", " "),
+                            ]
+                        )
     with open(csv_file, "w", encoding="UTF8") as f:
         writer = csv.writer(f)
         writer.writerow(headers)
@@ -2173,6 +1627,8 @@ def start(
     view: str = "event",
     csv_file: str = "./list_open_events.csv",
     no_resolve: bool = False,
+    slices: int = 1,
+    state_file: str | None = None,
 ):
     """
     Start the process
@@ -2205,22 +1661,30 @@ def start(
     no_resolve : bool, default False
         disable the device (device name) resolution. This option should be used for big
         Organizations where there resolution can generate too many additional API calls
+    slices : int, default 1
+        number of time slices used to retrieve the events. When set to more than 1, the
+        duration is split in time slices retrieved concurrently
+    state_file : str, default None
+        Path to the SQLite file where to save the status of the events between two runs
+        (see "Note 3" above). If not defined, the events are processed for the whole
+        duration at each run
     """
+    mist_rate_limiter.attach(mist_session)
     if not org_id:
         org_id = mistapi.cli.select_org(mist_session)[0]
     print()
     print()
     print()
-    success, events = _retrieve_events(mist_session, org_id, event_types, duration)
-    if events:
-        try:
-            events = sorted(events, key=lambda x: x["timestamp"])
-        except Exception:
-            CONSOLE.critical("Unable to process the Mist events")
-            LOGGER.debug(events)
-            LOGGER.error("Exception occurred", exc_info=True)
-            sys.exit(255)
-
+    device_events = None
+    checkpoint = 0
+    processed_events = None
+    if state_file:
+        device_events, checkpoint, processed_events = _load_state(
+            state_file, org_id, event_types, duration
+        )
+    success, pages = _retrieve_events(
+        mist_session, org_id, event_types, duration, slices, checkpoint
+    )
     if not success:
         CONSOLE.error("Unable to retrieve device events")
         sys.exit(0)
@@ -2230,7 +1694,18 @@ def start(
         if not no_resolve:
             devices = _get_devices(mist_session, org_id)
 
-        device_events = _process_events(events)
+        device_events, checkpoint = _process_events(
+            pages, device_events, checkpoint, processed_events
+        )
+        if state_file:
+            _save_state(
+                state_file,
+                org_id,
+                event_types,
+                device_events,
+                checkpoint,
+                processed_events,
+            )
         _export_to_csv(
             mist_session,
             org_id,
@@ -2310,7 +1785,7 @@ with the "-t"/"--event_types=" CLI parameter to configure the script):
 | ME_FAN                        | ME_FAN_UNPLUGGED                                                                  | ME_FAN_PLUGGED                                                |
 | ME_POWERINPUT                 | ME_POWERINPUT_DISCONNECTED                                                        | ME_POWERINPUT_CONNECTED                                       |
 | ME_PSU                        | ME_PSU_UNPLUGGED                                                                  | ME_PSU_PLUGGED                                                |
-| ME_SERVICE                    | ME_SERVICE_CRASHED,ME_SERVICE_FAILED                                              | ME_SERVICE_STARTED                                            |
+| ME_SERVICE                    | ME_SERVICE_FAILED,ME_SERVICE_CRASHED                                              | ME_SERVICE_STARTED                                            |
 | SW_ALARM_CHASSIS_FAN          | SW_ALARM_CHASSIS_FAN                                                              | SW_ALARM_CHASSIS_FAN_CLEAR                                    |
 | SW_ALARM_CHASSIS_HOT          | SW_ALARM_CHASSIS_HOT                                                              | SW_ALARM_CHASSIS_HOT_CLEAR                                    |
 | SW_ALARM_CHASSIS_HUMIDITY     | SW_ALARM_CHASSIS_HUMIDITY                                                         | SW_ALARM_CHASSIS_HUMIDITY_CLEAR                               |
@@ -2359,6 +1834,28 @@ watch -n 30 python3 ./list_open_events.py \
         -o 9777c1a0-xxxx-xxxx-xxxx-xxxxxxxxxxxx \
         -d 1w -t GW_ARP,GW_BGP_NEIGHBOR,GW_TUNNEL
 
+NOTE 3:
+When the script is run periodically, the "-f"/"--state_file=" parameter can be
+used to save the status of the events in a local SQLite file, with the
+timestamp of the last processed event. The next runs only retrieve the events
+received since this timestamp (with a 10 minutes overlap for the events
+ingested late, the events already processed are ignored), and apply them to the
+saved status.
+The state file is reset (and the events retrieved for the whole duration) if
+the Org or the event types are changed, or if the last processed event is
+older than the duration. The status of the events which did not change during
+the duration is removed from the state file.
+When using a state file, the Trigger Count and Clear Count are cumulative: they
+are counting the events since the status of the event was added to the state
+file (which may be before the duration), not only the events received during
+the duration.
+
+example:
+watch -n 300 python3 ./list_open_events.py \
+        -e ~/.mist_env \
+        -o 9777c1a0-xxxx-xxxx-xxxx-xxxxxxxxxxxx \
+        -d 1w -f ./list_open_events.sqlite
+
 -------
 Requirements:
 mistapi: https://pypi.org/project/mistapi/
@@ -2388,6 +1885,13 @@ Script Parameters:
                             and processed.
 -d, --duration              duration of the events to look at
                             default: 1d
+-s, --slices=               number of time slices used to retrieve the events. When set to more
+                            than 1, the duration is split in time slices retrieved concurrently
+                            (recommended for big Organizations with many events)
+                            default: 1
+-f, --state_file=           Path to the SQLite file where to save the status of the events
+                            between two runs (see "Note 3" above). If not defined, the events
+                            are processed for the whole duration at each run
 -r, --trigger_timeout=      timeout (in minutes) before listing the event if it is not cleared.
                             Set to 0 to list all the events (even the cleared ones)
                             default: 5
@@ -2489,6 +1993,19 @@ if __name__ == "__main__":
     parser.add_argument(
         "-d", "--duration", help="duration of the events to look at", default="1d"
     )
+    parser.add_argument(
+        "-s",
+        "--slices",
+        help="number of time slices used to retrieve the events",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "-f",
+        "--state_file",
+        help="Path to the SQLite file where to save the status of the events",
+        default=None,
+    )
     parser.add_argument(
         "-r",
         "--trigger_timeout",
@@ -2529,6 +2046,8 @@ if __name__ == "__main__":
     ORG_ID = args.org_id
     EVENT_TYPES = []
     DURATION = args.duration
+    SLICES = args.slices
+    STATE_FILE = args.state_file
     TIMEOUT = args.trigger_timeout
     VIEW = args.view
     CSV_FILE = args.csv_file
@@ -2540,19 +2059,21 @@ if __name__ == "__main__":
         usage(
             f'Invalid -d / --duration parameter value, should be something like "10m", "2h", "7d", "1w"... Got "{DURATION}".'
         )
+    if SLICES < 1:
+        usage(f'Invalid -s / --slices parameter value. Got "{SLICES}".')
 
     # Process event types
     if args.event_types:
         for t in args.event_types.split(","):
             event_def = EVENT_TYPES_DEFINITIONS.get(t.strip().upper())
-            if event_def and event_def in EVENT_TYPES_DEFINITIONS.values():
-                EVENT_TYPES += event_def
+            if event_def:
+                EVENT_TYPES += event_def["trigger"] + event_def["clear"]
             else:
                 usage(f'Invalid -t / --event_type parameter value. Got "{t}".')
 
     if not EVENT_TYPES:
-        for k, v in EVENT_TYPES_DEFINITIONS.items():
-            EVENT_TYPES += v
+        for event_def in EVENT_TYPES_DEFINITIONS.values():
+            EVENT_TYPES += event_def["trigger"] + event_def["clear"]
     EVENT_TYPES = ",".join(EVENT_TYPES)
     #### LOGS ####
     logging.basicConfig(filename=LOG_FILE, filemode="w")
@@ -2562,5 +2083,14 @@ if __name__ == "__main__":
     APISESSION = mistapi.APISession(env_file=ENV_FILE, show_cli_notif=False)
     APISESSION.login()
     start(
-        APISESSION, ORG_ID, EVENT_TYPES, DURATION, TIMEOUT, VIEW, CSV_FILE, NO_RESOLVE
+        APISESSION,
+        ORG_ID,
+        EVENT_TYPES,
+        DURATION,
+        TIMEOUT,
+        VIEW,
+        CSV_FILE,
+        NO_RESOLVE,
+        SLICES,
+        STATE_FILE,
     )
@@ -25,6 +25,11 @@ The script has 3 different steps:
 2) choose the destination org
 3) choose the backup/template to restore
 all the objects will be created from the json file.
+
+A site can also be deployed from an org backup generated with the script
+"org_conf_backup.py" (use the "-f" option with the path to the org backup, and
+the "-s" option with the id of the site to deploy). Only the selected site is
+read from the org backup.
 """
 
 #### IMPORTS ####
@@ -32,7 +37,6 @@ import sys
 import logging
 import json
 import argparse
-import re
 import signal
 import os.path
 from typing import Callable
@@ -57,10 +61,28 @@ except ImportError:
     )
     sys.exit(2)
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+try:
+    import mist_backup_store
+    import mist_uuid_mapping
+except ImportError:
+    print(
+        """
+        Critical:
+        This script is using other scripts from the mist_library to perform all the
+        action. Please make sure the following python files are in the "utils" folder
+        of the mist_library:
+            - mist_backup_store.py
+            - mist_uuid_mapping.py
+        """
+    )
+    sys.exit(2)
+
 #### PARAMETERS #####
 BACKUP_FOLDER = "./site_backup/"
 BACKUP_FILE = "./site_conf_file.json"
 FILE_PREFIX = ".".join(BACKUP_FILE.split(".")[:-1])
+ORG_FILE_PREFIX = "./org_conf_file"
 LOG_FILE = "./script.log"
 ENV_FILE = "./.env"
 
@@ -106,6 +128,8 @@ class Step:
         self.text = text
         self.attr_name = attr_name
         self.existing_objects = []
+        # existing objects by name, None if the existing objects are not loaded
+        self.existing_index = None
 
     def load_existing_objects(self, apisession, org_id):
         """
@@ -139,6 +163,31 @@ class Step:
             PB.log_failure(message, display_pbar=False, inc=False)
             LOGGER.error("Error loading existing objects for step %s: %s", self.text, e)
             self.existing_objects = []
+        self.existing_index = {}
+        for existing_obj in self.existing_objects:
+            self.existing_index.setdefault(
+                existing_obj.get(self.attr_name, ""), existing_obj
+            )
+
+    def add_existing_object(self, obj: dict):
+        """
+        Add an object created in the destination organization to the existing
+        objects, so the next objects with the same name are detected.
+
+        :param obj: The created object.
+        """
+        if self.existing_index is None:
+            return
+        self.existing_objects.append(obj)
+        self.existing_index.setdefault(obj.get(self.attr_name, ""), obj)
+
+    def _get_copy_name(self, obj_name: str) -> str:
+        new_name = f"{obj_name}_copy"
+        index = 2
+        while new_name in self.existing_index:
+            new_name = f"{obj_name}_copy_{index}"
+            index += 1
+        return new_name
 
     def search_existing_object(self, obj: dict, obj_name: str, action: str):
         """
@@ -153,35 +202,35 @@ class Step:
             "Searching for existing object %s with name %s", self.text, obj_name
         )
         LOGGER.debug("merge action: %s", action)
-        for existing_obj in self.existing_objects:
-            if existing_obj.get(self.attr_name, "") == obj_name:
-                if action == "skip":
-                    LOGGER.debug(
-                        "Object %s with name %s already exists, skipping...",
-                        self.text,
-                        obj_name,
-                    )
-                    UUID_MATCHING.add_uuid(existing_obj["id"], obj["id"])
-                    return False, None, existing_obj["id"]
-                elif action == "replace":
-                    LOGGER.debug(
-                        "Object %s with name %s already exists, replacing...",
-                        self.text,
-                        obj_name,
-                    )
-                    UUID_MATCHING.add_uuid(existing_obj["id"], obj["id"])
-                    obj["id"] = existing_obj["id"]
-                    return False, obj, existing_obj["id"]
-                elif action == "rename":
-                    new_name = f"{obj_name}_copy"
-                    LOGGER.debug(
-                        "Object %s with name %s already exists, renaming to %s...",
-                        self.text,
-                        obj_name,
-                        new_name,
-                    )
-                    obj[self.attr_name] = new_name
-                    return True, obj, existing_obj["id"]
+        existing_obj = (self.existing_index or {}).get(obj_name)
+        if existing_obj:
+            if action == "skip":
+                LOGGER.debug(
+                    "Object %s with name %s already exists, skipping...",
+                    self.text,
+                    obj_name,
+                )
+                UUID_MATCHING.add_uuid(existing_obj["id"], obj["id"])
+                return False, None, existing_obj["id"]
+            elif action == "replace":
+                LOGGER.debug(
+                    "Object %s with name %s already exists, replacing...",
+                    self.text,
+                    obj_name,
+                )
+                UUID_MATCHING.add_uuid(existing_obj["id"], obj["id"])
+                obj["id"] = existing_obj["id"]
+                return False, obj, existing_obj["id"]
+            elif action == "rename":
+                new_name = self._get_copy_name(obj_name)
+                LOGGER.debug(
+                    "Object %s with name %s already exists, renaming to %s...",
+                    self.text,
+                    obj_name,
+                    new_name,
+                )
+                obj[self.attr_name] = new_name
+                return True, obj, existing_obj["id"]
         LOGGER.debug(
             "Object %s with name %s does not exist, proceeding...",
             self.text,
@@ -406,50 +455,6 @@ class UUIDM:
         """
         return self.requests_to_replay
 
-    def _uuid_string(self, obj_str: str, missing_uuids: list):
-        #        uuid_re = '"[a-zA-Z_-]*": "[0-9a-f]{8}-[0-9a-f]{4}-[0-5][0-9a-f]{3}-[089ab][0-9a-f]{3}-[0-9a-f]{12}"'
-        uuid_re = r"\"[a-zA-Z_-]*\": \"[0-9a-f]{8}-[0-9a-f]{4}-[0-5][0-9a-f]{3}-[089ab][0-9a-f]{3}-[0-9a-f]{12}\""
-        uuids_to_replace = re.findall(uuid_re, obj_str)
-        if uuids_to_replace:
-            for uuid in uuids_to_replace:
-                uuid_key = uuid.replace('"', "").split(":")[0].strip()
-                uuid_val = uuid.replace('"', "").split(":")[1].strip()
-                if self.get_new_uuid(uuid_val):
-                    obj_str = obj_str.replace(uuid_val, self.get_new_uuid(uuid_val))
-                elif uuid_key not in [
-                    "issuer",
-                    "idp_sso_url",
-                    "custom_logout_url",
-                    "sso_issuer",
-                    "sso_idp_sso_url",
-                    "ibeacon_uuid",
-                ]:
-                    missing_uuids.append({uuid_key: uuid_val})
-        return obj_str, missing_uuids
-
-    def _uuid_list(self, obj_str: str, missing_uuids: list):
-        #        uuid_list_re = '("[a-zA-Z_-]*": \["[0-9a-f]{8}-[0-9a-f]{4}-[0-5][0-9a-f]{3}-[089ab][0-9a-f]{3}-[0-9a-f]{12}"[^\]]*)\]'
-        uuid_list_re = r"(\"[a-zA-Z_-]*\": \[\"[0-9a-f]{8}-[0-9a-f]{4}-[0-5][0-9a-f]{3}-[089ab][0-9a-f]{3}-[0-9a-f]{12}\"[^\]]*)\]"
-
-        uuid_lists_to_replace = re.findall(uuid_list_re, obj_str)
-        if uuid_lists_to_replace:
-            for uuid_list in uuid_lists_to_replace:
-                uuid_key = uuid_list.replace('"', "").split(":")[0].strip()
-                uuids = (
-                    uuid_list.replace('"', "")
-                    .replace("[", "")
-                    .replace("]", "")
-                    .split(":")[1]
-                    .split(",")
-                )
-                for uuid in uuids:
-                    uuid_val = uuid.strip()
-                    if self.get_new_uuid(uuid_val):
-                        obj_str = obj_str.replace(uuid_val, self.get_new_uuid(uuid_val))
-                    else:
-                        missing_uuids.append({uuid_key: uuid_val})
-        return obj_str, missing_uuids
-
     def find_and_replace(self, obj: dict, object_type: str) -> tuple:
         """
         Find and replace UUIDs in the given object.
@@ -483,15 +488,12 @@ class UUIDM:
                     del service_policy["id"]
 
         # REPLACE REMAINING IDS
-        obj_str = json.dumps(obj)
-        obj_str, missing_uuids = self._uuid_string(obj_str, [])
-        obj_str, missing_uuids = self._uuid_list(obj_str, missing_uuids)
+        obj, missing_uuids = mist_uuid_mapping.remap(obj, self.uuids)
         if {'uuid': '00000000-0000-1000-8000-000000000000'} in missing_uuids:
             missing_uuids.remove({'uuid': '00000000-0000-1000-8000-000000000000'})
         if missing_uuids:
             LOGGER.warning("find_and_replace: Object %s has missing UUIDs: %s", object_type, missing_uuids)
-            LOGGER.warning("find_and_replace: Object data: %s", obj_str)
-        obj = json.loads(obj_str)
+            LOGGER.warning("find_and_replace: Object data: %s", obj)
 
         return obj, missing_uuids
 
@@ -710,6 +712,7 @@ def _common_deploy(
         response = mist_step.create_mistapi_function(apisession, scope_id, data)
         if response.status_code == 200:
             new_id = response.data.get("id")
+            mist_step.add_existing_object(response.data)
             if not missing_uuids:
                 PB.log_success(message, display_pbar=False)
             elif not retry:
@@ -1385,7 +1388,9 @@ def _go_to_backup_folder() -> None:
     print()
     _chdir(BACKUP_FOLDER)
     _select_backup_org()
-    _select_backup_site()
+    # org backups (org_conf_backup.py) are not split in site folders
+    if not mist_backup_store.has_backup("."):
+        _select_backup_site()
 
 
 def _check_site_exists(
@@ -1422,12 +1427,86 @@ def _check_site_exists(
     return site_name_to_create, site_id
 
 
+# org objects referenced by a site, and the org backup steps where they are saved
+SITE_ORG_OBJECTS = {
+    "alarmtemplate": "alarmtemplates",
+    "aptemplate": "aptemplates",
+    "rftemplate": "rftemplates",
+    "networktemplate": "networktemplates",
+    "gatewaytemplate": "gatewaytemplates",
+    "secpolicy": "secpolicies",
+    "sitetemplate": "sitetemplates",
+}
+
+
+def _select_site_from_org_backup(sites: list) -> str:
+    sites = sorted(sites, key=lambda site: site.get("name", "").casefold())
+    i = 0
+
+    print("Available Sites:")
+    while i < len(sites):
+        print(f"{i}) {sites[i].get('name')}")
+        i += 1
+    site_id = None
+    while site_id is None:
+        resp = input(
+            f"Which backed up site do you want to deploy (0-{i - 1}, or q to quit)? "
+        )
+        if resp.lower() == "q":
+            console.error("Interruption... Exiting...")
+            LOGGER.error("Interruption... Exiting...")
+            sys.exit(0)
+        try:
+            respi = int(resp)
+            if respi >= 0 and respi < i:
+                site_id = sites[respi]["id"]
+            else:
+                print(f'The entry value "{respi}" is not valid. Please try again...')
+        except Exception:
+            print("Only numbers are allowed. Please try again...")
+    return site_id
+
+
+def _load_site_from_org_backup(site_id: str = "") -> dict:
+    """
+    Generate a site backup from an org backup (see "org_conf_backup.py"). Only
+    the required org objects and the selected site are read from the backup
+    """
+    global FILE_PREFIX
+    org_steps = ["sites", "sitegroups", *SITE_ORG_OBJECTS.values()]
+    backup = mist_backup_store.load_backup(".", org_steps=org_steps)
+    org_backup = backup["org"]
+    sites = org_backup.get("sites", [])
+    if not site_id:
+        site_id = _select_site_from_org_backup(sites)
+    site_info = next((site for site in sites if site["id"] == site_id), None)
+    if not site_info or site_id not in backup["sites"]:
+        raise ValueError(f"Site {site_id} not found in the org backup")
+
+    site_backup = {"site": {**backup["sites"][site_id], "info": site_info}}
+    for step_name, org_step_name in SITE_ORG_OBJECTS.items():
+        obj_id = site_info.get(f"{step_name}_id")
+        site_backup[step_name] = next(
+            (obj for obj in org_backup.get(org_step_name, []) if obj["id"] == obj_id),
+            {},
+        )
+    site_backup["sitegroups"] = [
+        sitegroup
+        for sitegroup in org_backup.get("sitegroups", [])
+        if sitegroup["id"] in (site_info.get("sitegroup_ids") or [])
+    ]
+    # the map images and portal files are named from the org id in org backups
+    FILE_PREFIX = f"{ORG_FILE_PREFIX}_org_{org_backup['id']}"
+    return site_backup
+
+
 def conf_deploy(
     apisession: mistapi.APISession,
     org_id: str,
     org_name: str,
     backup_path: str,
     merge_action: str,
+    site_id: str = "",
 ):
     LOGGER.debug("conf_deploy:_start_deploy_org")
     if backup_path:
@@ -1442,10 +1521,15 @@ def conf_deploy(
 
     print()
     try:
-        message = f"Loading template/backup file {BACKUP_FILE} "
-        PB.log_message(message, display_pbar=False)
-        with open(BACKUP_FILE, "r", encoding="utf-8") as f:
-            backup = json.load(f)
+        if mist_backup_store.has_backup("."):
+            message = "Loading site from the org backup "
+            backup = _load_site_from_org_backup(site_id)
+            PB.log_message(message, display_pbar=False)
+        else:
+            message = f"Loading template/backup file {BACKUP_FILE} "
+            PB.log_message(message, display_pbar=False)
+            with open(BACKUP_FILE, "r", encoding="utf-8") as f:
+                backup = json.load(f)
         PB.log_success(message, display_pbar=False)
     except Exception:
         PB.log_failure(message, display_pbar=False)
@@ -1514,6 +1598,7 @@ def start(
     org_name: str = "",
     backup_path: str = "",
     merge_action: str = "skip",
+    site_id: str = "",
 ):
     current_folder = os.getcwd()
     if org_id and org_name:
@@ -1525,7 +1610,7 @@ def start(
     else:
         org_id, org_name = _select_dest_org(apisession)
 
-    conf_deploy(apisession, org_id, org_name, backup_path, merge_action)
+    conf_deploy(apisession, org_id, org_name, backup_path, merge_action, site_id)
     os.chdir(current_folder)
 
 
@@ -1596,6 +1681,9 @@ Script Parameters:
                         default is "./org_backup"
 -b, --source_backup=    Name of the backup/template to deploy. This is the name of
                         the folder where all the backup files are stored.
+-s, --site_id=          when the backup is an org backup (generated with
+                        "org_conf_backup.py"), id of the site to deploy. If not
+                        set, the site will be asked by the script
                         
 -l, --log_file=         define the filepath/filename where to write the logs
                         default is "./script.log"
@@ -1607,6 +1695,7 @@ Script Parameters:
 Examples:
 python3 ./org_conf_deploy.py
 python3 ./org_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "my test org"
+python3 ./site_conf_deploy.py -f ./org_backup/my_org -s 978c48e6-xxxx-xxxx-xxxx-4d7c8e3a5b1f
 
 """
     )
@@ -1669,6 +1758,7 @@ if __name__ == "__main__":
 Examples:
 python3 ./site_conf_deploy.py
 python3 ./site_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "my test org"
+python3 ./site_conf_deploy.py -f ./org_backup/my_org -s 978c48e6-xxxx-xxxx-xxxx-4d7c8e3a5b1f
         """,
     )
 
@@ -1700,6 +1790,12 @@ python3 ./site_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "
     # parser.add_argument(
     #     "-b", "--source_backup", help="Name of the backup/template to deploy"
     # )
+    parser.add_argument(
+        "-s",
+        "--site_id",
+        help="id of the site to deploy when the backup is an org backup",
+        default="",
+    )
     parser.add_argument(
         "-k",
         "--keyring_service",
@@ -1724,6 +1820,7 @@ python3 ./site_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "
     LOG_FILE = args.log_file if args.log_file else LOG_FILE
     KEYRING_SERVICE = args.keyring_service if args.keyring_service else None
     MERGE_ACTION = args.merge_action if args.merge_action else "skip"
+    SITE_ID = args.site_id
     if KEYRING_SERVICE:
         ENV_FILE = None
 
@@ -1742,4 +1839,12 @@ python3 ./site_conf_deploy.py --org_id=203d3d02-xxxx-xxxx-xxxx-76896a3330f4 -n "
     LOGGER.info("Destination Org ID: %s", ORG_ID if ORG_ID else "ask user")
     LOGGER.info("Destination Org Name: %s", ORG_NAME if ORG_NAME else "ask user")
     LOGGER.info("Merge action: %s", MERGE_ACTION)
-    start(APISESSION, ORG_ID, ORG_NAME, BACKUP_FOLDER_PATH, merge_action=MERGE_ACTION)
+    LOGGER.info("Site ID: %s", SITE_ID if SITE_ID else "ask user")
+    start(
+        APISESSION,
+        ORG_ID,
+        ORG_NAME,
+        BACKUP_FOLDER_PATH,
+        merge_action=MERGE_ACTION,
+        site_id=SITE_ID,
+    )
@@ -0,0 +1,763 @@
+"""
+-------------------------------------------------------------------------------
+
+    Written by Thomas Munzer (tmunzer@juniper.net)
+    Github repository: https://github.com/tmunzer/Mist_library/
+
+    This script is licensed under the MIT License.
+
+-------------------------------------------------------------------------------
+Python module to manage the files generated by the org configuration backup
+("org_conf_backup.py") and read by the deploy scripts.
+
+This module is used by other scripts from the mist_library, it is not meant to
+be run directly.
+
+A backup folder can contain:
+- a full backup: "org_conf_archive.gz", a compressed archive with one frame
+  for each org step and one frame for each site, and an index of the frames
+  at the end of the file (see `ArchiveWriter`). The frames are written by
+  `BackupWriter` as soon as each site backup is done, so the backup never has
+  to be kept in memory. A single site can be read from the archive without
+  reading the whole backup
+- a legacy full backup: "org_conf_file.json", with all the org and sites
+  objects in a single file
+- an incremental backup: "org_conf_delta.json", with only the objects created,
+  updated or deleted since the previous backup (the "base" backup)
+- an interrupted full backup: the temporary archive ("org_conf_archive.gz.tmp")
+  and its journal ("org_conf_journal.jsonl"), with the position of each frame
+  already written in the archive. The backup can be resumed from the journal
+
+Both types of backup also contain a manifest ("org_conf_manifest.json") with
+the list of the objects ids and a fingerprint for each object (the object
+"modified_time" when available, a hash of the object otherwise). The manifest
+is used by the next incremental backup to detect the changes, and by
+`load_backup` to rebuild a full backup from a chain of incremental backups.
+
+`load_backup` returns the sites objects as a lazy mapping: the objects of a site
+are only read from the archive when the site is accessed.
+
+-------
+Usage:
+import mist_backup_store
+
+backup = mist_backup_store.load_backup("./org_backup/my_org")
+site = mist_backup_store.BackupArchive("./org_backup/my_org/org_conf_archive.gz").get_site(site_id)
+"""
+
+#### IMPORTS ####
+import gzip
+import json
+import logging
+import os
+import struct
+import threading
+from collections.abc import MutableMapping
+from hashlib import sha256
+
+#####################################################################
+#### PARAMETERS #####
+BACKUP_FILE = "org_conf_file.json"
+ARCHIVE_FILE = "org_conf_archive.gz"
+ARCHIVE_MAGIC = b"MISTBKP1"
+ARCHIVE_FOOTER = struct.Struct(">8sQ")
+COMPRESS_LEVEL = 6
+DELTA_FILE = "org_conf_delta.json"
+JOURNAL_FILE = "org_conf_journal.jsonl"
+MANIFEST_FILE = "org_conf_manifest.json"
+MANIFEST_VERSION = 1
+MAX_DELTA_CHAIN = 100
+
+#####################################################################
+#### LOGS ####
+LOGGER = logging.getLogger(__name__)
+
+
+#####################################################################
+#### FINGERPRINTS ####
+def get_fingerprint(obj) -> str:
+    """
+    Return the fingerprint of an object. The "modified_time" is used when
+    available, otherwise the fingerprint is a hash of the object content
+
+    PARAMS
+    -----------
+    obj : dict | list
+        object to fingerprint
+
+    RETURN
+    -----------
+    str
+        object fingerprint
+    """
+    if isinstance(obj, dict) and obj.get("modified_time"):
+        return f"mt:{obj['modified_time']}"
+    obj_str = json.dumps(obj, sort_keys=True, separators=(",", ":"))
+    return f"h:{sha256(obj_str.encode()).hexdigest()[:16]}"
+
+
+def get_index(data) -> list | str:
+    """
+    Return the manifest entry for the data of a backup step. For a list of
+    objects, this is the list of [id, fingerprint], otherwise the fingerprint
+    of the data
+    """
+    if isinstance(data, list):
+        index = []
+        for obj in data:
+            if isinstance(obj, dict) and obj.get("id"):
+                index.append([obj["id"], get_fingerprint(obj)])
+            else:
+                index.append([None, get_fingerprint(obj)])
+        return index
+    return get_fingerprint(data)
+
+
+def get_site_index(site_backup: dict) -> dict:
+    """
+    Return the manifest entries for all the steps of a site backup
+    """
+    return {step_name: get_index(data) for step_name, data in site_backup.items()}
+
+
+def build_manifest(
+    org_id: str,
+    timestamp: int,
+    org_backup: dict,
+    sites_backup: dict,
+    base: str | None = None,
+) -> dict:
+    """
+    Generate the manifest of a full backup
+
+    PARAMS
+    -----------
+    org_id : str
+        org_id of the org backed up
+    timestamp : int
+        timestamp (in seconds) of the beginning of the backup
+    org_backup : dict
+        org objects (`backup["org"]`)
+    sites_backup : dict
+        sites objects (`backup["sites"]`)
+    base : str, default None
+        path to the base backup (only for incremental backups)
+
+    RETURN
+    -----------
+    dict
+        backup manifest
+    """
+    return {
+        "version": MANIFEST_VERSION,
+        "org_id": org_id,
+        "timestamp": timestamp,
+        "base": base,
+        "org": {
+            step_name: get_index(data)
+            for step_name, data in org_backup.items()
+            if step_name != "id"
+        },
+        "sites": {
+            site_id: get_site_index(site) for site_id, site in sites_backup.items()
+        },
+    }
+
+
+#####################################################################
+#### DELTAS ####
+def diff_step(previous_index, data) -> tuple:
+    """
+    Compare the data of a backup step with its previous manifest entry
+
+    PARAMS
+    -----------
+    previous_index : list | str | None
+        manifest entry from the previous backup
+    data : list | dict
+        data retrieved from the Mist Cloud
+
+    RETURN
+    -----------
+    tuple
+        (delta, changed_ids) where `delta` is None when nothing changed, and
+        `changed_ids` is the set of the created/updated objects ids
+    """
+    new_index = get_index(data)
+    if not isinstance(data, list):
+        if new_index == previous_index:
+            return None, set()
+        return {"replace": data}, set()
+
+    previous = {}
+    if isinstance(previous_index, list):
+        previous = {obj_id: fp for obj_id, fp in previous_index if obj_id}
+    upserts = []
+    changed_ids = set()
+    current_ids = set()
+    for obj, (obj_id, fp) in zip(data, new_index):
+        if not obj_id:
+            # objects without id can't be tracked, keep the full step
+            return {"replace": data}, set()
+        current_ids.add(obj_id)
+        if previous.get(obj_id) != fp:
+            upserts.append(obj)
+            changed_ids.add(obj_id)
+    deletes = [obj_id for obj_id in previous if obj_id not in current_ids]
+    if not upserts and not deletes:
+        return None, set()
+    return {"upserts": upserts, "deletes": deletes}, changed_ids
+
+
+def _apply_step(previous_data, step_delta: dict, index):
+    if "replace" in step_delta:
+        return step_delta["replace"]
+    objects = {}
+    for obj in previous_data or []:
+        if isinstance(obj, dict) and obj.get("id"):
+            objects[obj["id"]] = obj
+    for obj_id in step_delta.get("deletes", []):
+        objects.pop(obj_id, None)
+    for obj in step_delta.get("upserts", []):
+        objects[obj["id"]] = obj
+    if isinstance(index, list):
+        return [objects[obj_id] for obj_id, _ in index if obj_id in objects]
+    return list(objects.values())
+
+
+def apply_delta(backup: dict, delta: dict, manifest: dict) -> dict:
+    """
+    Apply an incremental backup to the previous full backup
+
+    PARAMS
+    -----------
+    backup : dict
+        full backup (rebuilt) of the base backup. This object is updated
+    delta : dict
+        content of the incremental backup file
+    manifest : dict
+        manifest of the incremental backup, used to restore the objects order
+
+    RETURN
+    -----------
+    dict
+        full backup
+    """
+    for step_name, step_delta in delta.get("org", {}).items():
+        backup["org"][step_name] = _apply_step(
+            backup["org"].get(step_name),
+            step_delta,
+            manifest["org"].get(step_name),
+        )
+    for site_id in delta.get("deleted_sites", []):
+        backup["sites"].pop(site_id, None)
+    for site_id, site_delta in delta.get("sites", {}).items():
+        site_backup = backup["sites"].get(site_id) or {}
+        for step_name, step_delta in site_delta.items():
+            site_backup[step_name] = _apply_step(
+                site_backup.get(step_name),
+                step_delta,
+                manifest["sites"].get(site_id, {}).get(step_name),
+            )
+        # the sites may be loaded from their files, store the updated backup
+        backup["sites"][site_id] = site_backup
+    return backup
+
+
+#####################################################################
+#### FILES ####
+def load_manifest(backup_path: str) -> dict | None:
+    """
+    Load the manifest from a backup folder. Returns None if the folder does not
+    contain a manifest
+    """
+    manifest_path = os.path.join(backup_path, MANIFEST_FILE)
+    if not os.path.isfile(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(backup_path: str, file_name: str, data: dict) -> None:
+    """
+    Save data in a JSON file. The file is written with a temporary name then
+    renamed, so an interrupted backup never leaves a partial file
+    """
+    file_path = os.path.join(backup_path, file_name)
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, file_path)
+
+
+def _load_json(file_path: str):
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+#####################################################################
+#### ARCHIVE ####
+class ArchiveWriter:
+    """
+    Write a backup archive. Each frame is a JSON object compressed as an
+    independent gzip member and appended to the archive as soon as it is
+    written. The index of the frames (key, offset, size) is written at the end
+    of the archive by `close`, followed by a fixed size footer with the offset
+    of the index.
+
+    The archive is written with a temporary name, and renamed by `close`.
+    `write_frame` can be called from multiple threads.
+
+    PARAMS
+    -----------
+    file_path : str
+        path to the archive
+    frames : dict, default None
+        frames already written in the temporary archive by an interrupted
+        backup ({key: [offset, size]}). If set, the temporary archive is reused
+        and the new frames are appended after the last known frame
+    """
+
+    def __init__(self, file_path: str, frames: dict | None = None):
+        self.file_path = file_path
+        self.tmp_path = f"{file_path}.tmp"
+        self.frames = dict(frames or {})
+        if self.frames:
+            self._file = open(self.tmp_path, "r+b")
+            # drop the frame which was being written when the backup stopped
+            self._file.truncate(max(offset + size for offset, size in self.frames.values()))
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file = open(self.tmp_path, "wb")
+        self._lock = threading.Lock()
+
+    def read_frame(self, key: str):
+        """
+        Read a frame already written in the temporary archive
+        """
+        offset, size = self.frames[key]
+        with open(self.tmp_path, "rb") as f:
+            f.seek(offset)
+            return json.loads(gzip.decompress(f.read(size)))
+
+    def write_frame(self, key: str, data) -> list:
+        """
+        Compress and append a frame to the archive
+
+        PARAMS
+        -----------
+        key : str
+            frame key (e.g. "org/wlans" or "site/<site_id>")
+        data : dict | list
+            frame data
+
+        RETURN
+        -----------
+        list
+            [offset, size] of the frame in the archive
+        """
+        payload = gzip.compress(
+            json.dumps(data).encode("utf-8"), compresslevel=COMPRESS_LEVEL
+        )
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(payload)
+            self._file.flush()
+            self.frames[key] = [offset, len(payload)]
+            return self.frames[key]
+
+    def close(self, index: dict) -> None:
+        """
+        Write the index and the footer, and rename the archive
+
+        PARAMS
+        -----------
+        index : dict
+            archive index. The "frames" entry is added by this function
+        """
+        with self._lock:
+            index["frames"] = self.frames
+            offset = self._file.tell()
+            self._file.write(gzip.compress(json.dumps(index).encode("utf-8")))
+            self._file.write(ARCHIVE_FOOTER.pack(ARCHIVE_MAGIC, offset))
+            self._file.close()
+        os.replace(self.tmp_path, self.file_path)
+
+
+class BackupArchive:
+    """
+    Read a backup archive generated by `ArchiveWriter`. Only the index is
+    loaded when the archive is opened, each frame is read (with a seek) and
+    decompressed when requested.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        with open(file_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            file_size = f.tell()
+            if file_size < ARCHIVE_FOOTER.size:
+                raise ValueError(f"{file_path} is not a valid backup archive")
+            f.seek(file_size - ARCHIVE_FOOTER.size)
+            magic, offset = ARCHIVE_FOOTER.unpack(f.read(ARCHIVE_FOOTER.size))
+            if magic != ARCHIVE_MAGIC:
+                raise ValueError(f"{file_path} is not a valid backup archive")
+            f.seek(offset)
+            payload = f.read(file_size - ARCHIVE_FOOTER.size - offset)
+        self.index = json.loads(gzip.decompress(payload))
+        self.frames = self.index["frames"]
+
+    def read(self, key: str):
+        """
+        Read and return a frame from the archive
+
+        PARAMS
+        -----------
+        key : str
+            frame key (e.g. "org/wlans" or "site/<site_id>")
+        """
+        if key not in self.frames:
+            raise KeyError(key)
+        offset, size = self.frames[key]
+        with open(self.file_path, "rb") as f:
+            f.seek(offset)
+            payload = f.read(size)
+        return json.loads(gzip.decompress(payload))
+
+    def get_org(self, org_steps: list | None = None) -> dict:
+        """
+        Return the org objects. If `org_steps` is set, only these steps (and the
+        org id) are read from the archive
+        """
+        org_backup = {"id": self.index["org_id"]}
+        for step_name in self.index["org"]:
+            if org_steps is None or step_name in org_steps:
+                org_backup[step_name] = self.read(f"org/{step_name}")
+        return org_backup
+
+    def get_site(self, site_id: str) -> dict:
+        """
+        Return the objects of a site
+        """
+        return self.read(f"site/{site_id}")
+
+    def get_site_ids(self) -> list:
+        """
+        Return the ids of the sites saved in the archive
+        """
+        return list(self.index["sites"])
+
+
+class BackupWriter:
+    """
+    Write a full backup to disk while it is generated. The org objects and the
+    objects of each site are saved in the backup archive as soon as they are
+    retrieved, and the archive index is written by `close`. Only the manifest
+    entries are kept in memory.
+
+    Each frame written to the archive is recorded in a journal file. If the
+    backup is interrupted, it can be resumed (`resume`=True): the org steps and
+    the sites already saved are loaded from the journal, and are available
+    with `is_done` and `read`.
+
+    `write_org_step` and `write_site` can be called from multiple threads.
+
+    PARAMS
+    -----------
+    backup_path : str
+        path to the backup folder
+    org_id : str
+        org_id of the org backed up
+    timestamp : int
+        timestamp (in seconds) of the beginning of the backup. When the backup
+        is resumed, the timestamp of the interrupted backup is used
+    resume : bool, default False
+        resume an interrupted backup from its journal
+    """
+
+    def __init__(
+        self, backup_path: str, org_id: str, timestamp: int, resume: bool = False
+    ):
+        self.org_id = org_id
+        self.timestamp = timestamp
+        self.org_index = {}
+        self.site_ids = []
+        self.sites_index = {}
+        self.done = set()
+        self.journal_path = os.path.join(backup_path, JOURNAL_FILE)
+        archive_path = os.path.join(backup_path, ARCHIVE_FILE)
+        frames = {}
+        if resume:
+            frames = self._load_journal()
+        self.archive = ArchiveWriter(archive_path, frames)
+        self._journal = open(self.journal_path, "a" if frames else "w", encoding="utf-8")
+        if not frames:
+            self._write_journal(
+                {"version": MANIFEST_VERSION, "org_id": org_id, "timestamp": timestamp}
+            )
+        self._lock = threading.Lock()
+
+    def _load_journal(self) -> dict:
+        """
+        Load the frames, manifest entries and completed work from the journal
+        of an interrupted backup
+        """
+        frames = {}
+        if not has_journal(os.path.dirname(self.journal_path) or "."):
+            return frames
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        if not lines:
+            return frames
+        header = json.loads(lines[0])
+        if header.get("org_id") != self.org_id:
+            raise ValueError(f"{self.journal_path} is not a backup of the org {self.org_id}")
+        self.timestamp = header.get("timestamp", self.timestamp)
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # line partially written when the backup stopped
+                break
+            frames[entry["key"]] = entry["frame"]
+            scope, name = entry["key"].split("/", 1)
+            if scope == "org":
+                self.org_index[name] = entry["index"]
+                if name == "sites":
+                    self.site_ids = [obj_id for obj_id, _ in entry["index"]]
+            else:
+                self.sites_index[name] = entry["index"]
+            if entry["complete"]:
+                self.done.add(entry["key"])
+            else:
+                self.done.discard(entry["key"])
+        LOGGER.info(
+            "mist_backup_store:BackupWriter:resuming backup, %s frames loaded", len(frames)
+        )
+        return frames
+
+    def _write_journal(self, entry: dict) -> None:
+        self._journal.write(f"{json.dumps(entry)}\n")
+        self._journal.flush()
+
+    def _write_frame(self, key: str, data, index, complete: bool) -> None:
+        frame = self.archive.write_frame(key, data)
+        with self._lock:
+            self._write_journal(
+                {"key": key, "frame": frame, "index": index, "complete": complete}
+            )
+            if complete:
+                self.done.add(key)
+            else:
+                self.done.discard(key)
+
+    def is_done(self, key: str) -> bool:
+        """
+        Return True if the org step ("org/<step_name>") or the site
+        ("site/<site_id>") was completely saved
+        """
+        return key in self.done
+
+    def read(self, key: str):
+        """
+        Read an org step ("org/<step_name>") or a site ("site/<site_id>")
+        already saved
+        """
+        return self.archive.read_frame(key)
+
+    def write_org_step(self, step_name: str, data, complete: bool = True) -> None:
+        """
+        Save the objects of an org step
+
+        PARAMS
+        -----------
+        step_name : str
+            name of the org step (e.g. "wlans")
+        data : dict | list
+            objects of the step
+        complete : bool, default True
+            False if the objects were not all retrieved. The step will be
+            retrieved again if the backup is resumed
+        """
+        index = get_index(data)
+        self._write_frame(f"org/{step_name}", data, index, complete)
+        with self._lock:
+            self.org_index[step_name] = index
+        if step_name == "sites":
+            # the index is following the order of the sites in the org backup
+            self.site_ids = [site["id"] for site in data]
+
+    def write_site(self, site_id: str, site_backup: dict, complete: bool = True) -> None:
+        """
+        Save the objects of a site
+
+        PARAMS
+        -----------
+        site_id : str
+            id of the site
+        site_backup : dict
+            site objects (`backup["sites"][site_id]`)
+        complete : bool, default True
+            False if the site objects were not all retrieved. The site will be
+            retrieved again if the backup is resumed
+        """
+        index = get_site_index(site_backup)
+        self._write_frame(f"site/{site_id}", site_backup, index, complete)
+        with self._lock:
+            self.sites_index[site_id] = index
+
+    def close(self) -> None:
+        """
+        Write the archive index and remove the journal. Must be called once all
+        the sites are saved
+        """
+        site_ids = [site_id for site_id in self.site_ids if site_id in self.sites_index]
+        self.archive.close(
+            {
+                "version": MANIFEST_VERSION,
+                "org_id": self.org_id,
+                "org": list(self.org_index),
+                "sites": site_ids,
+            }
+        )
+        self._journal.close()
+        os.remove(self.journal_path)
+
+    def get_manifest(self) -> dict:
+        """
+        Generate the manifest of the backup. See `build_manifest`
+        """
+        manifest = build_manifest(self.org_id, self.timestamp, {}, {})
+        manifest["org"] = self.org_index
+        manifest["sites"] = {
+            site_id: self.sites_index[site_id]
+            for site_id in self.site_ids
+            if site_id in self.sites_index
+        }
+        return manifest
+
+
+class LazySites(MutableMapping):
+    """
+    Sites objects of a backup. The objects of a site are read from the backup
+    archive each time the site is accessed, and are never kept in memory. The
+    sites updated by an incremental backup are kept in memory.
+    """
+
+    def __init__(self, archive: BackupArchive):
+        self.archive = archive
+        self.site_ids = dict.fromkeys(archive.get_site_ids())
+        self.updated_sites = {}
+
+    def __getitem__(self, site_id: str) -> dict:
+        if site_id in self.updated_sites:
+            return self.updated_sites[site_id]
+        if site_id not in self.site_ids:
+            raise KeyError(site_id)
+        return self.archive.get_site(site_id)
+
+    def __setitem__(self, site_id: str, site_backup: dict) -> None:
+        self.updated_sites[site_id] = site_backup
+
+    def __delitem__(self, site_id: str) -> None:
+        if site_id not in self:
+            raise KeyError(site_id)
+        self.site_ids.pop(site_id, None)
+        self.updated_sites.pop(site_id, None)
+
+    def __contains__(self, site_id) -> bool:
+        return site_id in self.updated_sites or site_id in self.site_ids
+
+    def __iter__(self):
+        yield from self.site_ids
+        for site_id in list(self.updated_sites):
+            if site_id not in self.site_ids:
+                yield site_id
+
+    def __len__(self) -> int:
+        return len(self.site_ids) + len(
+            [site_id for site_id in self.updated_sites if site_id not in self.site_ids]
+        )
+
+
+#####################################################################
+#### LOAD ####
+def _load_full_backup(backup_path: str, org_steps: list | None = None) -> dict:
+    archive_path = os.path.join(backup_path, ARCHIVE_FILE)
+    if os.path.isfile(archive_path):
+        archive = BackupArchive(archive_path)
+        return {"org": archive.get_org(org_steps), "sites": LazySites(archive)}
+    return _load_json(os.path.join(backup_path, BACKUP_FILE))
+
+
+def _is_full_backup(backup_path: str) -> bool:
+    return os.path.isfile(os.path.join(backup_path, ARCHIVE_FILE)) or os.path.isfile(
+        os.path.join(backup_path, BACKUP_FILE)
+    )
+
+
+def has_journal(backup_path: str = ".") -> bool:
+    """
+    Return True if the folder contains an interrupted backup which can be
+    resumed
+    """
+    return os.path.isfile(os.path.join(backup_path, JOURNAL_FILE)) and os.path.isfile(
+        os.path.join(backup_path, f"{ARCHIVE_FILE}.tmp")
+    )
+
+
+def has_backup(backup_path: str = ".") -> bool:
+    """
+    Return True if the folder contains an org backup (full or incremental)
+    """
+    return _is_full_backup(backup_path) or os.path.isfile(
+        os.path.join(backup_path, DELTA_FILE)
+    )
+
+
+def load_backup(backup_path: str = ".", org_steps: list | None = None) -> dict:
+    """
+    Load a backup. If the folder contains an incremental backup, the full backup
+    is rebuilt from the base backups
+
+    PARAMS
+    -----------
+    backup_path : str, default "."
+        path to the backup folder
+    org_steps : list, default None
+        org steps to load (e.g. ["sites", "wlans"]). If not set, all the org
+        steps are loaded
+
+    RETURN
+    -----------
+    dict
+        full backup, with the "org" and "sites" entries. "sites" is a
+        `LazySites` mapping if the backup is an archive
+    """
+    chain = []
+    current_path = backup_path
+    while not _is_full_backup(current_path):
+        if not os.path.isfile(os.path.join(current_path, DELTA_FILE)):
+            raise FileNotFoundError(f"No backup found in {current_path}")
+        if len(chain) >= MAX_DELTA_CHAIN:
+            raise ValueError(f"Too many incremental backups from {backup_path}")
+        manifest = load_manifest(current_path)
+        if not manifest or not manifest.get("base"):
+            raise ValueError(f"Invalid incremental backup manifest in {current_path}")
+        chain.append((current_path, manifest))
+        current_path = os.path.normpath(os.path.join(current_path, manifest["base"]))
+
+    LOGGER.debug("mist_backup_store:load_backup:loading full backup %s", current_path)
+    backup = _load_full_backup(current_path, org_steps)
+    for delta_path, manifest in reversed(chain):
+        LOGGER.debug("mist_backup_store:load_backup:applying delta %s", delta_path)
+        delta = _load_json(os.path.join(delta_path, DELTA_FILE))
+        backup = apply_delta(backup, delta, manifest)
+    if org_steps is not None:
+        # the deltas may contain changes for the steps which were not loaded
+        backup["org"] = {
+            step_name: data
+            for step_name, data in backup["org"].items()
+            if step_name == "id" or step_name in org_steps
+        }
+    return backup
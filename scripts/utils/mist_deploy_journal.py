@@ -0,0 +1,217 @@
+"""
+-------------------------------------------------------------------------------
+
+    Written by Thomas Munzer (tmunzer@juniper.net)
+    Github repository: https://github.com/tmunzer/Mist_library/
+
+    This script is licensed under the MIT License.
+
+-------------------------------------------------------------------------------
+Python module to save the progress of a deployment (backup/template deployed
+to an org), so an interrupted deployment can be resumed without deploying the
+same objects again.
+
+This module is used by other scripts from the mist_library, it is not meant to
+be run directly.
+
+The journal is saved in the backup folder ("org_conf_deploy_journal_<org_id>.jsonl",
+one journal per destination org). The first line is the header of the
+deployment, and each next line is one of:
+- {"old": <source id>, "new": <destination id>}: object deployed (created, or
+  matched with an existing object) in the destination org
+- {"done": <key>}: other deployment task completed (e.g. bulk import)
+- {"deferred": <source id>}: object created before the objects it is
+  referencing, which must be updated once they are deployed
+- {"updated": <source id>}: deferred update of the object completed
+
+The journal is written line by line, so it can be read even if the deployment
+was stopped while writing it.
+
+-------
+Usage:
+import mist_deploy_journal
+
+journal = mist_deploy_journal.DeployJournal(".", org_id, resume=True)
+journal.add_uuid(old_id, new_id)
+journal.add_done("org/settings")
+journal.add_deferred(old_id)
+journal.remove_deferred(old_id)
+journal.close(remove=True)
+"""
+
+#### IMPORTS ####
+import json
+import logging
+import os
+import threading
+
+#####################################################################
+#### PARAMETERS #####
+JOURNAL_VERSION = 1
+JOURNAL_FILE = "org_conf_deploy_journal_{org_id}.jsonl"
+
+#####################################################################
+#### LOGS ####
+LOGGER = logging.getLogger(__name__)
+
+
+#####################################################################
+#### FUNCTIONS ####
+def get_journal_path(backup_path: str, org_id: str) -> str:
+    """
+    Return the path to the journal of the deployment to the org `org_id`
+    """
+    return os.path.join(backup_path, JOURNAL_FILE.format(org_id=org_id))
+
+
+def has_journal(backup_path: str, org_id: str) -> bool:
+    """
+    Return True if the folder contains an interrupted deployment to the org
+    `org_id`
+    """
+    return os.path.isfile(get_journal_path(backup_path, org_id))
+
+
+#####################################################################
+#### JOURNAL ####
+class DeployJournal:
+    """
+    Journal of a deployment. The methods can be called from multiple threads.
+
+    PARAMS
+    -----------
+    backup_path : str
+        path to the backup folder
+    org_id : str
+        org_id of the destination org
+    resume : bool, default False
+        load the journal of an interrupted deployment. If False, or if there is
+        no journal, a new journal is started
+    header : dict, default None
+        information saved with the journal (e.g. deployment parameters). When
+        the deployment is resumed, the header of the interrupted deployment
+        is used
+    """
+
+    def __init__(
+        self,
+        backup_path: str,
+        org_id: str,
+        resume: bool = False,
+        header: dict | None = None,
+    ):
+        self.org_id = org_id
+        self.journal_path = get_journal_path(backup_path, org_id)
+        self.header = header or {}
+        self.uuids = {}
+        self.done = set()
+        self.deferred = set()
+        self.resumed = False
+        if resume:
+            self.resumed = self._load_journal()
+        self._journal = open(
+            self.journal_path, "a" if self.resumed else "w", encoding="utf-8"
+        )
+        if not self.resumed:
+            self._write_journal(
+                {"version": JOURNAL_VERSION, "org_id": org_id, **self.header}
+            )
+        self._lock = threading.Lock()
+
+    def _load_journal(self) -> bool:
+        if not os.path.isfile(self.journal_path):
+            return False
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        if not lines:
+            return False
+        header = json.loads(lines[0])
+        if header.get("org_id") != self.org_id:
+            raise ValueError(
+                f"{self.journal_path} is not a deployment to the org {self.org_id}"
+            )
+        self.header = {
+            k: v for k, v in header.items() if k not in ["version", "org_id"]
+        }
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # line partially written when the deployment stopped
+                break
+            if "done" in entry:
+                self.done.add(entry["done"])
+            elif "deferred" in entry:
+                self.deferred.add(entry["deferred"])
+            elif "updated" in entry:
+                self.deferred.discard(entry["updated"])
+            else:
+                self.uuids[entry["old"]] = entry["new"]
+        LOGGER.info(
+            "mist_deploy_journal:DeployJournal:resuming deployment, %s objects and "
+            "%s tasks and %s deferred updates loaded",
+            len(self.uuids),
+            len(self.done),
+            len(self.deferred),
+        )
+        return True
+
+    def _write_journal(self, entry: dict) -> None:
+        self._journal.write(f"{json.dumps(entry)}\n")
+        self._journal.flush()
+
+    def add_uuid(self, old: str, new: str) -> None:
+        """
+        Save the destination id of an object from the backup
+        """
+        with self._lock:
+            if self.uuids.get(old) == new:
+                return
+            self.uuids[old] = new
+            self._write_journal({"old": old, "new": new})
+
+    def add_done(self, key: str) -> None:
+        """
+        Save a completed deployment task (e.g. "org/settings")
+        """
+        with self._lock:
+            if key in self.done:
+                return
+            self.done.add(key)
+            self._write_journal({"done": key})
+
+    def add_deferred(self, old: str) -> None:
+        """
+        Save an object from the backup which must be updated once the objects
+        it is referencing are deployed
+        """
+        with self._lock:
+            if old in self.deferred:
+                return
+            self.deferred.add(old)
+            self._write_journal({"deferred": old})
+
+    def remove_deferred(self, old: str) -> None:
+        """
+        Save the completion of the deferred update of an object
+        """
+        with self._lock:
+            if old not in self.deferred:
+                return
+            self.deferred.discard(old)
+            self._write_journal({"updated": old})
+
+    def is_done(self, key: str) -> bool:
+        """
+        Return True if the deployment task was completed
+        """
+        return key in self.done
+
+    def close(self, remove: bool = False) -> None:
+        """
+        Close the journal. If `remove` is True (deployment completed), the
+        journal file is removed
+        """
+        self._journal.close()
+        if remove:
+            os.remove(self.journal_path)
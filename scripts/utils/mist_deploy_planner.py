@@ -0,0 +1,156 @@
+"""
+-------------------------------------------------------------------------------
+
+    Written by Thomas Munzer (tmunzer@juniper.net)
+    Github repository: https://github.com/tmunzer/Mist_library/
+
+    This script is licensed under the MIT License.
+
+-------------------------------------------------------------------------------
+Python module to compute the deployment order of objects depending on each
+other (e.g. a WLAN referencing a WLAN template, a site referencing a RF
+template, ...).
+
+This module is used by other scripts from the mist_library, it is not meant to
+be run directly.
+
+The dependencies are processed as a graph: each node is depending on the
+nodes it references. The nodes are grouped in "layers":
+- the nodes of the first layer do not depend on any other node
+- the nodes of the next layers only depend on nodes of the previous layers
+so all the nodes of the same layer can be deployed at the same time.
+
+Nodes referencing each other (dependency cycle) cannot be ordered. They are
+returned together, as one "component", in the order they were provided. When
+deploying a component, the references to the other nodes of the same
+component may not be known yet and must be updated once the whole component is
+deployed.
+
+-------
+Usage:
+import mist_deploy_planner
+
+layers = mist_deploy_planner.get_layers({
+    "wlans": ["templates"],
+    "templates": ["sites"],
+    "sites": ["sitegroups", "rftemplates"],
+    "sitegroups": [],
+    "rftemplates": [],
+})
+# [[["sitegroups"], ["rftemplates"]], [["sites"]], [["templates"]], [["wlans"]]]
+"""
+
+
+#####################################################################
+#### FUNCTIONS ####
+def _get_components(dependencies: dict) -> list:
+    # Tarjan algorithm (iterative, the number of nodes may exceed the
+    # recursion limit). The components are returned after the components
+    # they depend on
+    index = {}
+    low_link = {}
+    stack = []
+    on_stack = set()
+    components = []
+    for root in dependencies:
+        if root in index:
+            continue
+        work = [(root, iter(dependencies[root]))]
+        index[root] = low_link[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            child = next(children, None)
+            while child is not None and child in index:
+                if child in on_stack:
+                    low_link[node] = min(low_link[node], index[child])
+                child = next(children, None)
+            if child is not None:
+                index[child] = low_link[child] = len(index)
+                stack.append(child)
+                on_stack.add(child)
+                work.append((child, iter(dependencies[child])))
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low_link[parent] = min(low_link[parent], low_link[node])
+            if low_link[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+
+def get_layers(dependencies: dict) -> list:
+    """
+    Group the nodes in layers which can be deployed one after the other
+
+    PARAMS
+    -----------
+    dependencies : dict
+        {node: list of the nodes it depends on}. The dependencies which are
+        not in the dict keys, and the dependencies of a node on itself, are
+        ignored
+
+    RETURN
+    -----------
+    list
+        list of layers. Each layer is a list of components, each component is
+        a list of nodes. The layers, components and nodes are in the order
+        of the `dependencies` dict
+    """
+    position = {node: i for i, node in enumerate(dependencies)}
+    graph = {
+        node: [dep for dep in deps if dep in position and dep != node]
+        for node, deps in dependencies.items()
+    }
+    component_of = {}
+    levels = {}
+    for component_id, component in enumerate(_get_components(graph)):
+        level = 0
+        for node in component:
+            component_of[node] = component_id
+        for node in component:
+            for dep in graph[node]:
+                if component_of[dep] != component_id:
+                    level = max(level, levels[component_of[dep]][0] + 1)
+        levels[component_id] = (level, sorted(component, key=position.get))
+
+    layers = []
+    for level, component in sorted(
+        levels.values(), key=lambda item: (item[0], position[item[1][0]])
+    ):
+        while len(layers) <= level:
+            layers.append([])
+        layers[level].append(component)
+    return layers
+
+
+def get_order(dependencies: dict) -> list:
+    """
+    Return the nodes in an order where each node is after the nodes it
+    depends on (except for the dependency cycles)
+
+    PARAMS
+    -----------
+    dependencies : dict
+        {node: list of the nodes it depends on}
+
+    RETURN
+    -----------
+    list
+        list of nodes
+    """
+    return [
+        node
+        for layer in get_layers(dependencies)
+        for component in layer
+        for node in component
+    ]
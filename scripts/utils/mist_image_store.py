@@ -0,0 +1,253 @@
+"""
+-------------------------------------------------------------------------------
+
+    Written by Thomas Munzer (tmunzer@juniper.net)
+    Github repository: https://github.com/tmunzer/Mist_library/
+
+    This script is licensed under the MIT License.
+
+-------------------------------------------------------------------------------
+Python module to download the images (maps, device pictures, ...) saved with
+the backups.
+
+This module is used by other scripts from the mist_library, it is not meant to
+be run directly.
+
+The images are downloaded by a pool of threads, each thread reusing its own
+HTTP connection. Each image is saved once in the "images" folder, with its
+SHA256 hash as name, and the file expected by the deploy scripts (e.g.
+"org_conf_file_org_<org_id>_site_<site_id>_map_<map_id>.png") is a hard link
+to this file. Identical images (same floorplan used by multiple sites, same
+device picture, ...) are only stored once.
+
+The "images_index.json" file keeps, for each image file, the URL (without the
+query string), the ETag and the hash of the image. When the same image was
+already downloaded by a previous backup (same folder, or previous backup
+folders), the image is only downloaded again if it changed (conditional
+request with the ETag, or same hash after the download).
+
+-------
+Requirements:
+requests: https://pypi.org/project/requests/
+
+-------
+Usage:
+import mist_image_store
+
+image_store = mist_image_store.ImageStore(".")
+future = image_store.submit(url, "my_image.png")
+future.result()
+image_store.close()
+"""
+
+#### IMPORTS ####
+import json
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from hashlib import sha256
+
+import requests
+
+#####################################################################
+#### PARAMETERS #####
+MAX_WORKERS = 8
+IMAGES_FOLDER = "images"
+INDEX_FILE = "images_index.json"
+CHUNK_SIZE = 65536
+TIMEOUT = 60
+
+#####################################################################
+#### LOGS ####
+LOGGER = logging.getLogger(__name__)
+
+
+#####################################################################
+#### FUNCTIONS ####
+def _get_url_key(url: str) -> str:
+    # the query string contains the URL signature, which changes every time
+    return url.split("?", 1)[0]
+
+
+def _load_index(backup_path: str) -> dict:
+    index_path = os.path.join(backup_path, INDEX_FILE)
+    if not os.path.isfile(index_path):
+        return {}
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("files", {})
+    except Exception:
+        LOGGER.error("Exception occurred", exc_info=True)
+        return {}
+
+
+def _link(src: str, dst: str) -> None:
+    if os.path.abspath(src) == os.path.abspath(dst):
+        return
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+#####################################################################
+#### IMAGE STORE ####
+class ImageStore:
+    """
+    Content addressed store for the images of a backup folder
+
+    PARAMS
+    -----------
+    backup_path : str, default "."
+        path to the backup folder
+    previous_paths : list, default None
+        path to the previous backup folders where the images may already be
+        stored
+    max_workers : int, default MAX_WORKERS
+        maximum number of images downloaded at the same time
+    """
+
+    def __init__(
+        self,
+        backup_path: str = ".",
+        previous_paths: list | None = None,
+        max_workers: int = MAX_WORKERS,
+    ):
+        self.backup_path = backup_path
+        self.images_path = os.path.join(backup_path, IMAGES_FOLDER)
+        os.makedirs(self.images_path, exist_ok=True)
+        self.files = _load_index(backup_path)
+        # images already downloaded by the previous backups, by URL and by
+        # file name (for the files copied from the previous backups)
+        self.known_urls = {}
+        self.known_files = {}
+        for previous_path in [backup_path] + (previous_paths or []):
+            for file_name, entry in _load_index(previous_path).items():
+                blob = os.path.join(previous_path, IMAGES_FOLDER, entry["blob"])
+                if not os.path.isfile(blob):
+                    continue
+                self.known_urls.setdefault(entry["url"], {**entry, "path": blob})
+                self.known_files.setdefault(file_name, {**entry, "path": blob})
+        self.downloaded_count = 0
+        self.reused_count = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def _get_session(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _store_blob(self, src: str, entry: dict) -> str:
+        blob = os.path.join(self.images_path, entry["blob"])
+        if not os.path.isfile(blob):
+            _link(src, blob)
+        return blob
+
+    def _download(self, url: str, file_name: str) -> bool:
+        url_key = _get_url_key(url)
+        known = self.known_urls.get(url_key)
+        headers = {}
+        if known and known.get("etag"):
+            headers["If-None-Match"] = known["etag"]
+
+        response = self._get_session().get(
+            url, headers=headers, stream=True, timeout=TIMEOUT
+        )
+        with response:
+            if response.status_code == 304 and known:
+                LOGGER.debug("mist_image_store:_download:%s not modified", file_name)
+                entry = {k: v for k, v in known.items() if k != "path"}
+                blob = self._store_blob(known["path"], entry)
+                reused = True
+            else:
+                response.raise_for_status()
+                extension = os.path.splitext(file_name)[1]
+                tmp_path = os.path.join(
+                    self.images_path, f".{threading.get_ident()}{extension}.tmp"
+                )
+                file_hash = sha256()
+                with open(tmp_path, "wb") as f:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        file_hash.update(chunk)
+                        f.write(chunk)
+                entry = {
+                    "url": url_key,
+                    "etag": response.headers.get("ETag"),
+                    "blob": f"{file_hash.hexdigest()}{extension}",
+                }
+                blob = os.path.join(self.images_path, entry["blob"])
+                reused = os.path.isfile(blob)
+                if known and known["blob"] == entry["blob"]:
+                    blob = self._store_blob(known["path"], entry)
+                    reused = True
+                if reused:
+                    os.remove(tmp_path)
+                else:
+                    os.replace(tmp_path, blob)
+
+        _link(blob, os.path.join(self.backup_path, file_name))
+        with self._lock:
+            self.files[file_name] = entry
+            if reused:
+                self.reused_count += 1
+            else:
+                self.downloaded_count += 1
+        return True
+
+    def submit(self, url: str, file_name: str) -> Future:
+        """
+        Add an image to the download queue
+
+        PARAMS
+        -----------
+        url : str
+            image URL
+        file_name : str
+            name of the image file in the backup folder
+
+        RETURN
+        -----------
+        Future
+            resolved when the image is saved. `result()` raises the exception
+            if the download failed
+        """
+        return self._executor.submit(self._download, url, file_name)
+
+    def close(self) -> None:
+        """
+        Wait for the pending downloads, save the images index and remove the
+        images not used anymore
+        """
+        self._executor.shutdown(wait=True)
+        for file_name, known in self.known_files.items():
+            file_path = os.path.join(self.backup_path, file_name)
+            if file_name not in self.files and os.path.isfile(file_path):
+                self.files[file_name] = {k: v for k, v in known.items() if k != "path"}
+                self._store_blob(known["path"], self.files[file_name])
+        files = {
+            file_name: entry
+            for file_name, entry in self.files.items()
+            if os.path.isfile(os.path.join(self.backup_path, file_name))
+        }
+        index_path = os.path.join(self.backup_path, INDEX_FILE)
+        with open(f"{index_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"files": files}, f)
+        os.replace(f"{index_path}.tmp", index_path)
+        blobs = {entry["blob"] for entry in files.values()}
+        for blob in os.listdir(self.images_path):
+            blob_path = os.path.join(self.images_path, blob)
+            # a blob still linked to an image file may belong to an interrupted
+            # backup not in the index yet
+            if blob not in blobs and os.stat(blob_path).st_nlink == 1:
+                os.remove(blob_path)
+        LOGGER.info(
+            "mist_image_store:close:%s images downloaded, %s images reused",
+            self.downloaded_count,
+            self.reused_count,
+        )
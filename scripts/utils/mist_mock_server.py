@@ -0,0 +1,701 @@
+"""
+-------------------------------------------------------------------------------
+
+    Written by Thomas Munzer (tmunzer@juniper.net)
+    Github repository: https://github.com/tmunzer/Mist_library/
+
+    This script is licensed under the MIT License.
+
+-------------------------------------------------------------------------------
+Python module to run a local HTTP server replaying Mist API responses. It is
+used to test and benchmark the mist_library scripts without a Mist Cloud.
+
+This module can be imported by other scripts (benchmarks), or run directly to
+start a standalone server.
+
+The responses are loaded from a fixtures file (JSON), recorded from a Mist
+Cloud with the `record` function or generated. The fixtures file contains the
+data of each API URI:
+{
+    "routes": {
+        "/api/v1/self": {"email": "...", "privileges": [...]},
+        "/api/v1/orgs/<org_id>": {"id": "<org_id>", "name": "..."},
+        "/api/v1/orgs/<org_id>/sites": [{"id": "...", ...}, ...],
+        "/api/v1/orgs/<org_id>/devices/events/search": {"results": [...]}
+    }
+}
+
+The server is emulating the Mist Cloud behavior:
+- list responses are paginated with the "limit" and "page" query parameters,
+  and the "X-Page-Total", "X-Page-Limit" and "X-Page-Page" headers
+- search responses ({"results": [...]}) are paginated with the "next" field
+- the list items are filtered by the query parameters matching their fields,
+  and by "start"/"end" when they have a "timestamp" field
+- the objects can be retrieved, created (POST on a list), updated (PUT) or
+  deleted (DELETE) with their id. Other POST requests are accepted. The
+  requests to unknown URIs are creating them (unless `strict` is True)
+- a latency (and a random jitter) can be added to each response
+- HTTP 429 responses (with a "Retry-After" header) can be returned randomly
+  ("error_rate") or when the number of requests is exceeding a rate limit
+
+The random values are generated with a fixed seed, so the results are
+reproducible. The statistics of the server (number of requests, HTTP 429...)
+are available with `MockServer.get_stats`, or with GET /__mock__/stats.
+
+Mist sessions created by mistapi are always using HTTPS. Use `connect` to send
+the requests of a session to the server.
+
+-------
+Requirements:
+mistapi: https://pypi.org/project/mistapi/
+
+-------
+Usage:
+import mist_mock_server
+
+with mist_mock_server.MockServer("fixtures.json", latency=50) as server:
+    mist_session = mistapi.APISession()
+    mist_session = mist_mock_server.connect(mist_session, server.url)
+    ...
+    print(server.get_stats())
+
+-------
+Script Parameters:
+-h, --help              display this help
+-f, --fixtures=         path to the fixtures file
+-p, --port=             port to listen on
+                        default is 8080
+--latency=              latency (in milliseconds) added to each response
+                        default is 0
+--jitter=               maximum random latency (in milliseconds) added to
+                        each response
+                        default is 0
+--error_rate=           ratio of the requests rejected with a HTTP 429 (0-1)
+                        default is 0
+--rate_limit=           number of requests allowed per rate period before
+                        the requests are rejected with a HTTP 429
+                        default is 0 (no limit)
+--rate_period=          rate period (in seconds)
+                        default is 3600
+--seed=                 seed of the random values
+                        default is 0
+-l, --log_file=         define the filepath/filename where to write the logs
+                        default is "./script.log"
+
+-------
+Examples:
+python3 ./mist_mock_server.py -f ./fixtures.json
+python3 ./mist_mock_server.py -f ./fixtures.json --latency=80 --jitter=40 \
+        --error_rate=0.01 --rate_limit=5000
+"""
+
+#### IMPORTS ####
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+#####################################################################
+#### PARAMETERS #####
+DEFAULT_PORT = 8080
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+DEFAULT_RETRY_AFTER = 1
+STATS_URI = "/__mock__/stats"
+RESET_URI = "/__mock__/reset"
+MOCK_APITOKEN = "mock_apitoken"
+LOG_FILE = "./script.log"
+# query parameters which are not used to filter the items
+RESERVED_PARAMS = [
+    "limit",
+    "page",
+    "start",
+    "end",
+    "duration",
+    "sort",
+    "search_after",
+    "interval",
+]
+
+#####################################################################
+#### LOGS ####
+LOGGER = logging.getLogger(__name__)
+
+
+#####################################################################
+#### FUNCTIONS ####
+def _match(item: dict, params: dict) -> bool:
+    for key, value in params.items():
+        if key in RESERVED_PARAMS or key not in item or value == "all":
+            continue
+        if str(item[key]) not in value.split(","):
+            return False
+    timestamp = item.get("timestamp")
+    if timestamp is not None:
+        if "start" in params and timestamp < float(params["start"]):
+            return False
+        if "end" in params and timestamp >= float(params["end"]):
+            return False
+    return True
+
+
+def _get_page(params: dict) -> tuple:
+    try:
+        limit = min(int(params.get("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+        page = max(int(params.get("page", 1)), 1)
+    except ValueError:
+        limit = DEFAULT_LIMIT
+        page = 1
+    return limit, page
+
+
+#####################################################################
+#### REQUEST HANDLER ####
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = "MistMockServer/1.0"
+    protocol_version = "HTTP/1.1"
+    # headers and body are sent separately, avoid the delayed ACK with keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        LOGGER.debug("mist_mock_server:%s", format % args)
+
+    def _send(self, status: int, data=None, headers: dict | None = None) -> None:
+        body = json.dumps(data if data is not None else {}).encode()
+        self.server.mock.count_bytes(len(body))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return None
+        raw = self.rfile.read(length)
+        if "application/json" not in (self.headers.get("Content-Type") or ""):
+            # file upload (multipart)
+            return None
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+
+    def _handle(self, method: str) -> None:
+        split = urlsplit(self.path)
+        path = split.path.rstrip("/")
+        params = dict(parse_qsl(split.query))
+        body = self._read_body()
+        mock: MockServer = self.server.mock
+        if path == STATS_URI:
+            self._send(200, mock.get_stats())
+            return
+        if path == RESET_URI:
+            mock.reset_stats()
+            self._send(200, {})
+            return
+        status, data, headers = mock.process(method, path, params, body)
+        self._send(status, data, headers)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self._handle("GET")
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self._handle("POST")
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        self._handle("PUT")
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        self._handle("DELETE")
+
+
+#####################################################################
+#### MOCK SERVER ####
+class MockServer:
+    """
+    Local HTTP server replaying Mist API responses
+
+    PARAMS
+    -----------
+    fixtures : str | dict
+        path to the fixtures file, or fixtures data ({"routes": {...}})
+    port : int, default 0
+        port to listen on. If 0, a free port is used
+    latency : float, default 0
+        latency (in milliseconds) added to each response
+    jitter : float, default 0
+        maximum random latency (in milliseconds) added to each response
+    error_rate : float, default 0
+        ratio of the requests rejected with a HTTP 429 (0-1)
+    rate_limit : int, default 0
+        number of requests allowed per `rate_period` before the requests are
+        rejected with a HTTP 429. If 0, the requests are not limited
+    rate_period : int, default 3600
+        rate period (in seconds)
+    seed : int, default 0
+        seed of the random values (jitter and HTTP 429)
+    strict : bool, default False
+        if False, the GET requests to unknown URIs return an empty list, and
+        the POST/PUT requests to unknown URIs are creating them. If True, they
+        return a HTTP 404
+    """
+
+    def __init__(
+        self,
+        fixtures: str | dict,
+        port: int = 0,
+        latency: float = 0,
+        jitter: float = 0,
+        error_rate: float = 0,
+        rate_limit: int = 0,
+        rate_period: int = 3600,
+        seed: int = 0,
+        strict: bool = False,
+    ):
+        if isinstance(fixtures, str):
+            with open(fixtures, "r", encoding="utf-8") as f:
+                fixtures = json.load(f)
+        self.routes = fixtures.get("routes", {})
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.strict = strict
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # filtered lists, {(route, query parameters without page): items},
+        # cleared each time the routes are changed (`_generation`)
+        self._cache = {}
+        self._generation = 0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self.stats = {}
+        self.reset_stats()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _RequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        URL of the server (e.g. "http://127.0.0.1:8080")
+        """
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockServer":
+        """
+        Start the server in a background thread
+        """
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        LOGGER.info("mist_mock_server:start:listening on %s", self.url)
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop the server
+        """
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+        LOGGER.info("mist_mock_server:stop:stats: %s", self.get_stats())
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def reset_stats(self) -> None:
+        """
+        Reset the statistics of the server
+        """
+        with self._lock:
+            self.stats = {
+                "requests": 0,
+                "methods": {},
+                "throttled": 0,
+                "not_found": 0,
+                "bytes": 0,
+            }
+
+    def get_stats(self) -> dict:
+        """
+        Return the statistics of the server
+
+        RETURN
+        -----------
+        dict
+            requests: number of requests received
+            methods: number of requests received per HTTP method
+            throttled: number of HTTP 429 returned
+            not_found: number of HTTP 404 returned
+            bytes: size of the response bodies
+        """
+        with self._lock:
+            return json.loads(json.dumps(self.stats))
+
+    def count_bytes(self, size: int) -> None:
+        """
+        Add the size of a response body to the statistics
+        """
+        with self._lock:
+            self.stats["bytes"] += size
+
+    def _is_throttled(self) -> float:
+        """
+        Return the "Retry-After" value if the request must be rejected, or 0
+        """
+        now = time.monotonic()
+        if self.rate_limit:
+            if now - self._window_start >= self.rate_period:
+                self._window_start = now
+                self._window_count = 0
+            self._window_count += 1
+            if self._window_count > self.rate_limit:
+                return max(1, round(self._window_start + self.rate_period - now))
+        if self.error_rate and self._random.random() < self.error_rate:
+            return DEFAULT_RETRY_AFTER
+        return 0
+
+    def _find(self, path: str) -> tuple:
+        """
+        Return the route and the object id of the URI. The object id is empty
+        if the URI is a route
+        """
+        if path in self.routes:
+            return path, ""
+        route, _, object_id = path.rpartition("/")
+        if isinstance(self.routes.get(route), list):
+            return route, object_id
+        return "", ""
+
+    def _is_listing(self, route: str, object_id: str) -> bool:
+        """
+        Return True if the GET request is retrieving a list (or a search result)
+        """
+        if not route or object_id:
+            return False
+        data = self.routes[route]
+        return isinstance(data, list) or (isinstance(data, dict) and "results" in data)
+
+    def _filter(self, route: str, items: list, params: dict, generation: int) -> list:
+        """
+        Return the items matching the query parameters. The filtered items are
+        cached, so the next pages of the same listing are not filtered again.
+        The items are filtered without the lock, so the concurrent requests are
+        not waiting for each other
+        """
+        key = (
+            route,
+            tuple(
+                sorted(
+                    (k, v) for k, v in params.items() if k not in ("page", "limit")
+                )
+            ),
+        )
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        filtered = [item for item in list(items) if _match(item, params)]
+        with self._lock:
+            # not cached if the route was changed during the filtering
+            if generation == self._generation:
+                self._cache[key] = filtered
+        return filtered
+
+    def _get_list(self, path: str, data: list, params: dict, generation: int) -> tuple:
+        items = self._filter(path, data, params, generation)
+        limit, page = _get_page(params)
+        headers = {
+            "X-Page-Total": len(items),
+            "X-Page-Limit": limit,
+            "X-Page-Page": page,
+        }
+        return 200, items[(page - 1) * limit : page * limit], headers
+
+    def _get_search(
+        self, path: str, route: dict, params: dict, generation: int
+    ) -> tuple:
+        items = self._filter(path, route.get("results", []), params, generation)
+        limit, page = _get_page(params)
+        data = {k: v for k, v in route.items() if k != "results"}
+        data["results"] = items[(page - 1) * limit : page * limit]
+        data["limit"] = limit
+        data["total"] = len(items)
+        if page * limit < len(items):
+            data["next"] = f"{path}?{urlencode({**params, 'page': page + 1})}"
+        return 200, data, {}
+
+    def _process(self, method: str, path: str, params: dict, body) -> tuple:
+        route, object_id = self._find(path)
+        if not route:
+            if self.strict:
+                return 404, {"detail": "Not Found"}, {}
+            if method == "GET":
+                return 200, [], {}
+            if method == "POST" and isinstance(body, (dict, list)):
+                # new list of objects (e.g. objects of a new site)
+                self.routes[path] = []
+                return self._process(method, path, params, body)
+            if method == "PUT" and isinstance(body, dict):
+                self.routes[path] = dict(body)
+                return 200, self.routes[path], {}
+            return 200, {}, {}
+
+        data = self.routes[route]
+        if object_id:
+            index = next(
+                (i for i, item in enumerate(data) if item.get("id") == object_id), None
+            )
+            if index is None:
+                return 404, {"detail": "Not Found"}, {}
+            if method == "GET":
+                return 200, data[index], {}
+            if method == "PUT":
+                data[index] = {**data[index], **(body or {}), "id": object_id}
+                return 200, data[index], {}
+            if method == "DELETE":
+                data.pop(index)
+                return 200, {}, {}
+            return 200, body if isinstance(body, dict) else {}, {}
+
+        if method == "GET":
+            # the lists and search results are returned by `process`
+            return 200, data, {}
+        if method == "POST" and isinstance(data, list):
+            if isinstance(body, list):
+                # bulk import
+                items = [{**item, "id": item.get("id", str(uuid.uuid4()))} for item in body]
+                data.extend(items)
+                return 200, items, {}
+            item = {**(body or {}), "id": str(uuid.uuid4())}
+            data.append(item)
+            return 200, item, {}
+        if method == "PUT" and isinstance(data, dict):
+            data.update(body or {})
+            return 200, data, {}
+        if method == "DELETE":
+            self.routes.pop(route)
+            return 200, {}, {}
+        return 200, body if isinstance(body, dict) else {}, {}
+
+    def process(self, method: str, path: str, params: dict, body=None) -> tuple:
+        """
+        Process a request and return the response
+
+        PARAMS
+        -----------
+        method : str
+            HTTP method
+        path : str
+            URI (without the query string)
+        params : dict
+            query parameters
+        body : dict | list
+            request body (JSON)
+
+        RETURN
+        -----------
+        tuple
+            HTTP status code, response data, response headers
+        """
+        listing = None
+        with self._lock:
+            delay = self.latency
+            if self.jitter:
+                delay += self._random.uniform(0, self.jitter)
+            retry_after = self._is_throttled()
+            self.stats["requests"] += 1
+            self.stats["methods"][method] = self.stats["methods"].get(method, 0) + 1
+            if retry_after:
+                self.stats["throttled"] += 1
+            else:
+                route, object_id = self._find(path)
+                if method == "GET" and self._is_listing(route, object_id):
+                    # the lists are filtered after the lock is released
+                    # (the search results are copied, their other values may be
+                    # updated by another request)
+                    route_data = self.routes[route]
+                    if isinstance(route_data, dict):
+                        route_data = dict(route_data)
+                    listing = (route, route_data, self._generation)
+                else:
+                    status, data, headers = self._process(method, path, params, body)
+                    if status == 404:
+                        self.stats["not_found"] += 1
+                    if method != "GET":
+                        self._generation += 1
+                        self._cache.clear()
+        if listing:
+            route, route_data, generation = listing
+            if isinstance(route_data, list):
+                status, data, headers = self._get_list(
+                    route, route_data, params, generation
+                )
+            else:
+                status, data, headers = self._get_search(
+                    route, route_data, params, generation
+                )
+        if delay:
+            time.sleep(delay)
+        if retry_after:
+            return (
+                429,
+                {"detail": "Too Many Requests"},
+                {"Retry-After": retry_after},
+            )
+        return status, data, headers
+
+
+#####################################################################
+#### SESSION ####
+def connect(mist_session, url: str):
+    """
+    Send the requests of a mistapi session to the mock server. The session is
+    authenticated with a fake API Token
+
+    PARAMS
+    -----------
+    mist_session : mistapi.APISession
+        mistapi session, not logged in
+    url : str
+        URL of the mock server (`MockServer.url`)
+
+    RETURN
+    -----------
+    mistapi.APISession
+        the same session, sending its requests to the mock server
+    """
+    url = url.rstrip("/")
+    mist_session._cloud_uri = urlsplit(url).netloc
+    mist_session._url = lambda uri: f"{url}{uri}"
+    mist_session._apitoken = [MOCK_APITOKEN]
+    mist_session._apitoken_index = 0
+    mist_session._authenticated = True
+    mist_session._session.headers.update({"Authorization": f"Token {MOCK_APITOKEN}"})
+    return mist_session
+
+
+def record(mist_session, uris: list, fixtures_file: str) -> dict:
+    """
+    Retrieve the responses of a Mist Cloud and save them in a fixtures file.
+    The paginated responses are fully retrieved
+
+    PARAMS
+    -----------
+    mist_session : mistapi.APISession
+        mistapi session, already logged in
+    uris : list
+        list of URIs to record (e.g. ["/api/v1/orgs/<org_id>/sites"])
+    fixtures_file : str
+        path to the fixtures file
+
+    RETURN
+    -----------
+    dict
+        fixtures data
+    """
+    # pylint: disable=import-outside-toplevel
+    import mistapi
+
+    routes = {}
+    for uri in uris:
+        response = mist_session.mist_get(uri)
+        if response.status_code != 200:
+            LOGGER.error(
+                "mist_mock_server:record:unable to retrieve %s: %s",
+                uri,
+                response.status_code,
+            )
+            continue
+        if isinstance(response.data, dict) and "results" in response.data:
+            data = {k: v for k, v in response.data.items() if k != "next"}
+            data["results"] = mistapi.get_all(mist_session, response)
+        elif isinstance(response.data, list):
+            data = mistapi.get_all(mist_session, response)
+        else:
+            data = response.data
+        routes[uri.split("?", 1)[0]] = data
+    fixtures = {"routes": routes}
+    with open(fixtures_file, "w", encoding="utf-8") as f:
+        json.dump(fixtures, f)
+    return fixtures
+
+
+#####################################################################
+#### SCRIPT ENTRYPOINT ####
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Local HTTP server replaying Mist API responses",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+python3 ./mist_mock_server.py -f ./fixtures.json
+python3 ./mist_mock_server.py -f ./fixtures.json --latency=80 --jitter=40 \
+        --error_rate=0.01 --rate_limit=5000
+        """,
+    )
+    parser.add_argument("-f", "--fixtures", required=True, help="path to the fixtures file")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument(
+        "--latency", type=float, default=0, help="latency (in milliseconds) added to each response"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0, help="maximum random latency (in milliseconds)"
+    )
+    parser.add_argument(
+        "--error_rate", type=float, default=0, help="ratio of the requests rejected with a HTTP 429"
+    )
+    parser.add_argument(
+        "--rate_limit", type=int, default=0, help="number of requests allowed per rate period"
+    )
+    parser.add_argument(
+        "--rate_period", type=int, default=3600, help="rate period (in seconds)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random values")
+    parser.add_argument(
+        "-l",
+        "--log_file",
+        default=LOG_FILE,
+        help="define the filepath/filename where to write the logs",
+    )
+    args = parser.parse_args()
+
+    #### LOGS ####
+    logging.basicConfig(filename=args.log_file, filemode="w")
+    LOGGER.setLevel(logging.DEBUG)
+
+    SERVER = MockServer(
+        args.fixtures,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        rate_period=args.rate_period,
+        seed=args.seed,
+    ).start()
+    print(f"Mock server listening on {SERVER.url} (CTRL+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        SERVER.stop()
+        print(json.dumps(SERVER.get_stats(), indent=2))
+        sys.exit(0)
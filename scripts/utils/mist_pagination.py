@@ -0,0 +1,359 @@
+"""
+-------------------------------------------------------------------------------
+
+    Written by Thomas Munzer (tmunzer@juniper.net)
+    Github repository: https://github.com/tmunzer/Mist_library/
+
+    This script is licensed under the MIT License.
+
+-------------------------------------------------------------------------------
+Python module to retrieve all the pages of a paginated Mist API response.
+
+This module is used by other scripts from the mist_library, it is not meant to
+be run directly.
+
+`mistapi.get_all` walks the `next` links one page at a time. When the Mist
+Cloud returns the `X-Page-Total`, `X-Page-Limit` and `X-Page-Page` headers,
+the total number of pages is known after the first request, so the remaining
+pages can be requested concurrently. The items are returned in the page order.
+
+Responses using a cursor (`next` field in the response body, e.g. the search
+APIs) cannot be parallelized and are processed with `mistapi.get_all`.
+
+`iter_pages` can be used to process the items page by page, without keeping
+all the pages in memory (e.g. to process millions of events).
+
+The cursor of the search APIs cannot be used to request the pages concurrently,
+but the search window can be split in time slices (`start`/`end` parameters)
+requested concurrently. `iter_time_slices` yields the items of each slice,
+from the most recent slice to the oldest one, with the items sorted by
+timestamp (most recent first, like the search APIs). Only `max_workers`
+slices are retrieved at the same time.
+
+-------
+Requirements:
+mistapi: https://pypi.org/project/mistapi/
+
+-------
+Usage:
+import mist_pagination
+
+response = mistapi.api.v1.orgs.sites.listOrgSites(mist_session, org_id, limit=1000)
+sites = mist_pagination.get_all(mist_session, response)
+
+response = mistapi.api.v1.orgs.devices.searchOrgDeviceEvents(mist_session, org_id)
+for events in mist_pagination.iter_pages(mist_session, response):
+    ...
+
+start, end = mist_pagination.get_time_range("1d")
+search = functools.partial(
+    mistapi.api.v1.orgs.devices.searchOrgDeviceEvents, mist_session, org_id, limit=1000
+)
+for events in mist_pagination.iter_time_slices(mist_session, search, start, end, 8):
+    ...
+"""
+
+#### IMPORTS ####
+import logging
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+try:
+    import mistapi
+except ImportError:
+    print(
+        """
+        Critical:
+        \"mistapi\" package is missing. Please use the pip command to install it.
+
+        # Linux/macOS
+        python3 -m pip install mistapi
+
+        # Windows
+        py -m pip install mistapi
+        """
+    )
+    sys.exit(2)
+
+#####################################################################
+#### PARAMETERS #####
+MAX_WORKERS = 8
+# duration units accepted by the Mist search APIs, in seconds
+DURATION_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+#####################################################################
+#### LOGS ####
+LOGGER = logging.getLogger(__name__)
+
+
+#####################################################################
+#### FUNCTIONS ####
+def _get_items(response) -> list:
+    if isinstance(response.data, list):
+        return list(response.data)
+    if isinstance(response.data, dict) and "results" in response.data:
+        return list(response.data["results"])
+    return []
+
+
+def _get_page_info(response) -> tuple | None:
+    """
+    Return the (total, limit, page) values from the pagination headers, or
+    None if the response is not using header based pagination
+    """
+    if not response.headers:
+        return None
+    try:
+        total = int(response.headers.get("X-Page-Total"))
+        limit = int(response.headers.get("X-Page-Limit"))
+        page = int(response.headers.get("X-Page-Page"))
+    except (TypeError, ValueError):
+        return None
+    if limit <= 0:
+        return None
+    return total, limit, page
+
+
+def _get_page_uri(response, page: int) -> str:
+    uri = f"/api/{response.url.split('/api/', 1)[1]}"
+    if re.search(r"(?<=[?&])page=\d+(?=&|$)", uri):
+        return re.sub(r"(?<=[?&])page=\d+(?=&|$)", f"page={page}", uri)
+    separator = "&" if "?" in uri else "?"
+    return f"{uri}{separator}page={page}"
+
+
+def _get_page(mist_session: mistapi.APISession, uri: str) -> list:
+    LOGGER.debug("mist_pagination:_get_page:retrieving %s", uri)
+    response = mist_session.mist_get(uri)
+    if response.status_code != 200:
+        LOGGER.error(
+            "mist_pagination:_get_page:unable to retrieve %s: %s / %s",
+            uri,
+            response.status_code,
+            response.raw_data,
+        )
+        raise RuntimeError(f"Unable to retrieve {uri} (HTTP {response.status_code})")
+    return _get_items(response)
+
+
+def get_all(
+    mist_session: mistapi.APISession,
+    response,
+    max_workers: int = MAX_WORKERS,
+) -> list:
+    """
+    Retrieve and return all the items after a first request. The remaining pages
+    are requested concurrently when the total number of pages is known.
+
+    PARAMS
+    -----------
+    mist_session : mistapi.APISession
+        mistapi session, already logged in
+    response : mistapi.APIResponse
+        response of the first request
+    max_workers : int, default = MAX_WORKERS
+        maximum number of pages requested at the same time
+
+    RETURN
+    -----------
+    list
+        list of all the items, in the page order
+    """
+    if not response.next:
+        return _get_items(response)
+
+    page_info = _get_page_info(response)
+    if isinstance(response.data, dict) and "next" in response.data:
+        page_info = None
+    if not page_info or max_workers <= 1:
+        LOGGER.debug("mist_pagination:get_all:serial retrieval of %s", response.url)
+        return mistapi.get_all(mist_session, response)
+
+    total, limit, page = page_info
+    last_page = -(-total // limit)
+    uris = [_get_page_uri(response, i) for i in range(page + 1, last_page + 1)]
+    LOGGER.debug(
+        "mist_pagination:get_all:retrieving %s pages from %s with %s workers",
+        len(uris),
+        response.url,
+        max_workers,
+    )
+    data = _get_items(response)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(uris))) as executor:
+        for items in executor.map(lambda uri: _get_page(mist_session, uri), uris):
+            data += items
+    return data
+
+
+def iter_pages(mist_session: mistapi.APISession, response):
+    """
+    Yield the items of each page after a first request. The next page is only
+    requested when the previous one has been processed, so only one page is
+    kept in memory.
+
+    PARAMS
+    -----------
+    mist_session : mistapi.APISession
+        mistapi session, already logged in
+    response : mistapi.APIResponse
+        response of the first request
+
+    RETURN
+    -----------
+    generator
+        list of the items of each page
+    """
+    while response:
+        if response.status_code != 200:
+            LOGGER.error(
+                "mist_pagination:iter_pages:unable to retrieve %s: %s / %s",
+                response.url,
+                response.status_code,
+                response.raw_data,
+            )
+            raise RuntimeError(
+                f"Unable to retrieve {response.url} (HTTP {response.status_code})"
+            )
+        yield _get_items(response)
+        response = mistapi.get_next(mist_session, response)
+
+
+def get_time_range(duration: str, end: int | None = None) -> tuple:
+    """
+    Convert a search duration to a time range
+
+    PARAMS
+    -----------
+    duration : str
+        duration, like "10m", "2h", "7d" or "1w"
+    end : int, default None
+        end of the time range (epoch, in seconds). If not set, the current time
+        is used
+
+    RETURN
+    -----------
+    tuple
+        start, end (epoch, in seconds)
+    """
+    try:
+        seconds = int(duration[:-1]) * DURATION_UNITS[duration[-1]]
+    except (KeyError, ValueError, IndexError) as e:
+        raise ValueError(f"Invalid duration {duration}") from e
+    if end is None:
+        end = int(time.time())
+    return end - seconds, end
+
+
+def get_time_slices(start: int, end: int, slices: int) -> list:
+    """
+    Split a time range in time slices of the same duration
+
+    PARAMS
+    -----------
+    start : int
+        start of the time range (epoch, in seconds)
+    end : int
+        end of the time range (epoch, in seconds)
+    slices : int
+        number of time slices. The time range is split in less slices if it
+        is shorter than `slices` seconds
+
+    RETURN
+    -----------
+    list
+        list of (start, end) tuples, from the most recent slice to the oldest
+    """
+    slices = max(1, min(slices, end - start))
+    bounds = [start + (end - start) * i // slices for i in range(slices + 1)]
+    return [(bounds[i - 1], bounds[i]) for i in range(slices, 0, -1)]
+
+
+def _get_time_slice(
+    mist_session: mistapi.APISession,
+    search: Callable,
+    start: int,
+    end: int,
+    include_end: bool,
+) -> list:
+    LOGGER.debug("mist_pagination:_get_time_slice:retrieving %s-%s", start, end)
+    items = []
+    for page in iter_pages(mist_session, search(start=start, end=end)):
+        for item in page:
+            # the items at the boundary between two slices may be returned
+            # twice, they are only kept in the most recent slice
+            timestamp = item.get("timestamp")
+            if (
+                timestamp is None
+                or start <= timestamp < end
+                or (include_end and timestamp == end)
+            ):
+                items.append(item)
+    items.sort(key=lambda item: item.get("timestamp") or 0, reverse=True)
+    return items
+
+
+def iter_time_slices(
+    mist_session: mistapi.APISession,
+    search: Callable,
+    start: int,
+    end: int,
+    slices: int,
+    max_workers: int = MAX_WORKERS,
+):
+    """
+    Split a search in time slices retrieved concurrently, and yield the items
+    of each slice, from the most recent slice to the oldest one
+
+    PARAMS
+    -----------
+    mist_session : mistapi.APISession
+        mistapi session, already logged in
+    search : Callable
+        search function, called with the `start` and `end` parameters of each
+        slice (e.g. `functools.partial` of a mistapi search function)
+    start : int
+        start of the search (epoch, in seconds)
+    end : int
+        end of the search (epoch, in seconds)
+    slices : int
+        number of time slices
+    max_workers : int, default = MAX_WORKERS
+        maximum number of slices retrieved at the same time
+
+    RETURN
+    -----------
+    generator
+        list of the items of each slice, sorted by timestamp (most recent
+        first)
+    """
+    time_slices = get_time_slices(start, end, slices)
+    max_workers = max(1, min(max_workers, len(time_slices)))
+    LOGGER.debug(
+        "mist_pagination:iter_time_slices:retrieving %s slices with %s workers",
+        len(time_slices),
+        max_workers,
+    )
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = deque()
+    try:
+        for i, (slice_start, slice_end) in enumerate(time_slices):
+            if len(futures) >= max_workers:
+                yield futures.popleft().result()
+            futures.append(
+                executor.submit(
+                    _get_time_slice,
+                    mist_session,
+                    search,
+                    slice_start,
+                    slice_end,
+                    i == 0,
+                )
+            )
+        while futures:
+            yield futures.popleft().result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
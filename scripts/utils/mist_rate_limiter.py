@@ -0,0 +1,273 @@
+"""
+-------------------------------------------------------------------------------
+
+    Written by Thomas Munzer (tmunzer@juniper.net)
+    Github repository: https://github.com/tmunzer/Mist_library/
+
+    This script is licensed under the MIT License.
+
+-------------------------------------------------------------------------------
+Python module to keep the API requests sent by the mist_library scripts within
+the Mist API rate limit.
+
+This module is used by other scripts from the mist_library, it is not meant to
+be run directly.
+
+The Mist Cloud allows 5000 API requests per hour for each API Token (or user
+session). Once the limit is reached, the requests are rejected with a HTTP 429
+response, with a "Retry-After" header indicating when the requests will be
+accepted again.
+
+This module is managing one token bucket per Mist Cloud host and API Token.
+The bucket is shared by all the sessions (and threads) using the same
+host/token in the current process. When a session is attached:
+- each request is waiting for an available token in the bucket before being
+  sent
+- when a HTTP 429 response is received, all the requests using the same bucket
+  are paused for the "Retry-After" delay, then the request is sent again
+
+The rate limit can be changed with the "MIST_RATE_LIMIT" environment variable
+(number of requests per hour). This variable can be set in the mistapi env
+file.
+
+-------
+Requirements:
+mistapi: https://pypi.org/project/mistapi/
+
+-------
+Usage:
+import mist_rate_limiter
+
+mist_rate_limiter.attach(mist_session)
+print(mist_rate_limiter.get_budget(mist_session))
+"""
+
+#### IMPORTS ####
+import logging
+import os
+import threading
+import time
+from hashlib import sha256
+
+#####################################################################
+#### PARAMETERS #####
+RATE_LIMIT = 5000
+RATE_PERIOD = 3600
+MAX_RETRIES = 5
+DEFAULT_RETRY_AFTER = 5
+MAX_RETRY_AFTER = 3600
+
+#####################################################################
+#### LOGS ####
+LOGGER = logging.getLogger(__name__)
+
+#####################################################################
+#### GLOBALS #####
+LIMITERS = {}
+LIMITERS_LOCK = threading.Lock()
+
+
+#####################################################################
+#### RATE LIMITER ####
+class RateLimiter:
+    """
+    Token bucket shared by all the requests sent with the same Mist Cloud host
+    and API Token
+    """
+
+    def __init__(self, key: str, rate: int = RATE_LIMIT, period: int = RATE_PERIOD):
+        self.key = key
+        self.capacity = rate
+        self.refill_rate = rate / period
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.requests_count = 0
+        self.throttled_count = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.refill_rate
+        )
+        self.updated = now
+
+    def acquire(self) -> float:
+        """
+        Wait until a token is available, and consume it.
+
+        RETURN
+        -----------
+        float
+            time (in seconds) spent waiting for the token
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    self.requests_count += 1
+                    return waited
+                else:
+                    wait = (1 - self.tokens) / self.refill_rate
+            LOGGER.debug("mist_rate_limiter:acquire:%s waiting %.2fs", self.key, wait)
+            time.sleep(wait)
+            waited += wait
+
+    def backoff(self, retry_after: float) -> None:
+        """
+        Pause all the requests using this bucket. Used when a HTTP 429 is received
+
+        PARAMS
+        -----------
+        retry_after : float
+            time (in seconds) to wait before sending new requests
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = 0
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+            self.throttled_count += 1
+        LOGGER.warning(
+            "mist_rate_limiter:backoff:%s rate limited, pausing requests for %ss",
+            self.key,
+            retry_after,
+        )
+
+    def get_budget(self) -> dict:
+        """
+        Return the current budget of the bucket
+
+        RETURN
+        -----------
+        dict
+            remaining: number of requests that can be sent right now
+            capacity: maximum number of requests per period
+            blocked_for: time (in seconds) before the requests can be sent again
+            requests: number of requests sent
+            throttled: number of HTTP 429 received
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "remaining": int(self.tokens),
+                "capacity": self.capacity,
+                "blocked_for": round(max(0.0, self.blocked_until - now), 2),
+                "requests": self.requests_count,
+                "throttled": self.throttled_count,
+            }
+
+
+#####################################################################
+#### FUNCTIONS ####
+def _get_key(mist_session) -> str:
+    host = getattr(mist_session, "_cloud_uri", "") or ""
+    apitokens = getattr(mist_session, "_apitoken", None) or []
+    index = getattr(mist_session, "_apitoken_index", 0)
+    if apitokens and 0 <= index < len(apitokens):
+        credential = apitokens[index]
+    else:
+        credential = getattr(mist_session, "email", None) or str(id(mist_session))
+    # never keep the API Token itself in the key, it is used in the logs
+    return f"{host}/{sha256(credential.encode()).hexdigest()[:12]}"
+
+
+def _get_rate_limit() -> int:
+    try:
+        return int(os.getenv("MIST_RATE_LIMIT", RATE_LIMIT))
+    except ValueError:
+        LOGGER.error(
+            "mist_rate_limiter:_get_rate_limit:invalid MIST_RATE_LIMIT value %s",
+            os.getenv("MIST_RATE_LIMIT"),
+        )
+        return RATE_LIMIT
+
+
+def _get_retry_after(response, attempt: int) -> float:
+    retry_after = None
+    if response.headers:
+        retry_after = response.headers.get("Retry-After")
+    try:
+        wait = float(retry_after)
+    except (TypeError, ValueError):
+        wait = DEFAULT_RETRY_AFTER * (2**attempt)
+    return min(max(wait, 1), MAX_RETRY_AFTER)
+
+
+def get_limiter(mist_session) -> RateLimiter:
+    """
+    Return the token bucket used by the session. The bucket is created if it
+    does not exist yet
+
+    PARAMS
+    -----------
+    mist_session : mistapi.APISession
+        mistapi session
+
+    RETURN
+    -----------
+    RateLimiter
+        token bucket for the session host and API Token
+    """
+    key = _get_key(mist_session)
+    with LIMITERS_LOCK:
+        if key not in LIMITERS:
+            LIMITERS[key] = RateLimiter(key, _get_rate_limit())
+        return LIMITERS[key]
+
+
+def get_budget(mist_session) -> dict:
+    """
+    Return the current budget of the session bucket. See `RateLimiter.get_budget`
+    """
+    return get_limiter(mist_session).get_budget()
+
+
+def _wrap(mist_session, method_name: str) -> None:
+    method = getattr(mist_session, method_name)
+
+    def _rate_limited(*args, **kwargs):
+        response = None
+        for attempt in range(MAX_RETRIES + 1):
+            limiter = get_limiter(mist_session)
+            limiter.acquire()
+            response = method(*args, **kwargs)
+            if response.status_code != 429 or attempt == MAX_RETRIES:
+                break
+            limiter.backoff(_get_retry_after(response, attempt))
+        return response
+
+    setattr(mist_session, method_name, _rate_limited)
+
+
+def attach(mist_session) -> None:
+    """
+    Send all the requests of the session through the rate limiter. Calling this
+    function multiple times with the same session has no effect
+
+    PARAMS
+    -----------
+    mist_session : mistapi.APISession
+        mistapi session
+    """
+    if getattr(mist_session, "_mist_rate_limiter", False):
+        return
+    for method_name in [
+        "mist_get",
+        "mist_post",
+        "mist_put",
+        "mist_delete",
+        "mist_post_file",
+    ]:
+        if hasattr(mist_session, method_name):
+            _wrap(mist_session, method_name)
+    mist_session._mist_rate_limiter = True
+    LOGGER.info(
+        "mist_rate_limiter:attach:session attached to %s", _get_key(mist_session)
+    )
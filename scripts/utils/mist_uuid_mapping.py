@@ -0,0 +1,146 @@
+"""
+-------------------------------------------------------------------------------
+
+    Written by Thomas Munzer (tmunzer@juniper.net)
+    Github repository: https://github.com/tmunzer/Mist_library/
+
+    This script is licensed under the MIT License.
+
+-------------------------------------------------------------------------------
+Python module to replace the UUIDs of the objects deployed by the deploy
+scripts (UUIDs from the source org replaced by the UUIDs of the objects
+created in the destination org).
+
+This module is used by other scripts from the mist_library, it is not meant to
+be run directly.
+
+The object is processed in a single pass: each dict/list is visited once, and
+each string value (or dict key) with the UUID format is replaced with a dict
+lookup. The processing time is linear with the size of the object, even for
+large objects (gateway templates, WLANs with many VLANs, ...).
+
+The UUIDs which are not in the mapping are returned as "missing UUIDs", as a
+list of {key: uuid}, where "key" is the name of the field containing the UUID
+(or the name of the list containing it).
+
+-------
+Usage:
+import mist_uuid_mapping
+
+new_obj, missing_uuids = mist_uuid_mapping.remap(obj, {old_uuid: new_uuid})
+uuids = mist_uuid_mapping.find_uuids(obj)
+"""
+
+#### IMPORTS ####
+import re
+
+#####################################################################
+#### PARAMETERS #####
+UUID_RE = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-5][0-9a-f]{3}-[089ab][0-9a-f]{3}-[0-9a-f]{12}"
+)
+# fields which may contain a value with the UUID format which is not a Mist
+# object id
+IGNORED_KEYS = [
+    "issuer",
+    "idp_sso_url",
+    "custom_logout_url",
+    "sso_issuer",
+    "sso_idp_sso_url",
+    "ibeacon_uuid",
+]
+
+
+#####################################################################
+#### FUNCTIONS ####
+def _is_uuid(value: str) -> bool:
+    # quick checks before the regex, most of the strings are not UUIDs
+    return len(value) == 36 and value[8] == "-" and UUID_RE.fullmatch(value) is not None
+
+
+def _remap(obj, key: str, uuids: dict, missing_uuids: list, ignored_keys: list):
+    if isinstance(obj, dict):
+        new_obj = {}
+        for obj_key, value in obj.items():
+            if isinstance(obj_key, str) and obj_key in uuids:
+                obj_key = uuids[obj_key]
+            new_obj[obj_key] = _remap(value, obj_key, uuids, missing_uuids, ignored_keys)
+        return new_obj
+    if isinstance(obj, list):
+        return [_remap(value, key, uuids, missing_uuids, ignored_keys) for value in obj]
+    if isinstance(obj, str) and _is_uuid(obj):
+        new_uuid = uuids.get(obj)
+        if new_uuid:
+            return new_uuid
+        if key not in ignored_keys:
+            missing_uuids.append({key: obj})
+    return obj
+
+
+def _find(obj, key: str, uuids: set, ignored_keys: list) -> None:
+    if isinstance(obj, dict):
+        for obj_key, value in obj.items():
+            if isinstance(obj_key, str) and _is_uuid(obj_key):
+                uuids.add(obj_key)
+            _find(value, obj_key, uuids, ignored_keys)
+    elif isinstance(obj, list):
+        for value in obj:
+            _find(value, key, uuids, ignored_keys)
+    elif isinstance(obj, str) and key not in ignored_keys and _is_uuid(obj):
+        uuids.add(obj)
+
+
+def find_uuids(obj, ignored_keys: list | None = None) -> set:
+    """
+    Find the UUIDs referenced by an object
+
+    PARAMS
+    -----------
+    obj : dict | list
+        object to process
+    ignored_keys : list, default IGNORED_KEYS
+        fields which are never returned as UUIDs
+
+    RETURN
+    -----------
+    set
+        UUIDs found in the object values (or dict keys)
+    """
+    if ignored_keys is None:
+        ignored_keys = IGNORED_KEYS
+    uuids = set()
+    _find(obj, "", uuids, ignored_keys)
+    return uuids
+
+
+def remap(
+    obj,
+    uuids: dict,
+    missing_uuids: list | None = None,
+    ignored_keys: list | None = None,
+) -> tuple:
+    """
+    Replace the UUIDs of an object
+
+    PARAMS
+    -----------
+    obj : dict | list
+        object to process. The object is not modified
+    uuids : dict
+        UUIDs mapping ({old_uuid: new_uuid})
+    missing_uuids : list, default None
+        list where to add the missing UUIDs. If not set, a new list is created
+    ignored_keys : list, default IGNORED_KEYS
+        fields which are never reported as missing UUIDs
+
+    RETURN
+    -----------
+    tuple
+        new object with the UUIDs replaced, list of missing UUIDs ({key: uuid})
+    """
+    if missing_uuids is None:
+        missing_uuids = []
+    if ignored_keys is None:
+        ignored_keys = IGNORED_KEYS
+    new_obj = _remap(obj, "", uuids, missing_uuids, ignored_keys)
+    return new_obj, missing_uuids